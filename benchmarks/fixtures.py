@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Synthetic media for benchmarks, generated offline with ffmpeg lavfi
+sources, so that runs on different machines measure the same input.
+Fixtures are generated once into a directory and reused.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+
+# (name, width, height, duration in seconds)
+video_fixtures = [
+    ("testsrc2-240p-10s.mp4", 320, 240, 10),
+    ("testsrc2-720p-10s.mp4", 1280, 720, 10),
+    ("testsrc2-720p-60s.mp4", 1280, 720, 60),
+    ("testsrc2-1080p-30s.mp4", 1920, 1080, 30),
+]
+
+# (name, duration in seconds), noise with 2s of silence every 10s
+audio_fixtures = [
+    ("anoisesrc-gaps-60s.wav", 60),
+    ("anoisesrc-gaps-600s.wav", 600),
+]
+
+# (name, width, height), a test pattern framed by a plain margin
+image_fixtures = [
+    ("testsrc2-margin-640x360.png", 640, 360),
+    ("testsrc2-margin-1920x1080.png", 1920, 1080),
+]
+
+
+def has_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def get_ffmpeg_version() -> str | None:
+    if not has_ffmpeg():
+        return None
+    cp = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+    return cp.stdout.split("\n", 1)[0]
+
+
+def mkargs_video(path: str, width: int, height: int, duration: int) -> list[str]:
+    src = "testsrc2=size={}x{}:rate=25:duration={}".format(width, height, duration)
+    sine = "sine=frequency=440:sample_rate=44100:duration={}".format(duration)
+    # fixed encoder settings, for the same bytes on every run
+    return [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        src,
+        "-f",
+        "lavfi",
+        "-i",
+        sine,
+        "-c:v",
+        "libx264",
+        "-preset",
+        "ultrafast",
+        "-pix_fmt",
+        "yuv420p",
+        "-threads",
+        "1",
+        "-c:a",
+        "aac",
+        "-ac",
+        "2",
+        "-shortest",
+        "-fflags",
+        "+bitexact",
+        path,
+    ]
+
+
+def mkargs_audio(path: str, duration: int) -> list[str]:
+    src = "anoisesrc=duration={}:color=pink:amplitude=0.5:seed=42".format(duration)
+    gate = "volume='if(lt(mod(t,10),8),1,0)':eval=frame"
+    return [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        src,
+        "-af",
+        gate,
+        "-ac",
+        "2",
+        "-ar",
+        "44100",
+        "-c:a",
+        "pcm_s16le",
+        "-fflags",
+        "+bitexact",
+        path,
+    ]
+
+
+def mkargs_image(path: str, width: int, height: int) -> list[str]:
+    w, h = width * 3 // 4 // 2 * 2, height * 3 // 4 // 2 * 2
+    src = "testsrc2=size={}x{}:rate=1".format(w, h)
+    pad = "pad={}:{}:(ow-iw)/2:(oh-ih)/2:white".format(width, height)
+    return [
+        "ffmpeg",
+        "-y",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        src,
+        "-vf",
+        pad,
+        "-frames:v",
+        "1",
+        path,
+    ]
+
+
+def iter_fixture_args(directory: str):
+    for name, w, h, d in video_fixtures:
+        path = os.path.join(directory, name)
+        yield path, mkargs_video(path, w, h, d)
+    for name, d in audio_fixtures:
+        path = os.path.join(directory, name)
+        yield path, mkargs_audio(path, d)
+    for name, w, h in image_fixtures:
+        path = os.path.join(directory, name)
+        yield path, mkargs_image(path, w, h)
+
+
+def generate_fixtures(directory: str, quiet=False) -> list[str]:
+    """Generate missing fixtures into directory; return paths of all of them"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for path, args in iter_fixture_args(directory):
+        if not os.path.exists(path):
+            if not quiet:
+                print("generating", path)
+            # written aside and renamed, not to leave a truncated fixture
+            base, ext = os.path.splitext(path)
+            tmp = base + ".tmp" + ext
+            args[-1] = tmp
+            subprocess.run(args, check=True)
+            os.replace(tmp, path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Time the hot paths of joker-studio on synthetic fixtures.
+
+    python -m benchmarks.run -o before.json
+    python -m benchmarks.run -o after.json --compare before.json
+
+Benchmarks needing fixtures are skipped if ffmpeg is not found.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from benchmarks import fixtures
+
+# measure actual probing, not lookups in the probe cache
+os.environ["JOKER_STUDIO_PROBE_CACHE"] = "0"
+
+
+def bench_conversion_builders(_):
+    from joker.studio.ffmpeg.conv import mkcod_convert_a_file
+
+    pairs = [
+        ("mp4", "mkv"),
+        ("mp3", "mp4"),
+        ("mp4", "ts"),
+        ("ogg", "flac"),
+        ("wav", "mp3"),
+        ("png", "jpg"),
+    ]
+    for i in range(500):
+        for fmt, inext in pairs:
+            ns = argparse.Namespace(fmt=fmt, reencode=True)
+            mkcod_convert_a_file("/media/{}.{}".format(i, inext), ns)
+
+
+def bench_media_splitter_uniform(path):
+    from joker.studio.ffmpeg.split import MediaSplitter
+
+    list(MediaSplitter(path).uniform_split(2))
+
+
+def bench_media_splitter_silence(path):
+    from joker.studio.ffmpeg.split import MediaSplitter
+
+    list(MediaSplitter(path).silence_split())
+
+
+def bench_audio_energy_series(path):
+    from joker.studio.alpha.audio import AudioEnergySeries
+
+    AudioEnergySeries.from_file(path)
+
+
+def bench_compute_video_hash(path):
+    from joker.studio.misc.rename import compute_video_hash
+
+    compute_video_hash(path)
+
+
+def bench_margin_detection(path):
+    from joker.studio.misc.margin import MarginDetection
+
+    MarginDetection.from_file(path).crop()
+
+
+def bench_avatar_maker(path):
+    from joker.studio.misc.avatar import AvatarMaker
+
+    # outputs are written beside the input
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmppath = os.path.join(tmpdir, os.path.basename(path))
+        shutil.copyfile(path, tmppath)
+        AvatarMaker(320).convert_image(tmppath)
+
+
+# (name, function, fixture names or None for no fixture)
+benchmarks = [
+    ("conversion_builders", bench_conversion_builders, None),
+    (
+        "media_splitter_uniform",
+        bench_media_splitter_uniform,
+        [t[0] for t in fixtures.video_fixtures],
+    ),
+    (
+        "media_splitter_silence",
+        bench_media_splitter_silence,
+        [t[0] for t in fixtures.audio_fixtures],
+    ),
+    (
+        "audio_energy_series",
+        bench_audio_energy_series,
+        [t[0] for t in fixtures.audio_fixtures],
+    ),
+    (
+        "compute_video_hash",
+        bench_compute_video_hash,
+        [t[0] for t in fixtures.video_fixtures],
+    ),
+    (
+        "margin_detection",
+        bench_margin_detection,
+        [t[0] for t in fixtures.image_fixtures],
+    ),
+    (
+        "avatar_maker",
+        bench_avatar_maker,
+        [t[0] for t in fixtures.image_fixtures],
+    ),
+]
+
+
+def measure(func, arg, repeat: int) -> dict:
+    # first run not counted, for imports and the page cache
+    func(arg)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - t0)
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+def get_git_commit() -> str | None:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        cp = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+    return cp.stdout.strip() or None
+
+
+def get_metadata() -> dict:
+    import joker.studio
+
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version": joker.studio.__version__,
+        "commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": fixtures.get_ffmpeg_version(),
+    }
+
+
+def run_benchmarks(fixture_dir: str, repeat: int, selected: list[str] = None):
+    with_fixtures = fixtures.has_ffmpeg()
+    if with_fixtures:
+        fixtures.generate_fixtures(fixture_dir)
+    else:
+        print("ffmpeg not found, skipping benchmarks on fixtures", file=sys.stderr)
+    results = []
+    for name, func, fixture_names in benchmarks:
+        if selected and not any(s in name for s in selected):
+            continue
+        if fixture_names is None:
+            cases = [(None, None)]
+        elif with_fixtures:
+            cases = [(n, os.path.join(fixture_dir, n)) for n in fixture_names]
+        else:
+            continue
+        for fixture_name, path in cases:
+            result = {"name": name, "fixture": fixture_name}
+            try:
+                result.update(measure(func, path, repeat))
+            except Exception as e:
+                traceback.print_exc()
+                result["error"] = "{}: {}".format(type(e).__name__, e)
+            print_result(result)
+            results.append(result)
+    return results
+
+
+def _label(result: dict) -> str:
+    if result.get("fixture"):
+        return "{}[{}]".format(result["name"], result["fixture"])
+    return result["name"]
+
+
+def print_result(result: dict):
+    if "error" in result:
+        print("{:60} {}".format(_label(result), result["error"]))
+    else:
+        print("{:60} {:9.4f}s".format(_label(result), result["median"]))
+
+
+def compare(results: list[dict], baseline: list[dict]):
+    base = {_label(r): r for r in baseline if "median" in r}
+    print("{:60} {:>10} {:>10} {:>7}".format("", "baseline", "current", "ratio"))
+    for result in results:
+        label = _label(result)
+        if "median" not in result or label not in base:
+            continue
+        before = base[label]["median"]
+        after = result["median"]
+        print(
+            "{:60} {:9.4f}s {:9.4f}s {:6.2f}x".format(
+                label, before, after, after / before
+            )
+        )
+
+
+def run(prog=None, args=None):
+    from joker.studio.utils import get_cache_dir
+
+    desc = "time joker-studio components on synthetic lavfi media"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        help="write results as JSON to PATH",
+    )
+    parser.add_argument(
+        "--fixtures",
+        metavar="DIR",
+        default=str(get_cache_dir() / "bench-fixtures"),
+        help="where fixtures are generated and reused (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        metavar="INT",
+        help="timed runs of each benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-k",
+        dest="selected",
+        action="append",
+        metavar="NAME",
+        help="run only benchmarks whose names contain NAME; repeatable",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="PATH",
+        help="compare with the results of an earlier run",
+    )
+    ns = parser.parse_args(args)
+    results = run_benchmarks(ns.fixtures, ns.repeat, ns.selected)
+    if ns.output:
+        with open(ns.output, "w") as fout:
+            json.dump({"meta": get_metadata(), "results": results}, fout, indent=2)
+    if ns.compare:
+        with open(ns.compare) as fin:
+            baseline = json.load(fin)["results"]
+        compare(results, baseline)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
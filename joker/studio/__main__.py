@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # coding: utf-8
+import sys
 
 from volkanic.cmdline import CommandRegistry
 
@@ -7,14 +8,20 @@ cmddef = """\
 avatar      joker.studio.misc.avatar
 conv        joker.studio.ffmpeg.conv
 crop        joker.studio.ffmpeg.crop
+edit        joker.studio.ffmpeg.edit
 fade        joker.studio.ffmpeg.fade
 ico         joker.studio.misc.avatar:mkico
 imb         joker.studio.misc.avatar:mkimb
 imt         joker.studio.misc.margin
 iwh         joker.studio.misc.avatar:report_wh_ratios
+ladder      joker.studio.ffmpeg.ladder
+ocache      joker.studio.aux.outputcache
+pcache      joker.studio.aux.probecache
 poster      joker.studio.ffmpeg.thumb:poster
+queue       joker.studio.aux.workqueue
 ren         joker.studio.misc.rename
 rotate      joker.studio.images.rotate:main
+serve       joker.studio.aux.serve
 split       joker.studio.ffmpeg.split
 sub         joker.studio.ffmpeg.subtitle
 thumb       joker.studio.ffmpeg.thumb:thumb
@@ -24,5 +31,28 @@ vid         joker.studio.misc.vident
 _prog = "python3 -m joker.studio"
 registry = CommandRegistry.from_cmddef(cmddef, _prog)
 
+
+def dispatch(argv=None):
+    """Run a subcommand, after options of dio itself like --profile"""
+    from joker.studio.aux.profiling import run_profiled, split_profile_options
+
+    argv = sys.argv if argv is None else list(argv)
+    options, argv = split_profile_options(argv)
+    if options is None:
+        return registry(argv)
+    return run_profiled(registry, argv, **options)
+
+
+def main():
+    # forward to a warm daemon of `dio serve`, if one is serving
+    if sys.argv[1:2] != ["serve"]:
+        from joker.studio.aux.serve import forward
+
+        code = forward(sys.argv)
+        if code is not None:
+            return code
+    return dispatch()
+
+
 if __name__ == "__main__":
-    registry()
+    sys.exit(main())
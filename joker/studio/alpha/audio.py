@@ -6,18 +6,23 @@ import re
 import subprocess
 import tempfile
 
-import numpy as np
-from scipy.io import wavfile
+from joker.studio.aux.profiling import span
 
 
 def read_audio(path):
+    # scipy is slow to import, 300ms
+    from scipy.io import wavfile
+
     if path.endswith(".wav"):
-        return wavfile.read(path)
+        with span("audio.read", path=path):
+            return wavfile.read(path)
     tmp = tempfile.mkstemp()[1]
     cmd = ["ffmpeg", "-y", "-i", path, "-f", "wav", tmp]
     try:
-        subprocess.run(cmd)
-        return wavfile.read(tmp)
+        with span("exec.ffmpeg", path=path):
+            subprocess.run(cmd)
+        with span("audio.read", path=path):
+            return wavfile.read(tmp)
     finally:
         os.remove(tmp)
 
@@ -31,10 +36,9 @@ def chop(arr, winsize):
 
 
 def compute_audio_energy_string(path):
-    if path.endswith(".wav"):
-        sample_rate, data = wavfile.read(path)
-    else:
-        sample_rate, data = read_audio(path)
+    import numpy as np
+
+    sample_rate, data = read_audio(path)
 
     # merge 2 channels, and limit value to exp(10)-1
     data = np.abs(data).max(axis=1)
@@ -48,6 +52,8 @@ def compute_audio_energy_string(path):
 
 class AudioEnergySeries(object):
     def __init__(self, levels, winsize):
+        import numpy as np
+
         self._levels = np.array(levels, dtype="uint8")
         self._string = "".join(format(i, "X") for i in self._levels)
         self._winsize = winsize
@@ -57,6 +63,8 @@ class AudioEnergySeries(object):
 
     @classmethod
     def from_file(cls, path, winsize=0.1):
+        import numpy as np
+
         sample_rate, data = read_audio(path)
 
         # merge 2 channels, and limit value to exp(10)-1
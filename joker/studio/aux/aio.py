@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+asyncio counterparts of CommandOptionDict.run() and MediaInfo,
+for interleaving ffmpeg and ffprobe runs in one event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+
+from joker.studio.aux import probe
+from joker.studio.aux.info import MediaInfo, probe_file
+from joker.studio.aux.probecache import get_probe_cache, stat_key
+
+# how long a terminated child may take to exit before it is killed
+terminate_timeout = 5.0
+
+
+async def terminate(proc: asyncio.subprocess.Process):
+    if proc.returncode is not None:
+        return
+    try:
+        proc.terminate()
+        await asyncio.wait_for(proc.wait(), terminate_timeout)
+    except ProcessLookupError:
+        pass
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+
+
+async def _pump(reader, callback, capture: bool):
+    if reader is None:
+        return None
+    chunks = []
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        if callback is not None:
+            callback(chunk)
+        if capture:
+            chunks.append(chunk)
+    return b"".join(chunks) if capture else None
+
+
+async def arun(
+    cod,
+    dry=False,
+    quiet=False,
+    capture_output=False,
+    on_stdout=None,
+    on_stderr=None,
+):
+    """
+    Run a CommandOptionDict as an asyncio subprocess.
+    `on_stdout` and `on_stderr` are called with each chunk of bytes read.
+    If the awaiting task is cancelled, the child is terminated.
+    :return: subprocess.CompletedProcess, or None if dry
+    """
+    if not quiet:
+        print(cod, file=sys.stderr)
+    if dry:
+        return None
+    args = cod.as_args()
+    pipe = asyncio.subprocess.PIPE
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=pipe if capture_output or on_stdout else None,
+        stderr=pipe if capture_output or on_stderr else None,
+    )
+    try:
+        stdout, stderr = await asyncio.gather(
+            _pump(proc.stdout, on_stdout, capture_output),
+            _pump(proc.stderr, on_stderr, capture_output),
+        )
+        returncode = await proc.wait()
+    except asyncio.CancelledError:
+        await terminate(proc)
+        raise
+    return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+
+async def astream(cod):
+    """
+    Run a CommandOptionDict, yielding ("stdout" | "stderr", line) as they
+    arrive; lines end at either CR or LF, as ffmpeg updates its status
+    line with CR. Raises CalledProcessError on a non-zero exit.
+    """
+    queue = asyncio.Queue()
+    buffers = {}
+
+    def _feeder(name):
+        buf = buffers[name] = bytearray()
+
+        def _feed(chunk):
+            buf.extend(chunk.replace(b"\r", b"\n"))
+            *lines, rest = bytes(buf).split(b"\n")
+            buf[:] = rest
+            for line in lines:
+                queue.put_nowait((name, line))
+
+        return _feed
+
+    task = asyncio.ensure_future(
+        arun(
+            cod,
+            quiet=True,
+            on_stdout=_feeder("stdout"),
+            on_stderr=_feeder("stderr"),
+        )
+    )
+    try:
+        while not task.done() or not queue.empty():
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait([getter, task], return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        for name, buf in buffers.items():
+            if buf:
+                yield name, bytes(buf)
+        cp = task.result()
+        if cp.returncode:
+            raise subprocess.CalledProcessError(cp.returncode, cp.args)
+    finally:
+        # e.g. when the consumer stops early
+        task.cancel()
+
+
+async def arun_many(cods, limit=4, **kwargs):
+    """
+    Run CommandOptionDicts with at most `limit` at a time.
+    :return: list of CompletedProcess or exceptions, in order of cods
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(cod):
+        async with semaphore:
+            return await arun(cod, **kwargs)
+
+    tasks = [_run(cod) for cod in cods]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def aprobe(path, summarize=True, engine=None):
+    """Probe a file with an async ffprobe, or in a thread for other engines"""
+    engine = probe.get_engine_name(engine)
+    if engine != "ffprobe":
+        return await asyncio.to_thread(probe_file, path, summarize, engine)
+    cache = get_probe_cache()
+    key = stat_key(path)
+    data = cache.get(key, engine) if cache else None
+    if data is None:
+        proc = await asyncio.create_subprocess_exec(
+            *probe.ffprobe_args(path),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            await terminate(proc)
+            raise
+        data = probe.parse_ffprobe_output(path, proc.returncode, stdout, stderr)
+        if cache is not None:
+            cache.put(key, engine, data)
+    xinfo = MediaInfo.from_data(path, data, engine)
+    return xinfo.summarize() if summarize else xinfo
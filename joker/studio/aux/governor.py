@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Size concurrency of ffmpeg jobs by the machine: give each job a share
+of the cores not yet handed out as `-threads`, and hold back launches
+while the load average is high or the estimated memory of running jobs
+would exceed what is available.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+
+from joker.studio.aux.schedule import get_primary_input
+
+# rough peak resident bytes per pixel of a frame, by video encoder;
+# lookahead and reference frames make x264/x265 take GBs at 4K
+codec_bytes_per_pixel = {
+    "libx264": 300,
+    "libx265": 450,
+    "libvpx": 150,
+    "libvpx-vp9": 250,
+    "libaom-av1": 700,
+    "libsvtav1": 400,
+    "copy": 0,
+}
+# ffmpeg picks libx264 for .mp4 and .mkv when no encoder is given
+default_bytes_per_pixel = 300
+# decoding, demuxing, audio, etc.
+base_memory = 150 * 2**20
+
+
+def get_cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def get_available_memory() -> int | None:
+    """MemAvailable of /proc/meminfo in bytes, None if unknown"""
+    try:
+        with open("/proc/meminfo") as fin:
+            for line in fin:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def get_load_average() -> float | None:
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def _is_ffmpeg(cod) -> bool:
+    return os.path.basename(str(cod.executable)) == "ffmpeg"
+
+
+def _get_frame_size(cod):
+    from joker.studio.aux.info import MediaInfo
+
+    path = get_primary_input(cod)
+    if path is None:
+        return None, None
+    try:
+        return MediaInfo(path).get_size()
+    except Exception:
+        return None, None
+
+
+def estimate_memory(cod) -> int:
+    """Rough peak memory of a job in bytes"""
+    if not _is_ffmpeg(cod):
+        return base_memory
+    codec = cod.get("c:v") or cod.get("vcodec")
+    if "vn" in cod or codec == "copy":
+        return base_memory
+    width, height = _get_frame_size(cod)
+    if not width or not height:
+        return base_memory
+    bpp = codec_bytes_per_pixel.get(codec, default_bytes_per_pixel)
+    return base_memory + width * height * bpp
+
+
+def assign_threads(cod, threads: int) -> bool:
+    """
+    Set -threads of an ffmpeg cod: before -i, for decoding, and before
+    each output, for encoding, as options apply only to the file they
+    precede. False if cod is not ffmpeg or has -threads of its own.
+    """
+    from joker.studio.aux.incremental import get_outputs
+
+    if not _is_ffmpeg(cod):
+        return False
+    if "threads" in cod and not getattr(cod, "governed", False):
+        return False
+    cod.governed = True
+    cod["threads"] = threads
+    cod.move_to_end("threads", last=False)
+    outputs = set(get_outputs(cod))
+    pargs = []
+    skip = False
+    for arg in cod.pargs:
+        # those of an earlier attempt
+        if skip or arg == "-threads":
+            skip = not skip
+            continue
+        if str(arg) in outputs:
+            pargs.extend(["-threads", threads])
+        pargs.append(arg)
+    cod.pargs = pargs
+    return True
+
+
+class Governor(object):
+    """
+    Hand out slots to jobs, at most `max_jobs` at a time. A slot is held
+    back while the 1-minute load average exceeds `load_factor` times the
+    cores, or while the memory estimated for running jobs plus the new
+    one exceeds `memory_fraction` of what was available at start.
+    One job is always allowed to run, however large.
+
+    A job launched gets `-threads` as its share of the cores left by the
+    running jobs, among the free slots it may compete for: all cores if
+    it runs alone, e.g. at the end of a batch.
+    """
+
+    poll_interval = 1.0
+    load_factor = 1.25
+    memory_fraction = 0.8
+
+    def __init__(self, max_jobs: int = None):
+        self.cpus = get_cpu_count()
+        self.max_jobs = max(max_jobs or self.cpus, 1)
+        available = get_available_memory()
+        self.memory_budget = None
+        if available is not None:
+            self.memory_budget = int(available * self.memory_fraction)
+        self.running = 0
+        # jobs blocked in slot(), for shares of the cores
+        self.waiting = 0
+        self.threads_in_use = 0
+        self.reserved_memory = 0
+        self._cond = threading.Condition()
+
+    def _saturated(self, memory: int) -> bool:
+        if self.running == 0:
+            return False
+        if self.running >= self.max_jobs:
+            return True
+        if self.memory_budget is not None:
+            if self.reserved_memory + memory > self.memory_budget:
+                return True
+        load = get_load_average()
+        # load of our own jobs counts too, so only throttle beyond them
+        return load is not None and load > self.cpus * self.load_factor
+
+    def _share_threads(self) -> int:
+        # this job and those waiting with it, up to the free slots
+        competing = min(self.max_jobs - self.running, self.waiting)
+        return max((self.cpus - self.threads_in_use) // max(competing, 1), 1)
+
+    @contextlib.contextmanager
+    def slot(self, cod):
+        """
+        Block until cod may be launched, and hold its slot meanwhile;
+        an ffmpeg cod is given -threads for the time being.
+        """
+        memory = estimate_memory(cod)
+        threads = 0
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self._saturated(memory):
+                    self._cond.wait(self.poll_interval)
+                if assign_threads(cod, self._share_threads()):
+                    threads = cod["threads"]
+            finally:
+                self.waiting -= 1
+            self.running += 1
+            self.threads_in_use += threads
+            self.reserved_memory += memory
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running -= 1
+                self.threads_in_use -= threads
+                self.reserved_memory -= memory
+                self._cond.notify_all()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Read duration and dimensions straight from container headers,
+touching only a few KB of the file:
+
+    MP4/MOV         moov/mvhd, trak/tkhd, mdhd, hdlr and the first stsd entry
+    Matroska/WebM   EBML Segment/Info and Segment/Tracks, located via SeekHead
+    WAV             RIFF fmt and data chunks
+
+Results are track dicts in the same shape as those of the probe engines,
+but with only `track_type`, `duration` (ms), `width` and `height`.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+
+from joker.studio.utils import Pathlike
+
+
+class HeaderError(ValueError):
+    pass
+
+
+def _read_exact(fp, n: int) -> bytes:
+    data = fp.read(n)
+    if len(data) != n:
+        raise HeaderError("unexpected end of file")
+    return data
+
+
+# ---------------------------------------------------------------- MP4/MOV
+
+_mp4_containers = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+_mp4_leaves = {b"mvhd", b"tkhd", b"mdhd", b"hdlr", b"stsd"}
+# stsd is read partially; the rest are tiny
+_mp4_leaf_limit = 256
+
+
+def _iter_mp4_boxes(fp, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        fp.seek(pos)
+        size, typ = struct.unpack(">I4s", _read_exact(fp, 8))
+        hsize = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read_exact(fp, 8))[0]
+            hsize = 16
+        elif size == 0:
+            size = end - pos
+        if size < hsize:
+            raise HeaderError("bad box size")
+        yield typ, pos + hsize, pos + size
+        pos += size
+
+
+def _parse_mvhd(data: bytes):
+    if data[0] == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    return timescale, duration
+
+
+def _parse_tkhd(data: bytes):
+    offset = 88 if data[0] == 1 else 76
+    w, h = struct.unpack(">II", data[offset : offset + 8])
+    return w >> 16, h >> 16
+
+
+def _parse_stsd_visual(data: bytes):
+    # full box header (4), entry_count (4), entry size and type (8),
+    # reserved (6), data_reference_index (2), pre_defined etc. (16)
+    if len(data) < 44:
+        return None
+    return struct.unpack(">HH", data[40:44])
+
+
+def _walk_mp4(fp, start: int, end: int, boxes: dict):
+    for typ, pstart, pend in _iter_mp4_boxes(fp, start, end):
+        if typ == b"trak":
+            trak = {}
+            boxes.setdefault("trak", []).append(trak)
+            _walk_mp4(fp, pstart, pend, trak)
+        elif typ in _mp4_containers:
+            _walk_mp4(fp, pstart, pend, boxes)
+        elif typ in _mp4_leaves:
+            fp.seek(pstart)
+            n = min(pend - pstart, _mp4_leaf_limit)
+            boxes[typ.decode()] = _read_exact(fp, n)
+
+
+def read_mp4_tracks(fp, file_size: int) -> list[dict]:
+    for typ, pstart, pend in _iter_mp4_boxes(fp, 0, file_size):
+        if typ == b"moov":
+            break
+    else:
+        raise HeaderError("moov box not found")
+    boxes = {}
+    _walk_mp4(fp, pstart, pend, boxes)
+    if "mvhd" not in boxes:
+        raise HeaderError("mvhd box not found")
+    timescale, duration = _parse_mvhd(boxes["mvhd"])
+    if not timescale or not duration:
+        # e.g. fragmented mp4
+        raise HeaderError("no duration in mvhd")
+    tracks = [{"track_type": "General", "duration": 1000.0 * duration / timescale}]
+    for trak in boxes.get("trak", []):
+        if "hdlr" not in trak or "mdhd" not in trak:
+            continue
+        handler = trak["hdlr"][8:12]
+        timescale, duration = _parse_mvhd(trak["mdhd"])
+        if not timescale:
+            continue
+        data = {"duration": 1000.0 * duration / timescale}
+        if handler == b"vide":
+            data["track_type"] = "Video"
+            size = None
+            if "stsd" in trak:
+                size = _parse_stsd_visual(trak["stsd"])
+            if not size or not all(size):
+                size = _parse_tkhd(trak["tkhd"]) if "tkhd" in trak else None
+            if not size or not all(size):
+                continue
+            data["width"], data["height"] = size
+        elif handler == b"soun":
+            data["track_type"] = "Audio"
+        else:
+            continue
+        tracks.append(data)
+    return tracks
+
+
+# ---------------------------------------------------------------- Matroska
+
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_SEEK_HEAD = 0x114D9B74
+_SEEK = 0x4DBB
+_SEEK_ID = 0x53AB
+_SEEK_POSITION = 0x53AC
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_CLUSTER = 0x1F43B675
+
+# refuse to read Info/Tracks elements larger than this
+_ebml_payload_limit = 1 << 20
+
+
+def _read_vint(buf: bytes, pos: int, keep_marker: bool):
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8:
+        raise HeaderError("bad EBML variable-size integer")
+    value = first if keep_marker else first & (mask - 1)
+    for b in buf[pos + 1 : pos + length]:
+        value = (value << 8) | b
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        # all ones: unknown size
+        value = None
+    return value, pos + length
+
+
+def _iter_ebml_elements(buf: bytes, pos: int = 0, end: int = None):
+    end = len(buf) if end is None else end
+    while pos < end:
+        eid, pos = _read_vint(buf, pos, True)
+        size, pos = _read_vint(buf, pos, False)
+        if size is None or pos + size > end:
+            raise HeaderError("truncated EBML element")
+        yield eid, buf[pos : pos + size]
+        pos += size
+
+
+def _read_ebml_header(fp):
+    """Read id and size of the element at current position of fp"""
+    head = fp.read(12)
+    if len(head) < 2:
+        raise HeaderError("unexpected end of file")
+    eid, pos = _read_vint(head, 0, True)
+    size, pos = _read_vint(head, pos, False)
+    return eid, size, pos
+
+
+def _ebml_uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def _ebml_float(data: bytes) -> float:
+    if len(data) == 4:
+        return struct.unpack(">f", data)[0]
+    if len(data) == 8:
+        return struct.unpack(">d", data)[0]
+    raise HeaderError("bad EBML float")
+
+
+def _parse_mkv_seek_head(data: bytes) -> dict:
+    positions = {}
+    for eid, payload in _iter_ebml_elements(data):
+        if eid != _SEEK:
+            continue
+        seek = dict(_iter_ebml_elements(payload))
+        if _SEEK_ID in seek and _SEEK_POSITION in seek:
+            target = _ebml_uint(seek[_SEEK_ID])
+            positions.setdefault(target, _ebml_uint(seek[_SEEK_POSITION]))
+    return positions
+
+
+def _parse_mkv_info(data: bytes):
+    info = dict(_iter_ebml_elements(data))
+    scale = _ebml_uint(info[_TIMECODE_SCALE]) if _TIMECODE_SCALE in info else 10**6
+    if _DURATION not in info:
+        return None
+    return _ebml_float(info[_DURATION]) * scale / 10**6
+
+
+def _parse_mkv_tracks(data: bytes, duration) -> list[dict]:
+    tracks = []
+    for eid, payload in _iter_ebml_elements(data):
+        if eid != _TRACK_ENTRY:
+            continue
+        entry = dict(_iter_ebml_elements(payload))
+        ttype = _ebml_uint(entry.get(_TRACK_TYPE, b""))
+        if ttype == 1 and _VIDEO in entry:
+            video = dict(_iter_ebml_elements(entry[_VIDEO]))
+            if _PIXEL_WIDTH not in video or _PIXEL_HEIGHT not in video:
+                continue
+            tracks.append(
+                {
+                    "track_type": "Video",
+                    "duration": duration,
+                    "width": _ebml_uint(video[_PIXEL_WIDTH]),
+                    "height": _ebml_uint(video[_PIXEL_HEIGHT]),
+                }
+            )
+        elif ttype == 2:
+            tracks.append({"track_type": "Audio", "duration": duration})
+    return tracks
+
+
+def read_mkv_tracks(fp, file_size: int) -> list[dict]:
+    eid, size, hlen = _read_ebml_header(fp)
+    if eid != _EBML or size is None:
+        raise HeaderError("not an EBML file")
+    fp.seek(hlen + size)
+    eid, _, seg_hlen = _read_ebml_header(fp)
+    if eid != _SEGMENT:
+        raise HeaderError("Segment element not found")
+    seg_start = hlen + size + seg_hlen
+    wanted = {_INFO: None, _TRACKS: None}
+    positions = {}
+    pos = seg_start
+    # linear scan of top level elements until the first Cluster
+    while pos < file_size and None in wanted.values():
+        fp.seek(pos)
+        eid, size, hlen = _read_ebml_header(fp)
+        if eid == _CLUSTER or size is None:
+            break
+        if eid in wanted or eid == _SEEK_HEAD:
+            if size > _ebml_payload_limit:
+                raise HeaderError("EBML element too large")
+            fp.seek(pos + hlen)
+            payload = _read_exact(fp, size)
+            if eid == _SEEK_HEAD:
+                positions.update(_parse_mkv_seek_head(payload))
+            else:
+                wanted[eid] = payload
+        pos += hlen + size
+    # elements placed after the clusters, e.g. by some muxers
+    for eid, payload in wanted.items():
+        if payload is not None or eid not in positions:
+            continue
+        fp.seek(seg_start + positions[eid])
+        eid_, size, hlen = _read_ebml_header(fp)
+        if eid_ != eid or size is None or size > _ebml_payload_limit:
+            raise HeaderError("bad SeekHead position")
+        fp.seek(seg_start + positions[eid] + hlen)
+        wanted[eid] = _read_exact(fp, size)
+    if wanted[_INFO] is None or wanted[_TRACKS] is None:
+        raise HeaderError("Info or Tracks element not found")
+    duration = _parse_mkv_info(wanted[_INFO])
+    tracks = [{"track_type": "General", "duration": duration}]
+    tracks.extend(_parse_mkv_tracks(wanted[_TRACKS], duration))
+    return tracks
+
+
+# ---------------------------------------------------------------- WAV
+
+
+def read_wav_tracks(fp, file_size: int) -> list[dict]:
+    riff, _, wave = struct.unpack("<4sI4s", _read_exact(fp, 12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise HeaderError("not a RIFF/WAVE file")
+    byte_rate = None
+    pos = 12
+    while pos + 8 <= file_size:
+        fp.seek(pos)
+        cid, size = struct.unpack("<4sI", _read_exact(fp, 8))
+        if cid == b"fmt ":
+            fmt = _read_exact(fp, min(size, 16))
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+        elif cid == b"data":
+            if not byte_rate:
+                raise HeaderError("data chunk before fmt chunk")
+            # size of a still-being-written file may be a placeholder
+            size = min(size, file_size - pos - 8)
+            duration = 1000.0 * size / byte_rate
+            return [
+                {"track_type": "General", "duration": duration},
+                {"track_type": "Audio", "duration": duration},
+            ]
+        pos += 8 + size + size % 2
+    raise HeaderError("data chunk not found")
+
+
+# ----------------------------------------------------------------
+
+_readers = {
+    ".mp4": read_mp4_tracks,
+    ".m4v": read_mp4_tracks,
+    ".m4a": read_mp4_tracks,
+    ".mov": read_mp4_tracks,
+    ".mkv": read_mkv_tracks,
+    ".mka": read_mkv_tracks,
+    ".webm": read_mkv_tracks,
+    ".wav": read_wav_tracks,
+}
+
+
+def read_header_tracks(path: Pathlike) -> list[dict] | None:
+    """Tracks from container headers, or None if unsupported or unparsable"""
+    ext = os.path.splitext(str(path))[1].lower()
+    reader = _readers.get(ext)
+    if reader is None:
+        return None
+    try:
+        with open(path, "rb") as fp:
+            file_size = os.fstat(fp.fileno()).st_size
+            return reader(fp, file_size)
+    except (HeaderError, IndexError, KeyError, struct.error):
+        return None
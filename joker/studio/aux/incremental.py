@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Make-style incremental runs. After a job succeeds, a fingerprint of
+its inputs (size, mtime), its exact arguments and the version of the
+executable is recorded next to its output, as `.<output-name>.dio-fp`.
+A job whose output exists with a matching fingerprint is up to date.
+"""
+
+from __future__ import annotations
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+
+# options which do not change what is produced
+neutral_options = {"-y", "-n", "-nostdin"}
+# likewise, but followed by a value
+neutral_valued_options = {"-threads"}
+
+
+@functools.lru_cache(maxsize=None)
+def get_tool_version(executable: str) -> str:
+    """First line of `<executable> -version`, e.g. of ffmpeg"""
+    try:
+        cp = subprocess.run([executable, "-version"], capture_output=True)
+    except OSError:
+        return ""
+    lines = cp.stdout.decode(errors="replace").splitlines()
+    return lines[0].strip() if lines else ""
+
+
+def get_command_version(cod) -> str:
+    """Version of what carries out cod, see InProcessCommand.version"""
+    version = getattr(cod, "version", None)
+    if version is not None:
+        return version
+    return get_tool_version(str(cod.executable))
+
+
+def get_output(cod) -> str | None:
+    if not cod.pargs:
+        return None
+    return str(cod.pargs[-1])
+
+
+def get_outputs(cod) -> list[str]:
+    """All outputs, the one of get_output() last"""
+    output = get_output(cod)
+    if output is None:
+        return []
+    return [str(p) for p in getattr(cod, "outputs", [])] + [output]
+
+
+def get_inputs(cod) -> list[str]:
+    outputs = get_outputs(cod)
+    args = cod.as_args()[1:]
+    inputs = [a for a in args if a not in outputs and os.path.isfile(a)]
+    # e.g. subtitle files named inside filter strings
+    for path in getattr(cod, "inputs", []):
+        path = str(path)
+        if path not in inputs and os.path.isfile(path):
+            inputs.append(path)
+    return inputs
+
+
+def _pattern_to_glob(path: str) -> str:
+    # image sequences like x.Thumb_%04d.jpg
+    return re.sub(r"%0?\d*d", "*", glob.escape(path))
+
+
+def output_exists(output: str) -> bool:
+    if "%" in os.path.basename(output):
+        return any(glob.iglob(_pattern_to_glob(output)))
+    return os.path.exists(output)
+
+
+def remove_output(output: str):
+    """Remove an output, or the files of an image sequence, if any"""
+    if "%" in os.path.basename(output):
+        paths = glob.glob(_pattern_to_glob(output))
+    else:
+        paths = [output] if os.path.lexists(output) else []
+    for path in paths:
+        os.remove(path)
+
+
+def get_normalized_args(cod) -> list[str]:
+    """Arguments of cod, without those not affecting the output"""
+    args = []
+    skip = False
+    for arg in cod.as_args():
+        if skip:
+            skip = False
+        elif arg in neutral_valued_options:
+            skip = True
+        elif arg not in neutral_options:
+            args.append(arg)
+    return args
+
+
+def get_fingerprint_path(output: str) -> str:
+    dir_, name = os.path.split(output)
+    return os.path.join(dir_, "." + name + ".dio-fp")
+
+
+def compute_fingerprint(cod) -> dict:
+    inputs = []
+    for path in get_inputs(cod):
+        st = os.stat(path)
+        inputs.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    record = {
+        "args": get_normalized_args(cod),
+        "inputs": inputs,
+        "version": get_command_version(cod),
+    }
+    text = json.dumps(record, sort_keys=True)
+    record["digest"] = hashlib.sha1(text.encode()).hexdigest()
+    return record
+
+
+def is_up_to_date(cod) -> bool:
+    output = get_output(cod)
+    if output is None or output == "-":
+        return False
+    if not all(output_exists(p) for p in get_outputs(cod)):
+        return False
+    try:
+        with open(get_fingerprint_path(output)) as fin:
+            recorded = json.load(fin)
+    except (OSError, ValueError):
+        return False
+    return recorded.get("digest") == compute_fingerprint(cod)["digest"]
+
+
+def record_fingerprint(cod, fingerprint: dict = None):
+    """Record a fingerprint, preferably computed before the job ran"""
+    output = get_output(cod)
+    if output is None or output == "-":
+        return
+    if fingerprint is None:
+        fingerprint = compute_fingerprint(cod)
+    path = get_fingerprint_path(output)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fout:
+        json.dump(fingerprint, fout, indent=2)
+    os.replace(tmp, path)
@@ -1,19 +1,146 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+import functools
+import warnings
+from collections import namedtuple
+
+from joker.studio.aux import headers, probe
+from joker.studio.aux.utils import iter_concurrently
+from joker.studio.aux.probecache import get_probe_cache, stat_key
+from joker.studio.aux.profiling import span
+from joker.studio.aux.summary import MediaSummary
+from joker.studio.utils import env_flag
+
+
+class Track(object):
+    """A media track; missing attributes read as None, like pymediainfo"""
+
+    def __init__(self, data: dict):
+        self.__dict__.update(data)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return None
+
+    def __repr__(self):
+        return "<Track track_type={!r}>".format(self.track_type)
+
+    def to_data(self):
+        return dict(self.__dict__)
 
-class MediaInfo(object):
-    def __init__(self, path):
-        # pymediainfo is slow to import, 600ms+
-        import pymediainfo
 
+ProbeResult = namedtuple("ProbeResult", ["path", "info", "error"])
+
+
+def probe_file(path, summarize=True, engine=None):
+    xinfo = MediaInfo(path, engine=engine)
+    if summarize:
+        return xinfo.summarize()
+    # do the actual probing in the worker
+    xinfo.tracks
+    xinfo._cache = None
+    return xinfo
+
+
+class MediaInfo(object):
+    def __init__(self, path, cache=True, engine=None):
         self.path = str(path)
-        self.minfo = pymediainfo.MediaInfo.parse(path)
+        self.engine = probe.get_engine_name(engine)
+        self._cache = get_probe_cache() if cache else None
+        self._cache_key = None
+        self._tracks = None
+        self._header_tracks = None
+        self._minfo = None
+
+    @classmethod
+    def from_data(cls, path, data, engine=None):
+        """Wrap tracks already probed, e.g. asynchronously"""
+        xinfo = cls(path, cache=False, engine=engine)
+        xinfo._tracks = [Track(d) for d in data]
+        return xinfo
+
+    @property
+    def header_fast_path(self) -> bool:
+        # duration and size are read from container headers when possible,
+        # set JOKER_STUDIO_HEADER_PROBE=0 to always use the full probe;
+        # read per call, as under `dio serve` it differs per request
+        return env_flag("JOKER_STUDIO_HEADER_PROBE")
+
+    @property
+    def minfo(self):
+        """Deprecated, the pymediainfo.MediaInfo of the file; use tracks"""
+        msg = "MediaInfo.minfo is deprecated, use MediaInfo.tracks"
+        warnings.warn(msg, DeprecationWarning, stacklevel=2)
+        if self._minfo is None:
+            # pymediainfo is slow to import, 600ms+
+            import pymediainfo
+
+            self._minfo = pymediainfo.MediaInfo.parse(self.path)
+        return self._minfo
+
+    @property
+    def tracks(self):
+        if self._tracks is None:
+            self._tracks = [Track(d) for d in self._probe()]
+        return self._tracks
+
+    def _cache_lookup(self):
+        # look up only once, not to count a miss twice
+        if self._cache is None or self._cache_key is not None:
+            return None
+        with span("probe.cache", path=self.path):
+            self._cache_key = stat_key(self.path)
+            return self._cache.get(self._cache_key, self.engine)
+
+    def _probe(self):
+        data = self._cache_lookup()
+        if data is None:
+            with span("probe." + self.engine, path=self.path):
+                data = probe.engines[self.engine](self.path)
+            if self._cache is not None:
+                self._cache.put(self._cache_key, self.engine, data)
+        return data
+
+    def _quick_tracks(self):
+        """Tracks of the full probe if at hand, otherwise from headers"""
+        if self._tracks is not None:
+            return self._tracks
+        data = self._cache_lookup()
+        if data is not None:
+            self._tracks = [Track(d) for d in data]
+            return self._tracks
+        if self._header_tracks is None:
+            data = None
+            if self.header_fast_path:
+                with span("probe.headers", path=self.path):
+                    data = headers.read_header_tracks(self.path)
+            self._header_tracks = [Track(d) for d in data or []]
+        return self._header_tracks
+
+    @staticmethod
+    def _filter_tracks(tracks, *track_types):
+        found = []
+        for tt in track_types:
+            tt = tt.lower()
+            found.extend(tr for tr in tracks if tr.track_type.lower() == tt)
+        return found
+
+    def _find_quick(self, attr, *track_types):
+        tracks = self._filter_tracks(self._quick_tracks(), *track_types)
+        if tracks and getattr(tracks[0], attr) is not None:
+            return tracks
+        return self._filter_tracks(self.tracks, *track_types)
+
+    def _get_quick_track(self, attr, track_type):
+        tracks = self._filter_tracks(self._quick_tracks(), track_type)
+        if len(tracks) == 1 and getattr(tracks[0], attr) is not None:
+            return tracks[0]
+        return self.get_track(track_type)
 
     def find_tracks(self, track_type):
-        tt = track_type.lower()
-        tracks = self.minfo.tracks
-        return [tr for tr in tracks if tr.track_type.lower() == tt]
+        return self._filter_tracks(self.tracks, track_type)
 
     def get_track(self, track_type):
         tracks = self.find_tracks(track_type)
@@ -40,21 +167,43 @@ class MediaInfo(object):
         return self.get_track("general")
 
     def get_audio_duration(self):
-        return float(self.audio.duration) / 1000
+        return float(self._get_quick_track("duration", "audio").duration) / 1000
 
     def get_video_duration(self):
-        return float(self.video.duration) / 1000
+        return float(self._get_quick_track("duration", "video").duration) / 1000
 
     def get_size(self):
-        tracks = self.find_tracks("Video") + self.find_tracks("Image")
+        tracks = self._find_quick("width", "Video", "Image")
         if not tracks:
             return None, None
         tr = tracks[0]
         return tr.width, tr.height
 
     def get_duration(self):
-        tracks = self.find_tracks("Video") + self.find_tracks("Audio")
+        tracks = self._find_quick("duration", "Video", "Audio")
         if not tracks:
             return None
         tr = tracks[0]
         return float(tr.duration) / 1000
+
+    def summarize(self) -> MediaSummary:
+        """Reduce to a compact record; header info is used if complete"""
+        tracks = self._quick_tracks()
+        if not tracks or any(tr.duration is None for tr in tracks):
+            tracks = self.tracks
+        return MediaSummary.from_tracks(self.path, tracks)
+
+    @classmethod
+    def probe_many(
+        cls, paths, workers=4, summarize=True, processes=False, ordered=False
+    ):
+        """
+        Probe files concurrently, yielding ProbeResult(path, info, error)
+        in order of completion, or of paths if `ordered`; `info` is a
+        MediaSummary if `summarize`, or else a MediaInfo.
+        A failed file gives an `error`, not an abort.
+        """
+        func = functools.partial(probe_file, summarize=summarize)
+        results = iter_concurrently(func, paths, workers, processes, ordered=ordered)
+        for path, info, error in results:
+            yield ProbeResult(path, info, error)
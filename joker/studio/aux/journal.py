@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Append-only journal of finished batch items, as JSON lines, so that an
+interrupted batch can be resumed without redoing completed items.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+
+from joker.studio.aux.incremental import (
+    get_normalized_args,
+    get_output,
+    output_exists,
+)
+from joker.studio.aux.progress import JsonLinesReport
+from joker.studio.utils import Pathlike
+
+default_journal_path = ".dio-journal.jsonl"
+
+
+def get_job_key(cod) -> str:
+    text = json.dumps(get_normalized_args(cod))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def get_partial_path(output: str) -> str:
+    """Where an output is written until complete, keeping its extension"""
+    dir_, name = os.path.split(output)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(dir_, ".{}.dio-part{}".format(stem, ext))
+
+
+class Journal(object):
+    """
+    Each line is a JSON object with at least "key" and "status";
+    the last line of a key wins.
+    """
+
+    def __init__(self, path: Pathlike = default_journal_path):
+        self.path = path
+        self._writer = JsonLinesReport(path)
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            fin = open(self.path)
+        except FileNotFoundError:
+            return
+        with fin:
+            for line in fin:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash
+                    continue
+                self.entries[entry["key"]] = entry
+
+    def get_status(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        return entry and entry.get("status")
+
+    def is_done(self, key: str) -> bool:
+        return self.get_status(key) == "done"
+
+    def record(self, key: str, status: str, **fields):
+        entry = {"key": key, "status": status, "time": time.time()}
+        entry.update(fields)
+        self.entries[key] = entry
+        self._writer.write(entry)
+
+    def is_job_done(self, cod) -> bool:
+        """Whether cod is journaled as done and its output is still there"""
+        output = get_output(cod)
+        if not self.is_done(get_job_key(cod)):
+            return False
+        return output is None or output_exists(output)
+
+    def record_job(self, cod, status: str):
+        key = get_job_key(cod)
+        if status == "done" and self.is_done(key):
+            # e.g. skipped on resume
+            return
+        self.record(key, status, output=get_output(cod))
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Content-addressed cache of command outputs. A job is keyed by the
+content hashes of its inputs, its arguments with file names replaced by
+those hashes, the extension of its output and the version of the
+executable. A hit is put in place by reflink or copy, instead of
+running the command again; never by hard link, which a later rebuild
+of the output would write through into the cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from joker.studio.aux.incremental import (
+    get_command_version,
+    get_inputs,
+    get_normalized_args,
+    get_output,
+)
+from joker.studio.aux.probecache import add_to_counters, connect, stat_key
+from joker.studio.utils import Pathlike, get_cache_dir, parse_size
+
+_schema = """\
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ctime REAL NOT NULL,
+    atime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_atime ON outputs (atime);
+CREATE TABLE IF NOT EXISTS digests (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# linux/fs.h, clone a file sharing its extents on btrfs, xfs, etc.
+_FICLONE = 0x40049409
+
+
+def reflink(src: Pathlike, dst: Pathlike):
+    import fcntl
+
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.remove(dst)
+            raise
+
+
+def clone_file(src: Pathlike, dst: Pathlike) -> str:
+    """Reflink, else copy src to dst; return how"""
+    try:
+        reflink(src, dst)
+        return "reflink"
+    except (OSError, ImportError):
+        pass
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def is_cacheable(cod) -> bool:
+    output = get_output(cod)
+    if not output or output == "-":
+        return False
+    # only single outputs are cached
+    if getattr(cod, "outputs", None):
+        return False
+    # image sequences like x.Thumb_%04d.jpg
+    return "%" not in os.path.basename(output)
+
+
+class OutputCache(object):
+    """
+    Outputs stored as files under `<cache-dir>/outputs/`, indexed in
+    SQLite. Least recently used outputs are evicted beyond `max_bytes`,
+    and the earliest remembered input digests beyond `max_digests`.
+    Stored files are read-only; outputs restored from them are not.
+    """
+
+    counter_names = ["hits", "misses", "stores", "bytes_saved"]
+
+    def __init__(
+        self, path: Pathlike = None, max_bytes=20 * 2**30, max_digests=100_000
+    ):
+        if path is None:
+            path = get_cache_dir() / "outputs"
+        self.path = str(path)
+        os.makedirs(self.path, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_digests = max_digests
+        self.counters = dict.fromkeys(self.counter_names, 0)
+        self._lock = threading.Lock()
+        self._conn = connect(os.path.join(self.path, "index.sqlite3"), _schema)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def get_digest(self, path: Pathlike) -> str:
+        """sha1 of the content of a file, remembered by its stat"""
+        from joker.filesys.utils import checksum
+
+        key = stat_key(path)
+        sql = (
+            "SELECT digest FROM digests"
+            " WHERE dev=? AND ino=? AND size=? AND mtime_ns=?"
+        )
+        with self._lock:
+            row = self._conn.execute(sql, key).fetchone()
+        if row is not None:
+            return row[0]
+        digest = checksum(path, algo="sha1").hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM digests WHERE dev=? AND ino=?", (key[0], key[1])
+            )
+            self._conn.execute(
+                "INSERT INTO digests VALUES (?, ?, ?, ?, ?)", key + (digest,)
+            )
+        return digest
+
+    def compute_key(self, cod) -> str:
+        output = get_output(cod)
+        digests = {p: self.get_digest(p) for p in get_inputs(cod)}
+        args = []
+        for arg in get_normalized_args(cod)[1:]:
+            if arg == output:
+                arg = "@output" + os.path.splitext(output)[1]
+            # also file names inside filter strings
+            for p, digest in digests.items():
+                arg = arg.replace(p, "@" + digest)
+            args.append(arg)
+        record = {
+            "args": args,
+            "executable": os.path.basename(str(cod.executable)),
+            "version": get_command_version(cod),
+        }
+        text = json.dumps(record, sort_keys=True)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def _object_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.path, key[:2], key[2:] + ext)
+
+    def restore(self, key: str, output: str) -> bool:
+        """Put the cached output of key at path output, if there is one"""
+        with self._lock:
+            sql = "SELECT ext, size FROM outputs WHERE key=?"
+            row = self._conn.execute(sql, (key,)).fetchone()
+        obj = row and self._object_path(key, row[0])
+        if row is None or not os.path.isfile(obj):
+            self._count("misses")
+            return False
+        tmp = "{}.{}.{}.tmp".format(output, os.getpid(), threading.get_ident())
+        try:
+            clone_file(obj, tmp)
+            os.replace(tmp, output)
+        except OSError:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            self._count("misses")
+            return False
+        with self._lock:
+            sql = "UPDATE outputs SET atime=? WHERE key=?"
+            self._conn.execute(sql, (time.time(), key))
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += row[1]
+        return True
+
+    def store(self, key: str, output: str):
+        ext = os.path.splitext(output)[1]
+        obj = self._object_path(key, ext)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = "{}.{}.{}.tmp".format(obj, os.getpid(), threading.get_ident())
+        clone_file(output, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, obj)
+        now = time.time()
+        size = os.path.getsize(obj)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)",
+                (key, ext, size, now, now),
+            )
+            self.counters["stores"] += 1
+            self._evict(self.max_bytes)
+            self._evict_digests(self.max_digests)
+
+    def _evict_digests(self, max_digests) -> int:
+        # by rowid, which grows as digests are (re)computed
+        count = self._conn.execute("SELECT count(*) FROM digests").fetchone()[0]
+        excess = count - max_digests
+        if excess <= 0:
+            return 0
+        sql = (
+            "DELETE FROM digests WHERE rowid IN"
+            " (SELECT rowid FROM digests ORDER BY rowid LIMIT ?)"
+        )
+        self._conn.execute(sql, (excess,))
+        return excess
+
+    def _evict(self, max_bytes) -> int:
+        total = self._conn.execute("SELECT sum(size) FROM outputs").fetchone()[0]
+        total = total or 0
+        rows = self._conn.execute("SELECT key, ext, size FROM outputs ORDER BY atime")
+        evicted = []
+        for key, ext, size in rows.fetchall():
+            if total <= max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+            try:
+                os.remove(self._object_path(key, ext))
+            except FileNotFoundError:
+                pass
+        self._conn.executemany(
+            "DELETE FROM outputs WHERE key=?", [(k,) for k in evicted]
+        )
+        return len(evicted)
+
+    def evict(self, max_bytes=None) -> int:
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        with self._lock:
+            self._evict_digests(self.max_digests)
+            return self._evict(max_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._evict(0)
+            self._evict_digests(0)
+            self._conn.execute("DELETE FROM counters")
+            self.counters = dict.fromkeys(self.counter_names, 0)
+
+    def flush_counters(self):
+        with self._lock:
+            add_to_counters(self._conn, self.counters)
+            self.counters = dict.fromkeys(self.counter_names, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT name, value FROM counters")
+            totals = dict(rows.fetchall())
+            sql = "SELECT count(*), coalesce(sum(size), 0) FROM outputs"
+            count, size = self._conn.execute(sql).fetchone()
+            sql = "SELECT count(*) FROM digests"
+            digests = self._conn.execute(sql).fetchone()[0]
+            stats = {
+                "path": self.path,
+                "entries": count,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "digests": digests,
+            }
+            for name in self.counter_names:
+                stats[name] = totals.get(name, 0) + self.counters[name]
+        return stats
+
+    def close(self):
+        self.flush_counters()
+        self._conn.close()
+
+
+_output_cache = None
+_output_cache_lock = threading.Lock()
+
+
+def get_output_cache() -> OutputCache:
+    """The shared cache, capped by $JOKER_STUDIO_OUTPUT_CACHE_SIZE (e.g. 50G)"""
+    global _output_cache
+    with _output_cache_lock:
+        if _output_cache is None:
+            size = os.environ.get("JOKER_STUDIO_OUTPUT_CACHE_SIZE")
+            if size:
+                _output_cache = OutputCache(max_bytes=parse_size(size))
+            else:
+                _output_cache = OutputCache()
+            atexit.register(_output_cache.close)
+    return _output_cache
+
+
+def run(prog=None, args=None):
+    desc = "show or maintain the content-addressed output cache"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--clear", action="store_true", help="remove all entries")
+    group.add_argument(
+        "--prune",
+        type=parse_size,
+        metavar="SIZE",
+        help="evict least recently used outputs beyond SIZE, e.g. 10G",
+    )
+    ns = parser.parse_args(args)
+    cache = get_output_cache()
+    if ns.clear:
+        cache.clear()
+    elif ns.prune is not None:
+        cache.evict(ns.prune)
+    for key, val in cache.stats().items():
+        print("{}: {}".format(key, val))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Input paths of batch commands, consumed lazily, so that processing
+starts at once and memory stays flat for any number of files:
+from arguments, from directories walked with -R/--recursive, or from
+a NUL-separated list given with --from-file, e.g.
+
+    find /media -name '*.mp4' -print0 | dio conv -f mkv --from-file -
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import Iterable, Iterator
+
+from joker.cast.syntax import printerr
+
+from joker.studio.utils import Pathlike
+
+
+def _has_extension(name: str, extensions) -> bool:
+    return extensions is None or os.path.splitext(name)[1] in extensions
+
+
+def walk_files(top: Pathlike, extensions=None) -> Iterator[str]:
+    """
+    Files under top, by name, those of a dir before its subdirs.
+    Hidden files and dirs, e.g. partial outputs, are left out;
+    symlinks to dirs are not followed.
+    """
+    stack = [os.fspath(top)]
+    while stack:
+        dir_ = stack.pop()
+        try:
+            with os.scandir(dir_) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            printerr(e)
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if _has_extension(entry.name, extensions):
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+
+def read_nul_separated(fin, bufsize=65536) -> Iterator[str]:
+    """Paths separated by NUL in a binary file, as by find -print0"""
+    rest = b""
+    while True:
+        chunk = fin.read(bufsize)
+        if not chunk:
+            break
+        parts = (rest + chunk).split(b"\0")
+        rest = parts.pop()
+        for part in parts:
+            if part:
+                yield os.fsdecode(part)
+    if rest:
+        yield os.fsdecode(rest)
+
+
+def _iter_path_list(path: str) -> Iterator[str]:
+    if path == "-":
+        yield from read_nul_separated(sys.stdin.buffer)
+        return
+    with open(path, "rb") as fin:
+        yield from read_nul_separated(fin)
+
+
+def iter_input_paths(
+    paths: Iterable[str], recursive=False, from_file=None, extensions=None
+) -> Iterator[str]:
+    """
+    Paths given, then those listed in from_file ("-" for stdin);
+    with recursive, dirs among them are walked for files of extensions.
+    """
+    sources = [iter(paths)]
+    if from_file is not None:
+        sources.append(_iter_path_list(from_file))
+    for source in sources:
+        for path in source:
+            if recursive and os.path.isdir(path):
+                yield from walk_files(path, extensions)
+            else:
+                yield path
+
+
+def add_input_options(argparser, dest="paths", help="input files"):
+    """Instead of positional PATH arguments with nargs="+" """
+    argparser.add_argument(dest, metavar="PATH", nargs="*", help=help)
+    argparser.add_argument(
+        "-R",
+        "--recursive",
+        action="store_true",
+        help="walk dirs among PATHs for files of known extensions",
+    )
+    argparser.add_argument(
+        "--from-file",
+        metavar="FILE",
+        help="read NUL-separated paths from FILE, - for stdin, "
+        "e.g. from find -print0",
+    )
+
+
+def get_input_paths(argparser, ns, extensions=None, dest="paths") -> Iterator[str]:
+    """Paths of options of add_input_options(), lazily"""
+    paths = getattr(ns, dest)
+    if not paths and ns.from_file is None:
+        argparser.error("no PATH given, nor --from-file")
+    return iter_input_paths(paths, ns.recursive, ns.from_file, extensions)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Probe engines. Each engine turns a media file into a list of track dicts,
+in the shape of pymediainfo's Track.to_data() -- notably `track_type`,
+`width`, `height` and `duration` (in milliseconds).
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import shutil
+import subprocess
+from fractions import Fraction
+
+from joker.studio.utils import Pathlike
+
+
+def probe_with_mediainfo(path: Pathlike) -> list[dict]:
+    # pymediainfo is slow to import, 600ms+
+    import pymediainfo
+
+    minfo = pymediainfo.MediaInfo.parse(path)
+    tracks = []
+    for tr in minfo.tracks:
+        data = {k: v for k, v in vars(tr).items() if k != "xml_dom_fragment"}
+        tracks.append(data)
+    return tracks
+
+
+# ffprobe `format_name` of single-image inputs, reported as "Image" tracks
+_image_formats = {
+    "bmp_pipe",
+    "gif",
+    "image2",
+    "jpeg_pipe",
+    "png_pipe",
+    "tiff_pipe",
+    "webp_pipe",
+}
+
+_ffprobe_track_types = {
+    "video": "Video",
+    "audio": "Audio",
+    "subtitle": "Text",
+}
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return float(seconds) * 1000
+
+
+def _fps(rate):
+    try:
+        return float(Fraction(rate))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _convert_ffprobe_stream(stream: dict, fmt: dict) -> dict | None:
+    codec_type = stream.get("codec_type")
+    if stream.get("disposition", {}).get("attached_pic"):
+        # cover art of audio files
+        return None
+    if codec_type == "video" and fmt.get("format_name") in _image_formats:
+        track_type = "Image"
+    else:
+        track_type = _ffprobe_track_types.get(codec_type, "Other")
+    data = {
+        "track_type": track_type,
+        "stream_identifier": stream.get("index"),
+        "codec_name": stream.get("codec_name"),
+        "duration": _ms(stream.get("duration") or fmt.get("duration")),
+    }
+    if codec_type == "video":
+        data["width"] = stream.get("width")
+        data["height"] = stream.get("height")
+        data["pix_fmt"] = stream.get("pix_fmt")
+        data["frame_rate"] = _fps(stream.get("avg_frame_rate"))
+    elif codec_type == "audio":
+        data["channel_s"] = stream.get("channels")
+        data["sampling_rate"] = stream.get("sample_rate")
+    if stream.get("bit_rate"):
+        data["bit_rate"] = int(stream["bit_rate"])
+    return data
+
+
+def ffprobe_args(path: Pathlike) -> list[str]:
+    return [
+        "ffprobe",
+        "-v",
+        "error",
+        "-print_format",
+        "json",
+        "-show_format",
+        "-show_streams",
+        str(path),
+    ]
+
+
+def probe_with_ffprobe(path: Pathlike) -> list[dict]:
+    cp = subprocess.run(ffprobe_args(path), capture_output=True)
+    return parse_ffprobe_output(path, cp.returncode, cp.stdout, cp.stderr)
+
+
+def parse_ffprobe_output(path, returncode, stdout: bytes, stderr: bytes) -> list[dict]:
+    if returncode:
+        msg = stderr.decode(errors="replace").strip()
+        raise ValueError("ffprobe failed: {}".format(msg or path))
+    info = json.loads(stdout)
+    fmt = info.get("format", {})
+    general = {
+        "track_type": "General",
+        "format_name": fmt.get("format_name"),
+        "duration": _ms(fmt.get("duration")),
+        "file_size": fmt.get("size"),
+        "overall_bit_rate": fmt.get("bit_rate"),
+    }
+    tracks = [general]
+    for stream in info.get("streams", []):
+        data = _convert_ffprobe_stream(stream, fmt)
+        if data is not None:
+            tracks.append(data)
+    return tracks
+
+
+engines = {
+    "ffprobe": probe_with_ffprobe,
+    "mediainfo": probe_with_mediainfo,
+}
+
+
+@functools.cache
+def _default_engine():
+    # ffprobe spares the 600ms+ import of pymediainfo
+    if shutil.which("ffprobe"):
+        return "ffprobe"
+    return "mediainfo"
+
+
+def get_engine_name(name: str = None) -> str:
+    name = name or os.environ.get("JOKER_STUDIO_PROBE_ENGINE") or _default_engine()
+    if name not in engines:
+        raise ValueError("unknown probe engine: {}".format(name))
+    return name
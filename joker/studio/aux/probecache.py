@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from joker.studio.utils import Pathlike, env_flag, get_cache_dir
+
+_schema = """\
+CREATE TABLE IF NOT EXISTS probes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    data TEXT NOT NULL,
+    atime REAL NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, engine)
+);
+CREATE INDEX IF NOT EXISTS probes_atime ON probes (atime);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def connect(path: Pathlike, schema: str) -> sqlite3.Connection:
+    """A connection in WAL mode, shared by threads under a lock of the caller"""
+    conn = sqlite3.connect(
+        str(path), timeout=30, check_same_thread=False, isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    return conn
+
+
+def add_to_counters(conn: sqlite3.Connection, counts: dict):
+    """Add counts to those in table `counters`"""
+    sql = (
+        "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name)"
+        " DO UPDATE SET value = value + excluded.value"
+    )
+    conn.executemany(sql, list(counts.items()))
+
+
+def stat_key(path: Pathlike) -> tuple:
+    st = os.stat(path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class ProbeCache(object):
+    """
+    Probe results stored in SQLite, keyed by (dev, inode, size, mtime_ns).
+    Least recently used entries are evicted beyond `max_entries`.
+    """
+
+    # refresh atime of a hit entry at most once per this many seconds
+    touch_interval = 3600
+    evict_interval = 1000
+
+    def __init__(self, path: Pathlike = None, max_entries=200_000):
+        if path is None:
+            path = get_cache_dir() / "probes.sqlite3"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = connect(self.path, _schema)
+
+    def get(self, key: tuple, engine: str):
+        sql = (
+            "SELECT data, atime FROM probes"
+            " WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND engine=?"
+        )
+        with self._lock:
+            row = self._conn.execute(sql, key + (engine,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            if now - row[1] > self.touch_interval:
+                sql = (
+                    "UPDATE probes SET atime=?"
+                    " WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND engine=?"
+                )
+                self._conn.execute(sql, (now,) + key + (engine,))
+        return json.loads(row[0])
+
+    def put(self, key: tuple, engine: str, data):
+        text = json.dumps(data, default=str)
+        with self._lock:
+            # entries of an older version of the same file are useless now
+            self._conn.execute(
+                "DELETE FROM probes WHERE dev=? AND ino=? AND engine=?",
+                (key[0], key[1], engine),
+            )
+            self._conn.execute(
+                "INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (engine, text, time.time()),
+            )
+            self._puts += 1
+            if self._puts % self.evict_interval == 0:
+                self._evict(self.max_entries)
+
+    def _evict(self, max_entries):
+        count = self._conn.execute("SELECT count(*) FROM probes").fetchone()[0]
+        excess = count - max_entries
+        if excess <= 0:
+            return 0
+        sql = (
+            "DELETE FROM probes WHERE rowid IN"
+            " (SELECT rowid FROM probes ORDER BY atime LIMIT ?)"
+        )
+        self._conn.execute(sql, (excess,))
+        return excess
+
+    def evict(self, max_entries=None):
+        if max_entries is None:
+            max_entries = self.max_entries
+        with self._lock:
+            return self._evict(max_entries)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM probes")
+            self._conn.execute("DELETE FROM counters")
+        self.hits = self.misses = 0
+
+    def flush_counters(self):
+        with self._lock:
+            add_to_counters(self._conn, {"hits": self.hits, "misses": self.misses})
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT name, value FROM counters")
+            totals = dict(rows.fetchall())
+            count = self._conn.execute("SELECT count(*) FROM probes").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": count,
+            "max_entries": self.max_entries,
+            "hits": totals.get("hits", 0) + self.hits,
+            "misses": totals.get("misses", 0) + self.misses,
+        }
+
+    def close(self):
+        self.flush_counters()
+        self._conn.close()
+
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache | None:
+    """The shared cache, or None if disabled by $JOKER_STUDIO_PROBE_CACHE=0"""
+    global _probe_cache
+    if not env_flag("JOKER_STUDIO_PROBE_CACHE"):
+        return None
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = ProbeCache()
+            atexit.register(_probe_cache.close)
+    return _probe_cache
+
+
+def run(prog=None, args=None):
+    desc = "show or maintain the persistent media probe cache"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--clear", action="store_true", help="remove all entries")
+    group.add_argument(
+        "--prune",
+        type=int,
+        metavar="INT",
+        help="evict least recently used entries beyond INT",
+    )
+    ns = parser.parse_args(args)
+    cache = ProbeCache()
+    if ns.clear:
+        cache.clear()
+    elif ns.prune is not None:
+        cache.evict(ns.prune)
+    for key, val in cache.stats().items():
+        print("{}: {}".format(key, val))
+    cache.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Named spans around the stages of subcommands, e.g. probing, decoding
+and hashing, recorded only when profiling is on:
+
+    with span("probe.ffprobe", path=path):
+        ...
+
+`dio --profile <cmd> ...` prints time per stage; spans can also be
+written as a Chrome trace (chrome://tracing, Perfetto, speedscope).
+Spans in worker processes, as opposed to threads, are not recorded.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ["profiler", "name", "args", "start", "child_time"]
+
+    def __init__(self, profiler: Profiler, name: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = None
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        duration = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_time += duration
+        self.profiler.record(
+            self.name, self.start, duration, duration - self.child_time, self.args
+        )
+        return False
+
+
+class Profiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.started = None
+        self.stopped = None
+        # (name, start, duration, self time, thread id, args)
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def start(self):
+        self.events = []
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        self.stopped = time.perf_counter()
+
+    @property
+    def wall_time(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return _null_span
+        return _Span(self, name, args)
+
+    def record(self, name, start, duration, self_time, args=None):
+        event = name, start, duration, self_time, threading.get_ident(), args
+        with self._lock:
+            self.events.append(event)
+
+    def summarize(self) -> list[dict]:
+        """Stats per span name, the most time consuming first"""
+        stats = {}
+        for name, _, duration, self_time, _, _ in self.events:
+            st = stats.setdefault(
+                name, {"name": name, "calls": 0, "total": 0.0, "self": 0.0, "max": 0.0}
+            )
+            st["calls"] += 1
+            st["total"] += duration
+            st["self"] += self_time
+            st["max"] = max(st["max"], duration)
+        return sorted(stats.values(), key=lambda st: st["self"], reverse=True)
+
+    def format_table(self) -> str:
+        wall = self.wall_time
+        rows = self.summarize()
+        lines = [
+            "{:24} {:>7} {:>10} {:>10} {:>10} {:>6}".format(
+                "stage", "calls", "total(s)", "self(s)", "max(s)", "self%"
+            )
+        ]
+        for st in rows:
+            pct = 100.0 * st["self"] / wall if wall else 0.0
+            lines.append(
+                "{:24} {:7d} {:10.3f} {:10.3f} {:10.3f} {:6.1f}".format(
+                    st["name"], st["calls"], st["total"], st["self"], st["max"], pct
+                )
+            )
+        other = wall - sum(st["self"] for st in rows)
+        # negative with spans in concurrent threads
+        if other > 0:
+            pct = 100.0 * other / wall
+            fmt = "{:24} {:7} {:10} {:10.3f} {:10} {:6.1f}"
+            lines.append(fmt.format("(other)", "", "", other, "", pct))
+        lines.append("{:24} {:7} {:10.3f}".format("(wall)", "", wall))
+        return "\n".join(lines)
+
+    def to_trace(self) -> dict:
+        """In the Trace Event Format, as complete events in microseconds"""
+        pid = os.getpid()
+        events = []
+        for name, start, duration, _, tid, args in self.events:
+            event = {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": round((start - self.started) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = {k: str(v) for k, v in args.items()}
+            events.append(event)
+        events.sort(key=lambda e: e["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: str):
+        with open(path, "w") as fout:
+            json.dump(self.to_trace(), fout)
+
+
+profiler = Profiler()
+
+
+def span(name: str, **args):
+    """A context manager timing a stage, if profiling; cheap otherwise"""
+    return profiler.span(name, **args)
+
+
+# leading options of `dio`, before the subcommand
+profile_options = {
+    "--profile": None,
+    "--profile-trace": "trace",
+    "--profile-cprofile": "cprofile",
+}
+
+
+def split_profile_options(argv: list[str]):
+    """
+    Take --profile, --profile-trace PATH and --profile-cprofile PATH
+    off the front of argv[1:].
+    :return: (options, argv) where options is None if not profiling
+    """
+    options = None
+    rest = list(argv[1:])
+    while rest and rest[0].split("=", 1)[0] in profile_options:
+        opt = rest.pop(0)
+        name, eq, value = opt.partition("=")
+        key = profile_options[name]
+        options = options or {}
+        if key is None:
+            continue
+        if not eq:
+            if not rest:
+                sys.exit("{}: PATH expected".format(name))
+            value = rest.pop(0)
+        options[key] = value
+    return options, argv[:1] + rest
+
+
+def run_profiled(func, *args, trace=None, cprofile=None, file=None):
+    """Call func with profiling on, then print time per stage to file"""
+    file = file or sys.stderr
+    prof = None
+    if cprofile:
+        import cProfile
+
+        prof = cProfile.Profile()
+    profiler.start()
+    if prof is not None:
+        prof.enable()
+    try:
+        return func(*args)
+    finally:
+        if prof is not None:
+            prof.disable()
+        profiler.stop()
+        print(profiler.format_table(), file=file)
+        if prof is not None:
+            prof.dump_stats(cprofile)
+            print("cProfile stats written to", cprofile, file=file)
+        if trace:
+            profiler.write_trace(trace)
+            print("trace written to", trace, file=file)
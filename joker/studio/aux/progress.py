@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Run ffmpeg with `-progress pipe:N -nostats` and parse the key=value
+stream it writes, e.g.
+
+    frame=250
+    fps=49.80
+    out_time_us=10000000
+    total_size=1048624
+    speed=1.99x
+    progress=continue
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+def _to_float(value: str):
+    value = value.strip().rstrip("x")
+    try:
+        return float(value)
+    except ValueError:
+        # e.g. N/A
+        return None
+
+
+def _to_int(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class ProgressParser(object):
+    """Turn lines of -progress output into snapshot dicts"""
+
+    def __init__(self):
+        self._block = {}
+
+    @staticmethod
+    def normalize(block: dict) -> dict:
+        # out_time_ms is in fact in microseconds, like out_time_us
+        us = block.get("out_time_us") or block.get("out_time_ms")
+        us = _to_int(us) if us else None
+        return {
+            "frame": _to_int(block.get("frame", "")),
+            "fps": _to_float(block.get("fps", "")),
+            "out_time": None if us is None else us / 1e6,
+            "total_size": _to_int(block.get("total_size", "")),
+            "speed": _to_float(block.get("speed", "")),
+            "progress": block.get("progress"),
+        }
+
+    def feed(self, line: str):
+        """Return a snapshot once a block is complete, else None"""
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        self._block[key] = value
+        if key != "progress":
+            return None
+        block, self._block = self._block, {}
+        return self.normalize(block)
+
+
+def terminate_process(proc: subprocess.Popen, group=False, grace=5.0):
+    """
+    Terminate proc, or its process group if it was started with
+    start_new_session=True; kill it if still alive after `grace` seconds.
+    """
+    if proc.poll() is not None:
+        return
+
+    def _signal(sig):
+        try:
+            if group:
+                os.killpg(proc.pid, sig)
+            else:
+                proc.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+    _signal(signal.SIGTERM)
+    try:
+        proc.wait(grace)
+    except subprocess.TimeoutExpired:
+        _signal(signal.SIGKILL)
+        proc.wait()
+
+
+def instrumented_args(cod, fd: int) -> list[str]:
+    """Arguments of cod, with progress written to file descriptor fd"""
+    args = cod.as_args()
+    return args[:1] + ["-progress", "pipe:{}".format(fd), "-nostats"] + args[1:]
+
+
+class ProgressRun(object):
+    """
+    Run an ffmpeg CommandOptionDict with progress reporting.
+    Iterate over it to launch the process and get snapshots as they come.
+
+    The process group is killed after `timeout` seconds in all, or after
+    `stall_timeout` seconds without `out_time` advancing; `killed` is then
+    "timeout" or "stall".
+    """
+
+    # seconds between checks when ffmpeg reports nothing
+    poll_interval = 1.0
+
+    def __init__(
+        self, cod, capture_stderr=False, stdin=None, timeout=None, stall_timeout=None
+    ):
+        self.cod = cod
+        self.capture_stderr = capture_stderr
+        self.stdin = stdin
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.proc = None
+        self.returncode = None
+        self.stderr = None
+        self.last = {}
+        self.started = None
+        self.finished = None
+        self.killed = None
+        self._progressed_at = None
+        # in a session of its own to be killed as a group, if watched
+        self.new_session = bool(timeout or stall_timeout)
+
+    def _read_stderr(self, chunks: list):
+        for chunk in iter(lambda: self.proc.stderr.read(65536), b""):
+            chunks.append(chunk)
+
+    def _update(self, snapshot: dict):
+        out_time = snapshot.get("out_time")
+        if out_time is not None and out_time > (self.last.get("out_time") or -1):
+            self._progressed_at = time.monotonic()
+        self.last = snapshot
+
+    def kill(self, reason: str):
+        self.killed = reason
+        terminate_process(self.proc, group=self.new_session)
+
+    def poll(self):
+        """Called between reads, no matter whether there was output"""
+        if self.killed or self.proc.poll() is not None:
+            return
+        now = time.monotonic()
+        if self.timeout and now - self._started_at > self.timeout:
+            self.kill("timeout")
+        elif self.stall_timeout and now - self._progressed_at > self.stall_timeout:
+            self.kill("stall")
+
+    def __iter__(self):
+        rfd, wfd = os.pipe()
+        try:
+            args = instrumented_args(self.cod, wfd)
+            self.started = time.time()
+            self._started_at = self._progressed_at = time.monotonic()
+            self.proc = subprocess.Popen(
+                args,
+                stdin=self.stdin,
+                stderr=subprocess.PIPE if self.capture_stderr else None,
+                pass_fds=(wfd,),
+                start_new_session=self.new_session,
+            )
+        except BaseException:
+            os.close(rfd)
+            raise
+        finally:
+            os.close(wfd)
+        chunks = []
+        if self.capture_stderr:
+            reader = threading.Thread(target=self._read_stderr, args=(chunks,))
+            reader.start()
+        parser = ProgressParser()
+        buf = b""
+        try:
+            with os.fdopen(rfd, "rb", buffering=0) as fin:
+                sel = selectors.DefaultSelector()
+                sel.register(fin, selectors.EVENT_READ)
+                while True:
+                    if not sel.select(self.poll_interval):
+                        self.poll()
+                        continue
+                    data = fin.read(65536)
+                    if not data:
+                        break
+                    *lines, buf = (buf + data).split(b"\n")
+                    for line in lines:
+                        snapshot = parser.feed(line.decode(errors="replace"))
+                        if snapshot is not None:
+                            self._update(snapshot)
+                            yield snapshot
+                    self.poll()
+                sel.close()
+            self.returncode = self.proc.wait()
+        finally:
+            # e.g. on KeyboardInterrupt, which a new session does not get
+            if self.proc.poll() is None:
+                terminate_process(self.proc, group=self.new_session)
+                self.returncode = self.proc.returncode
+            if self.capture_stderr:
+                reader.join()
+                self.stderr = b"".join(chunks).decode(errors="replace")
+            self.finished = time.time()
+
+    def wait(self, callback=None) -> dict:
+        for snapshot in self:
+            if callback is not None:
+                callback(self, snapshot)
+        return self.summary()
+
+    @property
+    def output(self):
+        return str(self.cod.pargs[-1]) if self.cod.pargs else None
+
+    def summary(self) -> dict:
+        wall_time = (self.finished or time.time()) - (self.started or time.time())
+        out_time = self.last.get("out_time")
+        size = self.last.get("total_size")
+        output = self.output
+        if size is None and output and os.path.isfile(output):
+            size = os.path.getsize(output)
+        rtf = None
+        if out_time and wall_time > 0:
+            rtf = out_time / wall_time
+        return {
+            "command": str(self.cod),
+            "output": output,
+            "returncode": self.returncode,
+            "killed": self.killed,
+            "started": self.started,
+            "wall_time": wall_time,
+            "out_time": out_time,
+            "realtime_factor": rtf,
+            "bytes_written": size,
+            "fps": self.last.get("fps"),
+            "speed": self.last.get("speed"),
+        }
+
+
+class ProgressPrinter(object):
+    """Print a status line per job, at most every `interval` seconds"""
+
+    def __init__(self, interval=5.0, file=sys.stderr):
+        self.interval = interval
+        self.file = file
+        self._last_printed = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, run: ProgressRun, snapshot: dict):
+        now = time.monotonic()
+        key = id(run)
+        ended = snapshot.get("progress") == "end"
+        if not ended and now - self._last_printed.get(key, 0) < self.interval:
+            return
+        if ended:
+            self._last_printed.pop(key, None)
+        else:
+            self._last_printed[key] = now
+        out_time = snapshot.get("out_time") or 0
+        m, s = divmod(out_time, 60)
+        h, m = divmod(int(m), 60)
+        line = "[{}] {:02}:{:02}:{:05.2f} fps={} speed={}x size={}".format(
+            os.path.basename(run.output or "?"),
+            h,
+            m,
+            s,
+            snapshot.get("fps"),
+            snapshot.get("speed"),
+            snapshot.get("total_size"),
+        )
+        with self._lock:
+            print(line, file=self.file)
+
+
+class JsonLinesReport(object):
+    """Append one JSON object per line to a file, safe across threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        line = json.dumps(record, sort_keys=True) + "\n"
+        with self._lock:
+            with open(self.path, "a") as fout:
+                fout.write(line)
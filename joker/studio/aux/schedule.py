@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Order batch jobs by an estimated cost, so that with -j N the longest
+jobs start first and do not leave one core busy at the end of a batch.
+"""
+
+from __future__ import annotations
+
+from joker.studio.aux.incremental import get_inputs
+from joker.studio.aux.info import MediaInfo
+
+# megapixels an audio-only input is costed as
+audio_megapixels = 0.1
+
+
+def _duration_of(cod, summary) -> float:
+    duration = summary.get_duration() or 0.0
+    try:
+        # trimmed by -t, e.g. by cmd crop
+        return min(duration, float(cod["t"]))
+    except (KeyError, TypeError, ValueError):
+        return duration
+
+
+def cost_by_duration(cod, summary) -> float:
+    """seconds of media"""
+    return _duration_of(cod, summary)
+
+
+def cost_by_pixels(cod, summary) -> float:
+    """megapixel-seconds of video, or an equivalent for audio"""
+    width, height = summary.get_size()
+    if width and height:
+        megapixels = width * height / 1e6
+    else:
+        megapixels = audio_megapixels
+    return _duration_of(cod, summary) * megapixels
+
+
+cost_models = {
+    "duration": cost_by_duration,
+    "pixels": cost_by_pixels,
+}
+
+
+def get_primary_input(cod) -> str | None:
+    path = cod.get("i")
+    if path is not None:
+        return str(path)
+    # e.g. the first input of a filtergraph, recorded by its mkcod()
+    inputs = [str(p) for p in getattr(cod, "inputs", [])] or get_inputs(cod)
+    return inputs[0] if inputs else None
+
+
+def estimate_costs(cods: list, model="pixels", workers=4) -> list:
+    """Estimated cost of each of cods, None where the input is unprobable"""
+    func = cost_models[model]
+    paths = {get_primary_input(cod) for cod in cods}
+    paths.discard(None)
+    summaries = {}
+    for path, summary, error in MediaInfo.probe_many(paths, workers):
+        if error is None:
+            summaries[path] = summary
+    costs = []
+    for cod in cods:
+        summary = summaries.get(get_primary_input(cod))
+        costs.append(None if summary is None else func(cod, summary))
+    return costs
+
+
+def order_jobs(cods, order="longest", model="pixels", workers=4) -> list:
+    """
+    Return a list of (cod, estimated_cost) in the order to be launched.
+    Jobs of unknown cost go first with "longest", last with "shortest".
+    """
+    cods = list(cods)
+    if order == "given":
+        return [(cod, None) for cod in cods]
+    costs = estimate_costs(cods, model, workers)
+    pairs = list(zip(cods, costs))
+    if order == "longest":
+        pairs.sort(key=lambda p: (p[1] is not None, -(p[1] or 0.0)))
+    elif order == "shortest":
+        pairs.sort(key=lambda p: (p[1] is None, p[1] or 0.0))
+    else:
+        raise ValueError("unknown order: {}".format(order))
+    return pairs
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+A warm daemon, with heavy modules imported once, running subcommands
+sent over a Unix socket. The client passes its stdin, stdout and stderr
+along with its arguments, cwd and environment; a forked worker of the
+daemon runs the subcommand on those file descriptors and sends back the
+exit code, so the output reaches the terminal as if run locally.
+A client of another version is refused, and runs the subcommand itself,
+not to run code older than installed in a daemon started before an upgrade.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from joker.studio import __version__
+from joker.studio.utils import env_flag, get_cache_dir
+
+# modules worth keeping loaded, slow to import
+preloaded_modules = [
+    "numpy",
+    "scipy.signal",
+    "PIL.Image",
+    "imagehash",
+    "pymediainfo",
+    "joker.studio.aux.info",
+    "joker.studio.aux.utils",
+    "joker.studio.ffmpeg.conv",
+    "joker.studio.ffmpeg.crop",
+    "joker.studio.ffmpeg.edit",
+    "joker.studio.ffmpeg.fade",
+    "joker.studio.ffmpeg.ladder",
+    "joker.studio.ffmpeg.split",
+    "joker.studio.ffmpeg.subtitle",
+    "joker.studio.ffmpeg.thumb",
+    "joker.studio.misc.avatar",
+    "joker.studio.misc.margin",
+    "joker.studio.misc.rename",
+    "joker.studio.misc.vident",
+]
+
+
+def get_socket_path() -> str:
+    path = os.environ.get("JOKER_STUDIO_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "joker-studio.sock")
+    return str(get_cache_dir() / "serve.sock")
+
+
+def _send_message(sock: socket.socket, message: dict, fds=None):
+    data = json.dumps(message).encode() + b"\n"
+    if fds:
+        socket.send_fds(sock, [data], fds)
+    else:
+        sock.sendall(data)
+
+
+class _LineReader(object):
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buf = b""
+        self.fds = []
+
+    def read_message(self) -> dict | None:
+        while b"\n" not in self.buf:
+            data, fds, _, _ = socket.recv_fds(self.sock, 65536, 8)
+            self.fds.extend(fds)
+            if not data:
+                return None
+            self.buf += data
+        line, self.buf = self.buf.split(b"\n", 1)
+        return json.loads(line)
+
+
+def _preload(quiet=False):
+    for name in preloaded_modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            if not quiet:
+                print("not preloaded: {}: {}".format(name, e), file=sys.stderr)
+
+
+def _run_request(conn: socket.socket):
+    """In a forked worker: run the subcommand of a request, exit"""
+    from joker.studio.__main__ import dispatch
+
+    reader = _LineReader(conn)
+    request = reader.read_message()
+    if request is None or len(reader.fds) != 3:
+        os._exit(2)
+    if request.get("version") != __version__:
+        _send_message(conn, {"refused": "version {}".format(__version__)})
+        os._exit(0)
+    _send_message(conn, {"pid": os.getpid()})
+    # a session of its own, not to get signals of the daemon's terminal
+    os.setsid()
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for target, fd in enumerate(reader.fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = request["argv"]
+    code = 0
+    try:
+        code = dispatch(request["argv"]) or 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    try:
+        _send_message(conn, {"exit": code})
+    except OSError:
+        pass
+    os._exit(code)
+
+
+def _reap_children(*_):
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def _is_listening(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(path: str = None, quiet=False):
+    path = path or get_socket_path()
+    if _is_listening(path):
+        raise RuntimeError("already serving at {}".format(path))
+    if os.path.lexists(path):
+        # left by a daemon that died
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _preload(quiet)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    signal.signal(signal.SIGCHLD, _reap_children)
+    # to remove the socket on the way out
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if not quiet:
+        print("serving at", path, file=sys.stderr)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except InterruptedError:
+                continue
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                try:
+                    _run_request(conn)
+                finally:
+                    os._exit(1)
+            conn.close()
+    finally:
+        server.close()
+        os.remove(path)
+
+
+def forward(argv: list[str], path: str = None) -> int | None:
+    """
+    Run a subcommand in the daemon, if one of the same version is serving.
+    :return: exit code, or None if there is no daemon to forward to
+    """
+    if not env_flag("JOKER_STUDIO_DAEMON"):
+        return None
+    path = path or get_socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "version": __version__,
+    }
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = None
+    with sock:
+        _send_message(sock, request, [0, 1, 2])
+        reader = _LineReader(sock)
+        while True:
+            try:
+                message = reader.read_message()
+            except KeyboardInterrupt:
+                # the worker is in a session of its own
+                if pid is not None:
+                    os.kill(pid, signal.SIGINT)
+                continue
+            if message is None:
+                # worker died without an exit code
+                return 1
+            if "refused" in message:
+                msg = "dio serve: daemon of {}, not {}, running locally"
+                print(msg.format(message["refused"], __version__), file=sys.stderr)
+                return None
+            if "pid" in message:
+                pid = message["pid"]
+            elif "exit" in message:
+                return message["exit"]
+
+
+def run(prog=None, args=None):
+    desc = "run subcommands in a warm daemon, forwarded to by dio when serving"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    parser.add_argument(
+        "-s",
+        "--socket",
+        metavar="PATH",
+        help="Unix socket path (default: $JOKER_STUDIO_SOCKET, "
+        "$XDG_RUNTIME_DIR/joker-studio.sock or in the cache dir)",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true")
+    ns = parser.parse_args(args)
+    try:
+        serve(ns.socket, ns.quiet)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import array
+import math
+
+TRACK_VIDEO = 1
+TRACK_AUDIO = 2
+TRACK_IMAGE = 4
+TRACK_TEXT = 8
+
+_track_flags = {
+    "video": TRACK_VIDEO,
+    "audio": TRACK_AUDIO,
+    "image": TRACK_IMAGE,
+    "text": TRACK_TEXT,
+}
+
+
+def _ms_to_sec(ms):
+    if ms is None:
+        return None
+    return float(ms) / 1000
+
+
+class MediaSummary(object):
+    """
+    What most callers need of a MediaInfo, in a few fixed slots.
+    Durations are in seconds; missing values are None.
+    """
+
+    __slots__ = [
+        "path",
+        "width",
+        "height",
+        "duration",
+        "video_duration",
+        "audio_duration",
+        "flags",
+    ]
+
+    def __init__(
+        self,
+        path,
+        width=None,
+        height=None,
+        duration=None,
+        video_duration=None,
+        audio_duration=None,
+        flags=0,
+    ):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.video_duration = video_duration
+        self.audio_duration = audio_duration
+        self.flags = flags
+
+    def __repr__(self):
+        c = self.__class__.__name__
+        return "{}{!r}".format(c, self.astuple())
+
+    def __eq__(self, other):
+        if not isinstance(other, MediaSummary):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def astuple(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls, tup):
+        return cls(*tup)
+
+    def __reduce__(self):
+        return self.from_tuple, (self.astuple(),)
+
+    @classmethod
+    def from_tracks(cls, path, tracks):
+        flags = 0
+        first = {}
+        for tr in tracks:
+            tt = tr.track_type.lower()
+            flags |= _track_flags.get(tt, 0)
+            first.setdefault(tt, tr)
+        visual = first.get("video") or first.get("image")
+        timed = first.get("video") or first.get("audio")
+        width = height = None
+        if visual is not None and visual.width is not None:
+            width, height = int(visual.width), int(visual.height)
+        video = first.get("video")
+        audio = first.get("audio")
+        return cls(
+            path,
+            width,
+            height,
+            _ms_to_sec(timed.duration) if timed else None,
+            _ms_to_sec(video.duration) if video else None,
+            _ms_to_sec(audio.duration) if audio else None,
+            flags,
+        )
+
+    def has_track(self, track_type):
+        return bool(self.flags & _track_flags[track_type.lower()])
+
+    # same accessors as MediaInfo
+    def get_size(self):
+        return self.width, self.height
+
+    def get_duration(self):
+        return self.duration
+
+    def get_video_duration(self):
+        if self.video_duration is None:
+            raise ValueError("no video track found")
+        return self.video_duration
+
+    def get_audio_duration(self):
+        if self.audio_duration is None:
+            raise ValueError("no audio track found")
+        return self.audio_duration
+
+
+def _pack_int(v):
+    return -1 if v is None else v
+
+
+def _pack_float(v):
+    return math.nan if v is None else v
+
+
+def _unpack_int(v):
+    return None if v < 0 else v
+
+
+def _unpack_float(v):
+    return None if math.isnan(v) else v
+
+
+class MediaSummaryTable(object):
+    """
+    Column-oriented store of MediaSummary records, with array-backed
+    numeric columns; missing sizes are stored as -1, durations as NaN.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.widths = array.array("l")
+        self.heights = array.array("l")
+        self.durations = array.array("d")
+        self.video_durations = array.array("d")
+        self.audio_durations = array.array("d")
+        self.flags = array.array("B")
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, idx) -> MediaSummary:
+        return MediaSummary(
+            self.paths[idx],
+            _unpack_int(self.widths[idx]),
+            _unpack_int(self.heights[idx]),
+            _unpack_float(self.durations[idx]),
+            _unpack_float(self.video_durations[idx]),
+            _unpack_float(self.audio_durations[idx]),
+            self.flags[idx],
+        )
+
+    def append(self, summary: MediaSummary):
+        self.paths.append(summary.path)
+        self.widths.append(_pack_int(summary.width))
+        self.heights.append(_pack_int(summary.height))
+        self.durations.append(_pack_float(summary.duration))
+        self.video_durations.append(_pack_float(summary.video_duration))
+        self.audio_durations.append(_pack_float(summary.audio_duration))
+        self.flags.append(summary.flags)
+
+    def extend(self, summaries):
+        for summary in summaries:
+            self.append(summary)
+
+    @classmethod
+    def from_summaries(cls, summaries):
+        table = cls()
+        table.extend(summaries)
+        return table
+
+    def _array_columns(self):
+        return {k: v for k, v in vars(self).items() if isinstance(v, array.array)}
+
+    def take(self, indices) -> "MediaSummaryTable":
+        table = self.__class__()
+        table.paths = [self.paths[i] for i in indices]
+        for key, arr in self._array_columns().items():
+            setattr(table, key, array.array(arr.typecode, (arr[i] for i in indices)))
+        return table
+
+    def mask(
+        self,
+        min_duration=None,
+        max_duration=None,
+        min_width=None,
+        max_width=None,
+        min_height=None,
+        max_height=None,
+        track_type=None,
+    ):
+        """A numpy boolean array selecting rows within the given bounds"""
+        import numpy as np
+
+        def _view(arr):
+            return np.frombuffer(arr, dtype=arr.typecode)
+
+        m = np.ones(len(self), dtype=bool)
+        durations = _view(self.durations)
+        widths = _view(self.widths)
+        heights = _view(self.heights)
+        # comparisons with NaN are False, so unknown durations drop out
+        if min_duration is not None:
+            m &= durations >= min_duration
+        if max_duration is not None:
+            m &= durations <= max_duration
+        if min_width is not None:
+            m &= widths >= min_width
+        if max_width is not None:
+            m &= (widths <= max_width) & (widths >= 0)
+        if min_height is not None:
+            m &= heights >= min_height
+        if max_height is not None:
+            m &= (heights <= max_height) & (heights >= 0)
+        if track_type is not None:
+            m &= (_view(self.flags) & _track_flags[track_type.lower()]) > 0
+        return m
+
+    def filter(self, **kwargs) -> "MediaSummaryTable":
+        """See MediaSummaryTable.mask() for keyword arguments"""
+        import numpy as np
+
+        return self.take(np.flatnonzero(self.mask(**kwargs)).tolist())
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+import argparse
+import contextlib
+import os
 import sys
+import threading
 from collections import OrderedDict
 
+from joker.cast.syntax import printerr
+
+from joker.studio.aux.profiling import span
+
 
 def rescale(wsrc, hsrc, w=None, h=None):
     if w is None and h is None:
@@ -85,11 +93,138 @@ def add_dry_option(argparser):
     )
 
 
+def _parse_jobs(text: str) -> int:
+    # 0 for auto
+    if text == "auto":
+        return 0
+    return int(text)
+
+
+def add_jobs_option(argparser, default=1, auto=False):
+    if auto:
+        helptext = (
+            "number of jobs run concurrently, or auto to size them"
+            " by CPU, load and memory (default: %(default)s)"
+        )
+        argparser.add_argument(
+            "-j",
+            "--jobs",
+            type=_parse_jobs,
+            default=default,
+            metavar="INT|auto",
+            help=helptext,
+        )
+        return
+    argparser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=default,
+        metavar="INT",
+        help="number of files processed concurrently (default: %(default)s)",
+    )
+
+
+def iter_concurrently(
+    func, items, workers=4, processes=False, on_interrupt=None, ordered=False
+):
+    """
+    Apply func to each of items in a thread or process pool,
+    and yield (item, result, error) tuples in order of completion,
+    or in order of items if `ordered`, e.g. for printed listings.
+    Items are consumed lazily, keeping a bounded number in flight.
+    On KeyboardInterrupt, `on_interrupt` is called before waiting for
+    the calls in progress, e.g. to kill child processes.
+    """
+    if workers <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+    import concurrent.futures as cf
+
+    if processes:
+        pool = cf.ProcessPoolExecutor(workers)
+    else:
+        pool = cf.ThreadPoolExecutor(workers)
+    items = iter(items)
+    pending = {}
+    with pool:
+        try:
+            while True:
+                for item in items:
+                    pending[pool.submit(func, item)] = item
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    return
+                if ordered:
+                    # the earliest submitted, as dicts keep insertion order;
+                    # later ones complete meanwhile, within the window
+                    done = [next(iter(pending))]
+                    cf.wait(done)
+                else:
+                    done, _ = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+                for fut in done:
+                    item = pending.pop(fut)
+                    error = fut.exception()
+                    if error is None:
+                        yield item, fut.result(), None
+                    else:
+                        yield item, None, error
+        except KeyboardInterrupt:
+            if on_interrupt is not None:
+                on_interrupt()
+            raise
+        finally:
+            # when the consumer stops early
+            for fut in pending:
+                fut.cancel()
+
+
+class _DisableProbeCacheAction(argparse.Action):
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, True)
+        # via environ, so that child processes follow
+        os.environ["JOKER_STUDIO_PROBE_CACHE"] = "0"
+
+
+class _ProbeEngineAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, values)
+        os.environ["JOKER_STUDIO_PROBE_ENGINE"] = values
+
+
+def add_probe_options(argparser):
+    argparser.add_argument(
+        "--no-probe-cache",
+        action=_DisableProbeCacheAction,
+        default=False,
+        help="do not use the persistent media probe cache",
+    )
+    argparser.add_argument(
+        "--probe-engine",
+        action=_ProbeEngineAction,
+        choices=["ffprobe", "mediainfo"],
+        help="media probe engine (default: ffprobe if found)",
+    )
+
+
 class CommandOptionDict(OrderedDict):
     def __init__(self, *args, **kwargs):
         super(CommandOptionDict, self).__init__(*args, **kwargs)
         self.pargs = list()
         self.executable = ""
+        # input files besides -i, e.g. named by a subtitles filter
+        # or further inputs of a filtergraph
+        self.inputs = list()
+        # files written besides the last of pargs, e.g. of a filtergraph
+        self.outputs = list()
 
     def as_args(self):
         parts = [self.executable]
@@ -104,6 +239,10 @@ class CommandOptionDict(OrderedDict):
         parts.extend(self.pargs)
         return list(map(str, parts))
 
+    @property
+    def span_name(self):
+        return "exec." + os.path.basename(str(self.executable))
+
     def __str__(self):
         import shlex
 
@@ -116,10 +255,697 @@ class CommandOptionDict(OrderedDict):
         if not dry:
             import subprocess
 
-            return subprocess.run(self.as_args(), **kwargs)
+            with span(self.span_name):
+                return subprocess.run(self.as_args(), **kwargs)
+
+    async def arun(self, dry=False, quiet=False, **kwargs):
+        """asyncio counterpart of run(), see joker.studio.aux.aio.arun()"""
+        from joker.studio.aux.aio import arun
+
+        return await arun(self, dry=dry, quiet=quiet, **kwargs)
 
     def __call__(self, executable, *pargs):
         # for convenience
         self.executable = executable
         self.pargs = list(pargs)
         return self
+
+
+class InProcessCommand(CommandOptionDict):
+    """
+    A command carried out by a Python function, func(*pargs), instead of
+    a child process, for short jobs where process startup would dominate.
+    CommandExecutor runs it in a pool of worker processes when jobs > 1
+    or with a timeout, so func must be picklable, i.e. defined at module
+    level.
+    The executable only names it, e.g. in logs.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.func = func
+        # in place of `<executable> -version`, for fingerprints
+        self.version = ""
+
+    def call(self):
+        return self.func(*self.pargs)
+
+    def run(self, dry=False, quiet=False, **kwargs):
+        if not quiet:
+            print(self, file=sys.stderr)
+        if not dry:
+            with span(self.span_name):
+                return self.call()
+
+
+def add_batch_options(argparser):
+    add_jobs_option(argparser, auto=True)
+    argparser.add_argument(
+        "--govern",
+        action="store_true",
+        help="assign ffmpeg -threads and hold back jobs when CPU or memory "
+        "is short, with -j as the upper bound; implied by -j auto",
+    )
+    argparser.add_argument(
+        "--progress",
+        action="store_true",
+        help="print ffmpeg progress of each job every few seconds",
+    )
+    argparser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="append a JSON line of timing and throughput per job to PATH",
+    )
+    argparser.add_argument(
+        "-I",
+        "--incremental",
+        action="store_true",
+        help="skip jobs whose outputs are up to date, rebuild stale ones",
+    )
+    argparser.add_argument(
+        "--order",
+        choices=["given", "longest", "shortest"],
+        default="given",
+        help="launch order of jobs, by estimated cost (default: %(default)s)",
+    )
+    argparser.add_argument(
+        "--cost-model",
+        choices=["pixels", "duration"],
+        default="pixels",
+        help="job cost estimate, megapixel-seconds or seconds of media",
+    )
+    argparser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse outputs of identical inputs and arguments, see cmd ocache",
+    )
+    argparser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SEC",
+        help="kill a job running longer than SEC seconds",
+    )
+    argparser.add_argument(
+        "--stall-timeout",
+        type=float,
+        metavar="SEC",
+        help="kill an ffmpeg job whose position has not advanced for SEC seconds",
+    )
+    argparser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        metavar="INT",
+        help="times to retry a failed job (default: %(default)s)",
+    )
+    argparser.add_argument(
+        "--retry-on",
+        choices=["hung", "failure"],
+        default="hung",
+        help="retry only jobs killed by a timeout, or any failure "
+        "(default: %(default)s)",
+    )
+    argparser.add_argument(
+        "--failure-report",
+        metavar="PATH",
+        help="append a JSON line per failed job to PATH",
+    )
+    add_journal_options(argparser)
+
+
+def add_journal_options(argparser):
+    argparser.add_argument(
+        "--journal",
+        metavar="PATH",
+        help="record finished items in PATH (default: .dio-journal.jsonl "
+        "if --resume)",
+    )
+    argparser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip items recorded as finished in the journal",
+    )
+
+
+def get_journal(ns):
+    """The Journal of options of add_journal_options(), or None"""
+    path = getattr(ns, "journal", None)
+    if path is None and not getattr(ns, "resume", False):
+        return None
+    from joker.studio.aux.journal import Journal, default_journal_path
+
+    return Journal(path or default_journal_path)
+
+
+class JobResult(object):
+    def __init__(
+        self,
+        cod,
+        returncode=None,
+        stderr=None,
+        elapsed=0.0,
+        error=None,
+        stats=None,
+        skipped=False,
+        killed=None,
+    ):
+        self.cod = cod
+        self.returncode = returncode
+        self.stderr = stderr
+        self.elapsed = elapsed
+        self.error = error
+        # see ProgressRun.summary()
+        self.stats = stats
+        self.skipped = skipped
+        # "timeout" or "stall"
+        self.killed = killed
+        self.attempts = 1
+        self.estimated_cost = None
+
+    @property
+    def ok(self):
+        return self.error is None and not self.returncode
+
+    @property
+    def executed(self):
+        return self.returncode is not None or self.error is not None
+
+    def to_record(self) -> dict:
+        if self.stats:
+            record = dict(self.stats)
+        else:
+            record = {
+                "command": str(self.cod),
+                "returncode": self.returncode,
+                "wall_time": self.elapsed,
+            }
+        if self.error is not None:
+            record["error"] = str(self.error)
+        record["estimated_cost"] = self.estimated_cost
+        return record
+
+    @property
+    def reason(self) -> str:
+        if self.error is not None:
+            return str(self.error)
+        if self.killed:
+            return "killed on {}".format(self.killed)
+        return "exit code {}".format(self.returncode)
+
+    def to_failure_record(self) -> dict:
+        from joker.studio.aux import incremental
+
+        return {
+            "command": str(self.cod),
+            "inputs": incremental.get_inputs(self.cod),
+            "output": incremental.get_output(self.cod),
+            "reason": self.killed or ("error" if self.error else "exit"),
+            "returncode": self.returncode,
+            "error": None if self.error is None else str(self.error),
+            "attempts": self.attempts,
+            "wall_time": self.elapsed,
+            "stderr": _tail(self.stderr, 20, "") if self.stderr else None,
+        }
+
+
+class BatchSummary(object):
+    """Counts of results; only failed ones are kept, for batches of any size"""
+
+    def __init__(self, results=None):
+        self.failures = []
+        self.executed = 0
+        self.skipped = 0
+        self._cost_ratios = []
+        for result in results or []:
+            self.add(result)
+
+    def add(self, result: JobResult):
+        # nothing is executed in dry mode
+        if result.executed:
+            self.executed += 1
+        if result.skipped:
+            self.skipped += 1
+        if not result.ok:
+            self.failures.append(result)
+        elif result.executed and result.estimated_cost:
+            self._cost_ratios.append(result.elapsed / result.estimated_cost)
+
+    @property
+    def exit_code(self):
+        return 1 if self.failures else 0
+
+    def report(self, file=sys.stderr):
+        failures = self.failures
+        if self.executed + self.skipped > 1 or failures:
+            n = self.executed - len(failures)
+            msg = "{} succeeded, {} skipped, {} failed"
+            print(msg.format(n, self.skipped, len(failures)), file=file)
+        for r in failures:
+            print("failed ({}): {}".format(r.reason, r.cod), file=file)
+            if r.stderr:
+                print(_tail(r.stderr), file=file)
+        ratio = self.seconds_per_cost()
+        if ratio is not None:
+            print("actual/estimated cost: {:.3g}s per unit".format(ratio), file=file)
+        return self.exit_code
+
+    def seconds_per_cost(self):
+        """Median of wall time over estimated cost, to tune cost models"""
+        import statistics
+
+        ratios = self._cost_ratios
+        return statistics.median(ratios) if ratios else None
+
+
+def _tail(text: str, n=10, indent="    "):
+    lines = text.rstrip().splitlines()[-n:]
+    return "\n".join(indent + s for s in lines)
+
+
+class CommandExecutor(object):
+    """
+    Run CommandOptionDicts, up to `jobs` at a time.
+    With concurrent jobs, stdin is detached and stderr of each job is kept
+    in its JobResult instead of interleaving on the terminal.
+    """
+
+    def __init__(
+        self,
+        jobs=1,
+        dry=False,
+        quiet=False,
+        progress=False,
+        report=None,
+        incremental=False,
+        cache=False,
+        order="given",
+        cost_model="pixels",
+        govern=False,
+        timeout=None,
+        stall_timeout=None,
+        retries=0,
+        retry_on="hung",
+        failure_report=None,
+        journal=None,
+        resume=False,
+    ):
+        self.governor = None
+        if govern or jobs == 0:
+            from joker.studio.aux.governor import Governor
+
+            self.governor = Governor(jobs or None)
+            jobs = self.governor.max_jobs
+        self.jobs = max(jobs, 1)
+        self.dry = dry
+        self.quiet = quiet
+        self.incremental = incremental
+        self.order = order
+        self.cost_model = cost_model
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.retries = retries
+        self.retry_on = retry_on
+        # outputs are written to partial names when journaled
+        self.journal = journal
+        self.resume = resume
+        # callables to kill running jobs, on KeyboardInterrupt
+        self._killers = {}
+        self._killers_lock = threading.Lock()
+        # for InProcessCommands, created on demand
+        self._pool = None
+        self._interrupted = False
+        self.output_cache = None
+        if cache:
+            from joker.studio.aux.outputcache import get_output_cache
+
+            self.output_cache = get_output_cache()
+        self.progress_callback = None
+        self.report = None
+        if progress:
+            from joker.studio.aux.progress import ProgressPrinter
+
+            self.progress_callback = ProgressPrinter()
+        if report:
+            from joker.studio.aux.progress import JsonLinesReport
+
+            self.report = JsonLinesReport(report)
+        self.failure_report = None
+        if failure_report:
+            from joker.studio.aux.progress import JsonLinesReport
+
+            self.failure_report = JsonLinesReport(failure_report)
+
+    @classmethod
+    def from_namespace(cls, ns):
+        return cls(
+            getattr(ns, "jobs", 1),
+            getattr(ns, "dry", False),
+            progress=getattr(ns, "progress", False),
+            report=getattr(ns, "report", None),
+            incremental=getattr(ns, "incremental", False),
+            cache=getattr(ns, "cache", False),
+            order=getattr(ns, "order", "given"),
+            cost_model=getattr(ns, "cost_model", "pixels"),
+            govern=getattr(ns, "govern", False),
+            timeout=getattr(ns, "timeout", None),
+            stall_timeout=getattr(ns, "stall_timeout", None),
+            retries=getattr(ns, "retries", 0),
+            retry_on=getattr(ns, "retry_on", "hung"),
+            failure_report=getattr(ns, "failure_report", None),
+            journal=get_journal(ns),
+            resume=getattr(ns, "resume", False),
+        )
+
+    def _instrumented(self, cod) -> bool:
+        if self.progress_callback is None and self.report is None:
+            if not self.stall_timeout:
+                return False
+        return os.path.basename(str(cod.executable)) == "ffmpeg"
+
+    @contextlib.contextmanager
+    def _killable(self, kill):
+        key = object()
+        with self._killers_lock:
+            self._killers[key] = kill
+        try:
+            yield
+        finally:
+            with self._killers_lock:
+                self._killers.pop(key)
+
+    def kill_all(self):
+        """Kill running jobs, e.g. those in sessions of their own"""
+        self._interrupted = True
+        with self._killers_lock:
+            killers = list(self._killers.values())
+        for kill in killers:
+            kill()
+        with self._killers_lock:
+            pool = self._pool
+        if pool is not None:
+            self._recycle_pool(pool)
+
+    def _get_pool(self):
+        # a job in a worker process can be stopped on timeout
+        if self.jobs <= 1 and not self.timeout:
+            return None
+        with self._killers_lock:
+            if self._pool is None:
+                import concurrent.futures as cf
+
+                self._pool = cf.ProcessPoolExecutor(self.jobs)
+            return self._pool
+
+    def _recycle_pool(self, pool):
+        """Terminate the workers of pool, e.g. one stuck in a job"""
+        with self._killers_lock:
+            if self._pool is pool:
+                self._pool = None
+        if hasattr(pool, "terminate_workers"):
+            # python 3.14+
+            pool.terminate_workers()
+            return
+        # before shutdown(), which forgets them
+        for proc in list((pool._processes or {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _close_pool(self):
+        with self._killers_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _launch_in_process(self, cod) -> JobResult:
+        import concurrent.futures as cf
+        import time
+
+        t0 = time.monotonic()
+        while True:
+            if self._interrupted:
+                error = RuntimeError("interrupted")
+                return JobResult(cod, error=error, killed="interrupt")
+            pool = self._get_pool()
+            try:
+                if pool is None:
+                    cod.call()
+                else:
+                    pool.submit(cod.func, *cod.pargs).result(self.timeout)
+            except cf.TimeoutError:
+                self._recycle_pool(pool)
+                error = TimeoutError("timed out after {}s".format(self.timeout))
+                elapsed = time.monotonic() - t0
+                return JobResult(cod, elapsed=elapsed, error=error, killed="timeout")
+            except cf.process.BrokenProcessPool as e:
+                with self._killers_lock:
+                    recycled = self._pool is not pool
+                # with the stuck job of another; not on interrupt
+                if recycled and not self._interrupted:
+                    continue
+                return JobResult(cod, elapsed=time.monotonic() - t0, error=e)
+            except Exception as e:
+                return JobResult(cod, elapsed=time.monotonic() - t0, error=e)
+            return JobResult(cod, 0, elapsed=time.monotonic() - t0)
+
+    def _launch_with_progress(self, cod) -> JobResult:
+        import subprocess
+        from joker.studio.aux.progress import ProgressRun
+
+        concurrent = self.jobs > 1
+        stdin = subprocess.DEVNULL if concurrent else None
+        run = ProgressRun(
+            cod,
+            capture_stderr=concurrent,
+            stdin=stdin,
+            timeout=self.timeout,
+            stall_timeout=self.stall_timeout,
+        )
+
+        def _kill():
+            if run.proc is not None:
+                run.kill("interrupt")
+
+        try:
+            with self._killable(_kill):
+                stats = run.wait(self.progress_callback)
+        except OSError as e:
+            return JobResult(cod, error=e)
+        return JobResult(
+            cod,
+            run.returncode,
+            run.stderr,
+            stats["wall_time"],
+            stats=stats,
+            killed=run.killed,
+        )
+
+    def _print(self, line):
+        if not self.quiet:
+            # one write per line, not to interleave with other threads
+            sys.stderr.write(line + "\n")
+
+    def execute(self, cod) -> JobResult:
+        from joker.studio.aux import incremental
+
+        output = incremental.get_output(cod)
+        if self.resume and self.journal.is_job_done(cod):
+            self._print("done: {}".format(output))
+            return JobResult(cod, skipped=True)
+        fingerprint = None
+        stale = []
+        if self.incremental:
+            if incremental.is_up_to_date(cod):
+                self._print("up-to-date: {}".format(output))
+                return JobResult(cod, skipped=True)
+            fingerprint = incremental.compute_fingerprint(cod)
+            outputs = incremental.get_outputs(cod)
+            stale = [p for p in outputs if incremental.output_exists(p)]
+        if self.dry:
+            self._print(str(cod))
+            return JobResult(cod)
+        # removed rather than overwritten with -y, which not every
+        # executable takes, and which would write into a hard link
+        for path in stale:
+            incremental.remove_output(path)
+        with span("cache.key"):
+            cache_key = self._get_cache_key(cod)
+        if cache_key is not None and self._restore_from_cache(cache_key, cod):
+            self._print("from cache: {}".format(output))
+            if fingerprint is not None:
+                incremental.record_fingerprint(cod, fingerprint)
+            return JobResult(cod, skipped=True)
+        partial = self._begin_partial(cod)
+        ok = False
+        try:
+            result = self._launch_with_retries(cod)
+            ok = result.ok
+        finally:
+            if partial is not None:
+                self._end_partial(cod, output, partial, ok)
+        if not result.ok:
+            return result
+        if fingerprint is not None:
+            incremental.record_fingerprint(cod, fingerprint)
+        if cache_key is not None:
+            try:
+                with span("cache.store", output=output):
+                    self.output_cache.store(cache_key, output)
+            except OSError as e:
+                printerr("output cache:", e)
+        return result
+
+    def _begin_partial(self, cod):
+        """Swap the output of cod for a partial name; return that name"""
+        from joker.studio.aux import journal, outputcache
+
+        if self.journal is None or not outputcache.is_cacheable(cod):
+            return None
+        output = str(cod.pargs[-1])
+        # unless asked to, leave an existing output to the command itself
+        if os.path.lexists(output) and "y" not in cod:
+            return None
+        partial = journal.get_partial_path(output)
+        if os.path.lexists(partial):
+            # left by an interrupted run
+            os.remove(partial)
+        cod.pargs[-1] = partial
+        return partial
+
+    @staticmethod
+    def _end_partial(cod, output, partial, ok):
+        cod.pargs[-1] = output
+        if ok and os.path.isfile(partial):
+            os.replace(partial, output)
+        elif os.path.lexists(partial):
+            os.remove(partial)
+
+    def _get_cache_key(self, cod):
+        from joker.studio.aux import outputcache
+
+        if self.output_cache is None or not outputcache.is_cacheable(cod):
+            return None
+        try:
+            return self.output_cache.compute_key(cod)
+        except OSError as e:
+            printerr("output cache:", e)
+            return None
+
+    def _restore_from_cache(self, key, cod) -> bool:
+        output = cod.pargs[-1]
+        # unless asked to, leave an existing output to the command itself
+        if os.path.lexists(output) and "y" not in cod:
+            return False
+        return self.output_cache.restore(key, str(output))
+
+    def _retriable(self, result: JobResult) -> bool:
+        if self.retry_on == "failure":
+            return True
+        return result.killed in ("timeout", "stall")
+
+    def _launch_with_retries(self, cod) -> JobResult:
+        from joker.studio.aux import incremental
+
+        output = incremental.get_output(cod)
+        outputs = incremental.get_outputs(cod)
+        existed = {p for p in outputs if incremental.output_exists(p)}
+        attempt = 1
+        while True:
+            if self.governor is None:
+                self._print(str(cod))
+                with span(cod.span_name, output=output):
+                    result = self._launch(cod)
+            else:
+                with self.governor.slot(cod):
+                    self._print(str(cod))
+                    with span(cod.span_name, output=output):
+                        result = self._launch(cod)
+            result.attempts = attempt
+            if result.ok or attempt > self.retries or not self._retriable(result):
+                return result
+            if result.killed == "interrupt":
+                return result
+            msg = "retry {}/{} ({}): {}"
+            self._print(msg.format(attempt, self.retries, result.reason, output))
+            # partial outputs of the failed attempt are in the way;
+            # removed, as not every executable takes -y
+            for path in outputs:
+                if path not in existed:
+                    incremental.remove_output(path)
+            attempt += 1
+
+    def _launch(self, cod) -> JobResult:
+        import subprocess
+        import time
+
+        from joker.studio.aux.progress import terminate_process
+
+        if isinstance(cod, InProcessCommand):
+            return self._launch_in_process(cod)
+        if self._instrumented(cod):
+            return self._launch_with_progress(cod)
+        kwargs = {}
+        if self.jobs > 1:
+            kwargs.update(stdin=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        # in a session of its own to be killed as a group, if watched
+        group = bool(self.timeout)
+        killed = []
+
+        def _kill(reason="interrupt"):
+            killed.append(reason)
+            terminate_process(proc, group=group)
+
+        t0 = time.monotonic()
+        try:
+            proc = subprocess.Popen(cod.as_args(), start_new_session=group, **kwargs)
+        except OSError as e:
+            return JobResult(cod, elapsed=time.monotonic() - t0, error=e)
+        with self._killable(_kill):
+            try:
+                _, stderr = proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                _kill("timeout")
+                _, stderr = proc.communicate()
+            except BaseException:
+                _kill()
+                raise
+        stderr = stderr.decode(errors="replace") if stderr else None
+        killed = killed[0] if killed else None
+        elapsed = time.monotonic() - t0
+        return JobResult(cod, proc.returncode, stderr, elapsed, killed=killed)
+
+    def iter_results(self, cods):
+        costs = {}
+        if self.order != "given" and not self.dry:
+            from joker.studio.aux.schedule import order_jobs
+
+            pairs = order_jobs(cods, self.order, self.cost_model, self.jobs)
+            costs = {id(cod): cost for cod, cost in pairs}
+            cods = [cod for cod, _ in pairs]
+        results = iter_concurrently(
+            self.execute, cods, self.jobs, on_interrupt=self.kill_all
+        )
+        try:
+            for cod, result, error in results:
+                if error is not None:
+                    result = JobResult(cod, error=error)
+                result.estimated_cost = costs.get(id(cod))
+                if self.report is not None and result.executed:
+                    self.report.write(result.to_record())
+                if self.failure_report is not None and not result.ok:
+                    self.failure_report.write(result.to_failure_record())
+                if self.journal is not None and not self.dry:
+                    if result.skipped or result.executed:
+                        status = "done" if result.ok else "failed"
+                        self.journal.record_job(cod, status)
+                yield result
+        finally:
+            self._close_pool()
+
+    def run(self, cods) -> BatchSummary:
+        return BatchSummary(self.iter_results(cods))
+
+
+def run_commands(cods, ns) -> int:
+    """Run cods as configured by options of add_batch_options(); exit code"""
+    summary = CommandExecutor.from_namespace(ns).run(cods)
+    return summary.report()
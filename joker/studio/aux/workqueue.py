@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+A work queue in a directory on shared storage, to be drained by workers
+on several hosts. Each item is a JSON file, moving between subdirs
+
+    pending/  ->  running/  ->  done/ | failed/
+
+by atomic renames, which unlike SQLite locking hold on NFS too.
+A worker claims an item by renaming it into running/, and renews its
+lease by touching it. An item not touched for `lease` seconds is put
+back into pending/ by any worker, or into failed/ once tried
+`max_attempts` times. Each claim has a token of its own, so that a
+worker whose lease was lost cannot finish the item claimed again by
+another. An interrupted worker puts its items back into pending/.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from joker.cast.syntax import printerr
+
+from joker.studio.utils import Pathlike
+
+commands = ["conv", "crop", "edit", "fade", "ladder", "split", "thumb", "vid"]
+states = ["pending", "running", "done", "failed"]
+
+
+def _write_json(path: str, data: dict):
+    tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp, "w") as fout:
+        json.dump(data, fout, indent=2)
+    os.replace(tmp, path)
+
+
+def get_worker_id() -> str:
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+class WorkQueue(object):
+    def __init__(self, path: Pathlike, lease=60.0, max_attempts=2):
+        self.path = os.path.abspath(path)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        for state in states + ["logs"]:
+            os.makedirs(os.path.join(self.path, state), exist_ok=True)
+
+    def _state_dir(self, state: str) -> str:
+        return os.path.join(self.path, state)
+
+    def _item_path(self, state: str, name: str) -> str:
+        return os.path.join(self.path, state, name)
+
+    def list(self, state: str) -> list[str]:
+        names = os.listdir(self._state_dir(state))
+        return sorted(n for n in names if n.endswith(".json"))
+
+    def read(self, state: str, name: str) -> dict | None:
+        try:
+            with open(self._item_path(state, name)) as fin:
+                return json.load(fin)
+        except (FileNotFoundError, ValueError):
+            # moved by another worker meanwhile, or being replaced
+            return None
+
+    def add(self, command: str, options: list[str], path: str) -> str:
+        if command not in commands:
+            raise ValueError("unsupported command: {}".format(command))
+        path = os.path.abspath(path)
+        digest = hashlib.sha1(path.encode()).hexdigest()[:10]
+        # names sort in order of addition
+        name = "{:020d}-{}.json".format(time.time_ns(), digest)
+        item = {
+            "command": command,
+            "options": list(options),
+            "path": path,
+            "attempts": 0,
+            "created": time.time(),
+            "history": [],
+        }
+        _write_json(self._item_path("pending", name), item)
+        return name
+
+    def now(self) -> float:
+        """Time of the file server, by touching a file, against clock skew"""
+        path = os.path.join(self.path, ".clock")
+        with open(path, "a"):
+            pass
+        os.utime(path)
+        return os.stat(path).st_mtime
+
+    def claim(self) -> tuple[str, dict] | None:
+        worker = get_worker_id()
+        for name in self.list("pending"):
+            try:
+                # fresh mtime first, not to look expired once in running/
+                os.utime(self._item_path("pending", name))
+                # only one of the racing workers succeeds
+                os.rename(
+                    self._item_path("pending", name),
+                    self._item_path("running", name),
+                )
+            except FileNotFoundError:
+                continue
+            item = self.read("running", name)
+            if item is None:
+                continue
+            item["worker"] = worker
+            item["token"] = os.urandom(8).hex()
+            item["claimed"] = time.time()
+            item["attempts"] += 1
+            _write_json(self._item_path("running", name), item)
+            return name, item
+        return None
+
+    def holds(self, name: str, item: dict) -> bool:
+        """Whether the claim of item is still that of the running one"""
+        current = self.read("running", name)
+        return current is not None and current.get("token") == item.get("token")
+
+    def heartbeat(self, name: str, item: dict = None) -> bool:
+        """Renew the lease of a claimed item; False if it was lost"""
+        if item is not None and not self.holds(name, item):
+            return False
+        try:
+            os.utime(self._item_path("running", name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def finish(self, name: str, item: dict, returncode: int, elapsed: float):
+        item["history"].append(
+            {
+                "worker": item.get("worker"),
+                "returncode": returncode,
+                "elapsed": elapsed,
+                "finished": time.time(),
+            }
+        )
+        if returncode == 0:
+            state = "done"
+        elif item["attempts"] < self.max_attempts:
+            state = "pending"
+        else:
+            state = "failed"
+        src = self._item_path("running", name)
+        if not self.holds(name, item):
+            # lease lost, and the item requeued or claimed again meanwhile
+            return None
+        _write_json(src, item)
+        try:
+            os.rename(src, self._item_path(state, name))
+        except FileNotFoundError:
+            return None
+        return state
+
+    def release(self, name: str, item: dict) -> bool:
+        """Put a claimed item back into pending/, as if never claimed"""
+        if not self.holds(name, item):
+            return False
+        item["attempts"] -= 1
+        for key in ["worker", "token", "claimed"]:
+            item.pop(key, None)
+        src = self._item_path("running", name)
+        _write_json(src, item)
+        try:
+            os.rename(src, self._item_path("pending", name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def requeue_expired(self) -> list[str]:
+        """
+        Put expired items back into pending/, or into failed/ once tried
+        `max_attempts` times, e.g. those hanging or killing their workers
+        """
+        now = self.now()
+        requeued = []
+        for name in self.list("running"):
+            try:
+                mtime = os.stat(self._item_path("running", name)).st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime <= self.lease:
+                continue
+            item = self.read("running", name)
+            if item is None:
+                continue
+            if item["attempts"] < self.max_attempts:
+                state = "pending"
+            else:
+                state = "failed"
+            try:
+                os.rename(
+                    self._item_path("running", name),
+                    self._item_path(state, name),
+                )
+            except FileNotFoundError:
+                continue
+            if state == "pending":
+                requeued.append(name)
+                continue
+            item["history"].append(
+                {
+                    "worker": item.get("worker"),
+                    "returncode": None,
+                    "elapsed": None,
+                    "finished": time.time(),
+                    "expired": True,
+                }
+            )
+            _write_json(self._item_path("failed", name), item)
+            printerr(
+                "failed, lease expired {} times: {}".format(item["attempts"], name)
+            )
+        return requeued
+
+    def retry_failed(self) -> int:
+        count = 0
+        for name in self.list("failed"):
+            item = self.read("failed", name)
+            if item is None:
+                printerr("cannot read:", self._item_path("failed", name))
+                continue
+            item["attempts"] = 0
+            _write_json(self._item_path("failed", name), item)
+            try:
+                os.rename(
+                    self._item_path("failed", name),
+                    self._item_path("pending", name),
+                )
+            except FileNotFoundError:
+                continue
+            count += 1
+        return count
+
+    def counts(self) -> dict:
+        return {state: len(self.list(state)) for state in states}
+
+    def log_path(self, name: str) -> str:
+        return os.path.join(self.path, "logs", name[:-5] + ".log")
+
+
+def build_argv(item: dict) -> list[str]:
+    args = [item["command"]] + item["options"] + [item["path"]]
+    return [sys.executable, "-m", "joker.studio"] + args
+
+
+class Worker(object):
+    """
+    Claim and run items of a WorkQueue, `jobs` at a time.
+    On KeyboardInterrupt, the process groups of running items are killed
+    and the items put back into pending/, for others to run.
+    """
+
+    poll_interval = 2.0
+    # seconds to wait for threads to put their items back, once stopped
+    stop_timeout = 30.0
+
+    def __init__(self, queue: WorkQueue, jobs=1, wait=False, quiet=False):
+        self.queue = queue
+        self.jobs = max(jobs, 1)
+        self.wait = wait
+        self.quiet = quiet
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # running child processes, by item name
+        self._procs = {}
+
+    def _print(self, line: str):
+        if not self.quiet:
+            sys.stderr.write(line + "\n")
+
+    def run_item(self, name: str, item: dict) -> int:
+        from joker.studio.aux.progress import terminate_process
+
+        argv = build_argv(item)
+        self._print("{}: {}".format(name, " ".join(argv[3:])))
+        t0 = time.monotonic()
+        with open(self.queue.log_path(name), "ab") as log, self._lock:
+            if self._stopping.is_set():
+                self.queue.release(name, item)
+                return None
+            # in a session of its own, not to get SIGINT of the terminal
+            proc = subprocess.Popen(
+                argv,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            self._procs[name] = proc
+        try:
+            while True:
+                try:
+                    proc.wait(self.queue.lease / 4)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if not self.queue.heartbeat(name, item):
+                    self._print("{}: lease lost".format(name))
+                    terminate_process(proc, group=True)
+                    return proc.returncode
+        except BaseException:
+            terminate_process(proc, group=True)
+            raise
+        finally:
+            with self._lock:
+                self._procs.pop(name, None)
+        if proc.returncode and self._stopping.is_set():
+            # killed by stop(), not a failure of the item
+            if self.queue.release(name, item):
+                self._print("{}: put back into pending".format(name))
+            return proc.returncode
+        state = self.queue.finish(name, item, proc.returncode, time.monotonic() - t0)
+        if state != "done":
+            with self._lock:
+                self.failures += 1
+            self._print("{}: exit code {}, {}".format(name, proc.returncode, state))
+        return proc.returncode
+
+    def _drained(self) -> bool:
+        if self.wait:
+            return False
+        counts = self.queue.counts()
+        # running items of others may yet expire and come back
+        return not counts["pending"] and not counts["running"]
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            self.queue.requeue_expired()
+            claimed = self.queue.claim()
+            if claimed is not None:
+                self.run_item(*claimed)
+                continue
+            if self._drained():
+                return
+            self._stopping.wait(self.poll_interval)
+
+    def stop(self):
+        """Stop claiming items, and kill the process groups of running ones"""
+        from joker.studio.aux.progress import terminate_process
+
+        with self._lock:
+            self._stopping.set()
+            procs = list(self._procs.values())
+        for proc in procs:
+            terminate_process(proc, group=True)
+
+    def run(self) -> int:
+        threads = [threading.Thread(target=self._loop) for _ in range(self.jobs)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        try:
+            for t in threads:
+                # join with timeout, so that KeyboardInterrupt gets through
+                while t.is_alive():
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            self._print("interrupted, putting running items back")
+            self.stop()
+            deadline = time.monotonic() + self.stop_timeout
+            for t in threads:
+                t.join(max(deadline - time.monotonic(), 0))
+            return 130
+        return 1 if self.failures else 0
+
+
+def _split_options(rest: list[str]):
+    # dio queue add conv -f mp3 -- a.mp4 b.mp4
+    if "--" in rest:
+        idx = rest.index("--")
+        return rest[:idx], rest[idx + 1 :]
+    return [], rest
+
+
+def run(prog=None, args=None):
+    desc = "a work queue on shared storage, drained by workers on any host"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    parser.add_argument(
+        "-q",
+        "--queue",
+        metavar="DIR",
+        default=os.environ.get("JOKER_STUDIO_QUEUE_DIR", "dio-queue"),
+        help="queue directory (default: $JOKER_STUDIO_QUEUE_DIR or dio-queue)",
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=60.0,
+        metavar="SEC",
+        help="requeue items of workers silent for SEC seconds",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    p_add = subparsers.add_parser("add", help="add an item per path")
+    p_add.add_argument("command", choices=commands)
+    p_add.add_argument(
+        "rest",
+        nargs=argparse.REMAINDER,
+        metavar="[OPTION ... --] PATH ...",
+        help="options of the command, if any, then paths",
+    )
+
+    p_work = subparsers.add_parser("work", help="run items until none is left")
+    p_work.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="INT",
+        help="number of items run concurrently (default: %(default)s)",
+    )
+    p_work.add_argument(
+        "--max-attempts",
+        type=int,
+        default=2,
+        metavar="INT",
+        help="times an item is tried before it fails (default: %(default)s)",
+    )
+    p_work.add_argument(
+        "--wait",
+        action="store_true",
+        help="keep waiting for new items instead of exiting when drained",
+    )
+
+    p_status = subparsers.add_parser("status", help="show counts of items")
+    p_status.add_argument(
+        "-v", "--verbose", action="store_true", help="list running and failed items"
+    )
+    subparsers.add_parser("retry", help="put failed items back into pending")
+
+    ns = parser.parse_args(args)
+    if ns.action == "add":
+        queue = WorkQueue(ns.queue, ns.lease)
+        options, paths = _split_options(ns.rest)
+        if not paths:
+            parser.error("no path given")
+        for path in paths:
+            queue.add(ns.command, options, path)
+        print("added {} items".format(len(paths)), file=sys.stderr)
+    elif ns.action == "work":
+        queue = WorkQueue(ns.queue, ns.lease, ns.max_attempts)
+        return Worker(queue, ns.jobs, ns.wait).run()
+    elif ns.action == "status":
+        queue = WorkQueue(ns.queue, ns.lease)
+        for state, count in queue.counts().items():
+            print("{}: {}".format(state, count))
+        if ns.verbose:
+            for state in ["running", "failed"]:
+                for name in queue.list(state):
+                    item = queue.read(state, name) or {}
+                    print(state, name, item.get("worker"), item.get("path"), sep="\t")
+    elif ns.action == "retry":
+        queue = WorkQueue(ns.queue, ns.lease)
+        printerr("requeued:", queue.retry_failed())
+
+
+if __name__ == "__main__":
+    run()
@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 # coding: utf-8
 
+from __future__ import annotations
+
 import argparse
+import functools
+import os
 import pathlib
 import sys
 
 from joker.cast.syntax import printerr
 
 from joker.studio.aux import utils
+from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.paths import add_input_options, get_input_paths
 
 
 def mkcod_convert(path, outpath):
@@ -23,6 +29,62 @@ def mkcod_image_convert(path, outpath):
     return cod(cmd, path, outpath)
 
 
+@functools.lru_cache(maxsize=None)
+def _get_pillow_format(ext: str, writable: bool) -> str | None:
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    Image.init()
+    fmt = Image.registered_extensions().get(ext.lower())
+    registry = Image.SAVE if writable else Image.OPEN
+    return fmt if fmt in registry else None
+
+
+def can_convert_with_pillow(inext: str, outext: str) -> bool:
+    return bool(_get_pillow_format(inext, False) and _get_pillow_format(outext, True))
+
+
+# formats of Pillow to which all frames of an animation are saved
+_pillow_animated_formats = {"GIF", "PNG", "WEBP", "TIFF"}
+# formats of Pillow without alpha channel, flattened on white
+_pillow_opaque_formats = {"JPEG", "BMP"}
+
+
+def convert_image(path, outpath):
+    """Convert an image with Pillow, to the format of outpath extension"""
+    from PIL import Image
+
+    fmt = _get_pillow_format(os.path.splitext(outpath)[1], True)
+    with Image.open(path) as im:
+        kwargs = {}
+        if im.info.get("icc_profile"):
+            kwargs["icc_profile"] = im.info["icc_profile"]
+        # e.g. orientation, which viewers apply on display
+        if im.info.get("exif"):
+            kwargs["exif"] = im.info["exif"]
+        if getattr(im, "n_frames", 1) > 1 and fmt in _pillow_animated_formats:
+            im.save(outpath, fmt, save_all=True, **kwargs)
+            return
+        if fmt in _pillow_opaque_formats and im.mode not in ("RGB", "L"):
+            rgba = im.convert("RGBA")
+            im = Image.new("RGB", rgba.size, "white")
+            im.paste(rgba, mask=rgba.getchannel("A"))
+        if fmt == "JPEG":
+            # Pillow defaults to 75; "keep" reuses the tables of a JPEG input
+            kwargs["quality"] = "keep" if im.format == "JPEG" else 92
+        im.save(outpath, fmt, **kwargs)
+
+
+def mkcod_pillow_convert(path, outpath):
+    """Like mkcod_image_convert(), in-process, without a child process"""
+    import PIL
+
+    cod = utils.InProcessCommand(convert_image)
+    cod.version = "Pillow " + PIL.__version__
+    return cod("pillow", path, outpath)
+
+
 def _mkcod_convert_ts_mp4(path, outpath):
     cod = utils.CommandOptionDict(
         [
@@ -92,6 +154,11 @@ known_extensions = {
 }
 
 
+def get_extensions(*mediatypes) -> set:
+    """Known extensions of files of any of mediatypes"""
+    return {ext for ext, mt in known_extensions.items() if mt in mediatypes}
+
+
 class UnsupportedConversion(ValueError):
     pass
 
@@ -107,7 +174,21 @@ def check_conversion(inext, outext):
     raise UnsupportedConversion(msg)
 
 
-def convert_a_file(path, ns):
+def mkcod_smart_remux(path, outpath):
+    """
+    Stream-copy what the output format accepts and transcode the rest;
+    None if the input cannot be probed or nothing would be copied.
+    """
+    from joker.studio.ffmpeg.remux import mkcod_remux
+
+    try:
+        tracks = MediaInfo(path).tracks
+    except Exception:
+        return None
+    return mkcod_remux(path, outpath, tracks)
+
+
+def mkcod_convert_a_file(path, ns):
     px = pathlib.Path(path)
     outext = ("." + ns.fmt).replace("..", ".")
 
@@ -118,21 +199,43 @@ def convert_a_file(path, ns):
     else:
         outpath = str(px.with_suffix(outext))
 
+    if incat != MEDIATYPE_IMAGE and not getattr(ns, "reencode", False):
+        cod = mkcod_smart_remux(path, outpath)
+        if cod is not None:
+            return cod
     if outext == ".mp4":
         cod = mkcod_convert_to_mp4(path, outpath)
     elif outcat == MEDIATYPE_AUDIO:
         cod = mkcod_convert_to_audio(path, outpath)
     elif incat == MEDIATYPE_IMAGE and outcat == MEDIATYPE_IMAGE:
-        cod = mkcod_image_convert(path, outpath)
+        if can_convert_with_pillow(px.suffix, outext):
+            cod = mkcod_pillow_convert(path, outpath)
+        else:
+            cod = mkcod_image_convert(path, outpath)
     else:
         cod = mkcod_convert(path, outpath)
-    cod.run(ns.dry)
+    return cod
+
+
+def convert_a_file(path, ns):
+    mkcod_convert_a_file(path, ns).run(ns.dry)
+
+
+def _iter_cods(paths, ns):
+    for p in paths:
+        try:
+            yield mkcod_convert_a_file(p, ns)
+        except Exception as e:
+            printerr("path:", p)
+            printerr(e)
 
 
 def run(prog=None, args=None):
     desc = "convert audio/video format"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     utils.add_dry_option(parser)
+    utils.add_batch_options(parser)
+    utils.add_probe_options(parser)
 
     parser.add_argument(
         "-f",
@@ -141,16 +244,17 @@ def run(prog=None, args=None):
         default="mp4",
         help="out audio/video format, e.g. mp4, ogg, ...",
     )
+    parser.add_argument(
+        "--reencode",
+        action="store_true",
+        help="transcode all streams, even those the output format accepts",
+    )
 
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="an audio/video file")
+    add_input_options(parser, help="audio/video files")
 
     ns = parser.parse_args(args)
-    for p in ns.paths:
-        try:
-            convert_a_file(p, ns)
-        except Exception as e:
-            printerr("path:", p)
-            printerr(e)
+    paths = get_input_paths(parser, ns, set(known_extensions))
+    return utils.run_commands(_iter_cods(paths, ns), ns)
 
 
 if __name__ == "__main__":
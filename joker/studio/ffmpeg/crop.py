@@ -4,15 +4,18 @@
 import argparse
 import pathlib
 
+from joker.cast.syntax import printerr
+
 from joker.studio.aux import utils
 from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.ffmpeg.conv import MEDIATYPE_AUDIO, MEDIATYPE_VIDEO, get_extensions
 from joker.studio.ffmpeg.filters import vf_crop
 
 
 def mkcod_crop(path, outpath, head, tail, *margins):
     xinfo = MediaInfo(path)
-    width = xinfo.video.width
-    height = xinfo.video.height
+    width, height = xinfo.get_size()
     duration = xinfo.get_video_duration()
 
     cod = utils.CommandOptionDict(
@@ -34,6 +37,8 @@ def run(prog=None, args=None):
     desc = "Rename files"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     utils.add_dry_option(parser)
+    utils.add_probe_options(parser)
+    utils.add_batch_options(parser)
 
     parser.add_argument(
         "-c",
@@ -53,14 +58,25 @@ def run(prog=None, args=None):
         help="trim media in time dimension",
     )
 
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="files")
+    add_input_options(parser, help="audio/video files")
     ns = parser.parse_args(args)
+    paths = get_input_paths(
+        parser, ns, get_extensions(MEDIATYPE_AUDIO, MEDIATYPE_VIDEO)
+    )
     head, tail = ns.trim or (0, 0)
-    for path in ns.paths:
-        px = pathlib.Path(path)
-        outpath = px.with_suffix(".crop" + px.suffix)
-        cod = mkcod_crop(path, outpath, head, tail, *ns.crop)
-        cod.run(ns.dry)
+    margins = ns.crop or []
+
+    def _iter_cods():
+        for path in paths:
+            px = pathlib.Path(path)
+            outpath = px.with_suffix(".crop" + px.suffix)
+            try:
+                yield mkcod_crop(path, outpath, head, tail, *margins)
+            except Exception as e:
+                printerr("path:", path)
+                printerr(e)
+
+    return utils.run_commands(_iter_cods(), ns)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Crop, trim, fade and burn subtitles in a single encode, instead of
+running crop, fade and sub one after another, each decoding and
+re-encoding the output of the previous.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pathlib
+
+from joker.cast.syntax import printerr
+
+from joker.studio.aux import utils
+from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.ffmpeg.conv import MEDIATYPE_VIDEO, get_extensions
+from joker.studio.ffmpeg.filtergraph import Filter, RawFilter
+from joker.studio.ffmpeg.filters import af_fade, vf_crop, vf_fade, vf_subtitle
+from joker.studio.ffmpeg.subtitle import _styles
+
+
+def _chain(filters) -> str | None:
+    return ",".join(str(f) for f in filters) or None
+
+
+def mkcod_edit(
+    path,
+    outpath,
+    head=0,
+    tail=0,
+    margins=None,
+    vfade=(0, 0),
+    afade=(0, 0),
+    subpath=None,
+    styles=None,
+):
+    """
+    One ffmpeg run for what mkcod_crop, mkcod_fade and mkcod_subtitle do.
+
+    Trimming seeks the input, so frames reach the filters with
+    timestamps from 0 at `head`: fades start at 0 and at the trimmed
+    length, and subtitles, timed on the original video, are burned
+    with timestamps shifted back by `head` around them.
+    """
+    xinfo = MediaInfo(path)
+    length = xinfo.get_duration() - head - tail
+    if length <= 0:
+        raise ValueError("nothing left after trimming {}s, {}s".format(head, tail))
+
+    cod = utils.CommandOptionDict()
+    if head:
+        cod["ss"] = head
+    if head or tail:
+        cod["t"] = length
+    cod["i"] = path
+
+    vfilters = []
+    if margins:
+        width, height = xinfo.get_size()
+        vfilters.append(RawFilter(vf_crop(width, height, *margins)))
+    if subpath is not None:
+        if head:
+            vfilters.append(Filter("setpts", "PTS+{}/TB".format(head)))
+        vfilters.append(RawFilter(vf_subtitle(subpath, styles)))
+        if head:
+            vfilters.append(Filter("setpts", "PTS-{}/TB".format(head)))
+        cod.inputs.append(subpath)
+    # after subtitles, to fade them with the picture
+    if any(vfade):
+        vfilters.append(RawFilter(vf_fade(0, length, *vfade)))
+    afilters = []
+    if any(afade):
+        afilters.append(RawFilter(af_fade(0, length, *afade)))
+
+    if vfilters:
+        cod["vf"] = _chain(vfilters)
+    else:
+        cod["c:v"] = "copy"
+    if afilters:
+        cod["af"] = _chain(afilters)
+    else:
+        cod["c:a"] = "copy"
+    return cod("ffmpeg", outpath)
+
+
+def run(prog=None, args=None):
+    desc = "crop, trim, fade and burn subtitles in a single encode"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    utils.add_dry_option(parser)
+    utils.add_probe_options(parser)
+    utils.add_batch_options(parser)
+
+    parser.add_argument(
+        "-c",
+        "--crop",
+        type=float,
+        nargs=4,
+        metavar=("top", "right", "bottom", "left"),
+        help="crop video in image dimensions",
+    )
+    parser.add_argument(
+        "-t",
+        "--trim",
+        type=float,
+        nargs=2,
+        metavar=("head", "tail"),
+        help="trim media in time dimension",
+    )
+    parser.add_argument(
+        "-v",
+        type=float,
+        nargs=2,
+        metavar=("IN", "OUT"),
+        help="video fade-in and fade-out lengths, in sec",
+    )
+    parser.add_argument(
+        "-a",
+        type=float,
+        nargs=2,
+        metavar=("IN", "OUT"),
+        help="audio fade-in and fade-out lengths, in sec",
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-s", "--sub", metavar="PATH", help="an SRT file to burn")
+    group.add_argument(
+        "-S",
+        "--auto-sub",
+        action="store_true",
+        help="burn the SRT file beside each video, if any",
+    )
+    add_input_options(parser, help="video files")
+
+    ns = parser.parse_args(args)
+    paths = get_input_paths(parser, ns, get_extensions(MEDIATYPE_VIDEO))
+    head, tail = ns.trim or (0, 0)
+
+    def _iter_cods():
+        for path in paths:
+            px = pathlib.Path(path)
+            subpath = ns.sub
+            if ns.auto_sub and os.path.isfile(px.with_suffix(".srt")):
+                subpath = px.with_suffix(".srt")
+            outpath = px.with_suffix(".edit" + px.suffix)
+            try:
+                yield mkcod_edit(
+                    path,
+                    outpath,
+                    head,
+                    tail,
+                    ns.crop,
+                    ns.v or (0, 0),
+                    ns.a or (0, 0),
+                    subpath,
+                    _styles,
+                )
+            except Exception as e:
+                printerr("path:", path)
+                printerr(e)
+
+    return utils.run_commands(_iter_cods(), ns)
+
+
+if __name__ == "__main__":
+    run()
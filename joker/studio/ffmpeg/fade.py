@@ -4,9 +4,13 @@
 import argparse
 import pathlib
 
+from joker.cast.syntax import printerr
+
 from joker.studio.aux import utils
 from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.paths import add_input_options, get_input_paths
 from joker.studio.aux.utils import CommandOptionDict
+from joker.studio.ffmpeg.conv import MEDIATYPE_VIDEO, get_extensions
 from joker.studio.ffmpeg.filters import af_fade, vf_fade
 
 
@@ -36,6 +40,8 @@ def run(prog=None, args=None):
     desc = "Add fade-in and fade-out to audios"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     utils.add_dry_option(parser)
+    utils.add_probe_options(parser)
+    utils.add_batch_options(parser)
 
     parser.add_argument(
         "-a",
@@ -53,16 +59,24 @@ def run(prog=None, args=None):
         help="video fade-in and fade-out lengths, in sec",
     )
 
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="input video files")
+    add_input_options(parser, help="input video files")
 
     ns = parser.parse_args(args)
-    for path in ns.paths:
-        px = pathlib.Path(path)
-        outpath = px.with_suffix(".fade" + px.suffix)
-        vfi, vfo = ns.v or (0, 0)
-        afi, afo = ns.a or (0, 0)
-        cod = mkcod_fade(path, outpath, vfi, vfo, afi, afo)
-        cod.run(ns.dry)
+    paths = get_input_paths(parser, ns, get_extensions(MEDIATYPE_VIDEO))
+    vfi, vfo = ns.v or (0, 0)
+    afi, afo = ns.a or (0, 0)
+
+    def _iter_cods():
+        for path in paths:
+            px = pathlib.Path(path)
+            outpath = px.with_suffix(".fade" + px.suffix)
+            try:
+                yield mkcod_fade(path, outpath, vfi, vfo, afi, afo)
+            except Exception as e:
+                printerr("path:", path)
+                printerr(e)
+
+    return utils.run_commands(_iter_cods(), ns)
 
 
 if __name__ == "__main__":
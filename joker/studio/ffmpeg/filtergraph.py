@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Filtergraphs of nodes connected by labeled pads, compiled to
+-filter_complex, for work on several streams and outputs in one run:
+
+    graph = FilterGraph()
+    v = graph.input(0, "v")
+    v = graph.apply(v, Filter("crop", 1280, 720, 0, 0))
+    hi, lo = graph.split(v)
+    graph.output(graph.apply(hi, Filter("scale", -2, 720)), "hi.mp4")
+    graph.output(graph.apply(lo, Filter("scale", -2, 360)), "lo.mp4")
+    cod = graph.mkcod(["in.mp4"])
+
+See https://ffmpeg.org/ffmpeg-filters.html#Filtergraph-syntax-1
+"""
+
+from __future__ import annotations
+
+from joker.studio.aux.utils import CommandOptionDict
+
+
+class FilterGraphError(ValueError):
+    pass
+
+
+def _escape(text: str, specials: str) -> str:
+    return "".join("\\" + c if c in specials else c for c in text)
+
+
+def escape_value(value) -> str:
+    """Escape an option value of a filter, e.g. a path with colons"""
+    return _escape(str(value), "\\':")
+
+
+def escape_filter(text: str) -> str:
+    """Escape a filter description to be put in a filtergraph"""
+    return _escape(text, "\\'[],;")
+
+
+class Filter(object):
+    """
+    A filter with positional and named options, unescaped:
+
+        Filter("scale", -2, 720)
+        Filter("subtitles", filename="a:b.srt", force_style="Fontsize=46")
+    """
+
+    def __init__(self, name: str, *args, **kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        parts = [escape_value(a) for a in self.args]
+        for key, value in self.kwargs.items():
+            if value is not None:
+                parts.append("{}={}".format(key, escape_value(value)))
+        if not parts:
+            return escape_filter(self.name)
+        return escape_filter("{}={}".format(self.name, ":".join(parts)))
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, str(self))
+
+
+class RawFilter(Filter):
+    """A filter or chain already escaped, e.g. of vf_fade()"""
+
+    def __init__(self, text: str):
+        super().__init__(text.split("=", 1)[0])
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+class Stream(object):
+    """A pad of an input file or a node, "v" for video, "a" for audio"""
+
+    __slots__ = ["label", "kind", "node"]
+
+    def __init__(self, label: str, kind: str = None, node: Node = None):
+        self.label = label
+        self.kind = kind
+        self.node = node
+
+    @property
+    def spec(self) -> str:
+        return "[{}]".format(self.label)
+
+    def __repr__(self):
+        return "Stream({!r})".format(self.label)
+
+
+class Node(object):
+    """A chain of filters, from its input pads to its output pads"""
+
+    def __init__(self, inputs: list[Stream], filters: list[Filter]):
+        self.inputs = inputs
+        self.filters = filters
+        self.outputs = []
+
+    def __str__(self):
+        ins = "".join(s.spec for s in self.inputs)
+        outs = "".join(s.spec for s in self.outputs)
+        return ins + ",".join(str(f) for f in self.filters) + outs
+
+
+class FilterGraph(object):
+    def __init__(self):
+        self.nodes = []
+        # (streams, output path, options)
+        self.outputs = []
+        self._count = 0
+
+    def _new_stream(self, kind: str, node: Node) -> Stream:
+        self._count += 1
+        label = "{}{}".format(kind or "s", self._count)
+        stream = Stream(label, kind, node)
+        node.outputs.append(stream)
+        return stream
+
+    @staticmethod
+    def input(index: int, kind: str = None, optional=False) -> Stream:
+        """
+        Stream of the index-th input file; kind "v" or "a" if any.
+        An optional stream, only to be mapped to outputs, is left out
+        if the input has none, e.g. the audio of a silent video.
+        """
+        label = str(index) if kind is None else "{}:{}".format(index, kind)
+        if optional:
+            label += "?"
+        return Stream(label, kind)
+
+    def apply(self, inputs, *filters, outputs=1, kind=None):
+        """
+        Add a node with inputs, a Stream or a list of them, through filters;
+        return its output Stream, or a list of them if outputs > 1.
+        The kind of outputs is that of the first input unless given.
+        """
+        if isinstance(inputs, Stream):
+            inputs = [inputs]
+        if not inputs or not filters:
+            raise FilterGraphError("a node needs inputs and filters")
+        node = Node(list(inputs), list(filters))
+        self.nodes.append(node)
+        kind = kind or inputs[0].kind
+        streams = [self._new_stream(kind, node) for _ in range(outputs)]
+        return streams[0] if outputs == 1 else streams
+
+    def split(self, stream: Stream, n=2) -> list[Stream]:
+        """Copies of stream, to be filtered separately after one decode"""
+        name = "asplit" if stream.kind == "a" else "split"
+        return self.apply(stream, Filter(name, n), outputs=n)
+
+    def concat(self, segments: list[list[Stream]], v=1, a=0) -> list[Stream]:
+        """
+        Join segments, each a list of v video then a audio streams;
+        return v video then a audio streams of the whole.
+        """
+        inputs = []
+        for segment in segments:
+            if len(segment) != v + a:
+                raise FilterGraphError("a segment needs {} streams".format(v + a))
+            inputs.extend(segment)
+        node = Node(inputs, [Filter("concat", n=len(segments), v=v, a=a)])
+        self.nodes.append(node)
+        kinds = ["v"] * v + ["a"] * a
+        return [self._new_stream(k, node) for k in kinds]
+
+    def output(self, streams, path, **options):
+        """Map streams, a Stream or a list, to an output file with options"""
+        if isinstance(streams, Stream):
+            streams = [streams]
+        self.outputs.append((list(streams), path, options))
+
+    def validate(self):
+        consumers = {}
+        for node in self.nodes:
+            for s in node.inputs:
+                if s.node is not None:
+                    consumers[id(s)] = consumers.get(id(s), 0) + 1
+        for streams, _, _ in self.outputs:
+            for s in streams:
+                if s.node is not None:
+                    consumers[id(s)] = consumers.get(id(s), 0) + 1
+        for node in self.nodes:
+            for s in node.outputs:
+                n = consumers.get(id(s), 0)
+                if n != 1:
+                    msg = "pad {} is used {} times; split it to use it again"
+                    raise FilterGraphError(msg.format(s.spec, n))
+
+    def compile(self) -> str:
+        """The -filter_complex argument"""
+        self.validate()
+        return ";".join(str(node) for node in self.nodes)
+
+    def get_output_args(self) -> list:
+        """Arguments after the input options, per output: -map ... path"""
+        args = []
+        for streams, path, options in self.outputs:
+            for s in streams:
+                # input streams are mapped by specifier, not label
+                args.extend(["-map", s.spec if s.node is not None else s.label])
+            for key, value in options.items():
+                args.append("-" + key)
+                if isinstance(value, (tuple, list)):
+                    args.extend(value)
+                elif value is not None:
+                    args.append(value)
+            args.append(path)
+        return args
+
+    def mkcod(self, inputs: list, executable="ffmpeg") -> CommandOptionDict:
+        """
+        ffmpeg -i IN ... -filter_complex GRAPH -map ... OUT -map ... OUT
+        :param inputs: paths, or (path, options) pairs for options
+            like ss and t, which go before their -i
+        """
+        if not self.outputs:
+            raise FilterGraphError("no output")
+        cod = CommandOptionDict()
+        # keys of a CommandOptionDict are unique; -i holds the first input
+        # and further inputs go to pargs, as -filter_complex is global
+        args = []
+        for i, item in enumerate(inputs):
+            path, options = item if isinstance(item, tuple) else (item, {})
+            cod.inputs.append(path)
+            if i == 0:
+                cod.update(options)
+                cod["i"] = path
+                continue
+            for key, value in options.items():
+                args.extend(["-" + key, value])
+            args.extend(["-i", path])
+        cod["filter_complex"] = self.compile()
+        args.extend(self.get_output_args())
+        cod(executable, *args)
+        # all but the last output, which is pargs[-1]
+        cod.outputs = [path for _, path, _ in self.outputs[:-1]]
+        return cod
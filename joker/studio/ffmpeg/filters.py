@@ -2,6 +2,7 @@
 # coding: utf-8
 
 from joker.studio.aux.utils import rel_shorthand
+from joker.studio.ffmpeg.filtergraph import Filter
 
 
 def vf_crop(width, height, *margins):
@@ -12,12 +13,12 @@ def vf_crop(width, height, *margins):
 
 
 def vf_subtitle(path, styles):
-    if not styles:
-        return "subtitles=" + path
-    if isinstance(styles, dict):
-        styles = styles.items()
-    stl = ",".join("{}={}".format(*p) for p in styles)
-    return "subtitles={}:force_style='{}'".format(path, stl)
+    style = None
+    if styles:
+        if isinstance(styles, dict):
+            styles = styles.items()
+        style = ",".join("{}={}".format(*p) for p in styles)
+    return str(Filter("subtitles", filename=path, force_style=style))
 
 
 def af_fade(cutin, cutout, fadein, fadeout):
@@ -30,8 +31,13 @@ def af_fade(cutin, cutout, fadein, fadeout):
     :param fadeout: (number) length of audio where fade-out applied, in sec
     :return: (str) ffmpeg audio filter string
     """
-    a = cutin, fadein, cutout - fadeout, fadeout
-    return "afade=t=in:st={}:d={},afade=t=out:st={}:d={}".format(*a)
+    # d=0 means the default length to ffmpeg, not no fade
+    parts = []
+    if fadein:
+        parts.append("afade=t=in:st={}:d={}".format(cutin, fadein))
+    if fadeout:
+        parts.append("afade=t=out:st={}:d={}".format(cutout - fadeout, fadeout))
+    return ",".join(parts)
 
 
 def vf_fade(cutin, cutout, fadein, fadeout, color="black"):
@@ -45,5 +51,11 @@ def vf_fade(cutin, cutout, fadein, fadeout, color="black"):
     :param color: (str)
     :return: (str) ffmpeg video filter string
     """
-    a = cutin, fadein, color, cutout - fadeout, fadeout, color
-    return "fade=t=in:st={}:d={}:c={},fade=t=out:st={}:d={}:c={}".format(*a)
+    # d=0 means the default length to ffmpeg, not no fade
+    parts = []
+    if fadein:
+        parts.append("fade=t=in:st={}:d={}:c={}".format(cutin, fadein, color))
+    if fadeout:
+        a = cutout - fadeout, fadeout, color
+        parts.append("fade=t=out:st={}:d={}:c={}".format(*a))
+    return ",".join(parts)
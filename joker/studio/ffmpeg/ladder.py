@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Renditions of a video at several sizes, e.g. 1080p, 720p and 480p for
+web delivery, from a single decode: frames are split and each branch
+is scaled and encoded to an output of its own, in one ffmpeg run.
+
+A ladder is a list of renditions, each with a name, put in output file
+names, a width and/or a height, and ffmpeg output options:
+
+    [
+        {"name": "720p", "height": 720, "b:v": "2800k", "b:a": "128k"},
+        {"name": "480p", "height": 480, "b:v": "1400k", "b:a": "96k"}
+    ]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+
+from joker.cast.syntax import printerr
+
+from joker.studio.aux import utils
+from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.ffmpeg.conv import MEDIATYPE_VIDEO, get_extensions
+from joker.studio.ffmpeg.filtergraph import Filter, FilterGraph
+
+ladder_presets = {
+    "web": [
+        {"name": "1080p", "height": 1080, "b:v": "5000k", "b:a": "192k"},
+        {"name": "720p", "height": 720, "b:v": "2800k", "b:a": "128k"},
+        {"name": "480p", "height": 480, "b:v": "1400k", "b:a": "96k"},
+    ],
+    "mobile": [
+        {"name": "720p", "height": 720, "b:v": "2000k", "b:a": "128k"},
+        {"name": "480p", "height": 480, "b:v": "1000k", "b:a": "96k"},
+        {"name": "360p", "height": 360, "b:v": "600k", "b:a": "64k"},
+    ],
+}
+
+
+def load_ladder(spec: str) -> list[dict]:
+    """Renditions of a preset name, or of a JSON file at path spec"""
+    if spec in ladder_presets:
+        return ladder_presets[spec]
+    with open(spec) as fin:
+        ladder = json.load(fin)
+    if isinstance(ladder, dict):
+        ladder = ladder.get("renditions")
+    if not isinstance(ladder, list) or not ladder:
+        raise ValueError("no renditions in {}".format(spec))
+    for r in ladder:
+        if not isinstance(r, dict) or "name" not in r:
+            raise ValueError("a rendition needs a name: {}".format(r))
+        if "width" not in r and "height" not in r:
+            raise ValueError("a rendition needs a width or height: {}".format(r))
+    return ladder
+
+
+def mkcod_ladder(path, renditions, outext=".mp4"):
+    """
+    One ffmpeg run writing a rendition per output, as <stem>.<name><outext>;
+    renditions larger than the source are left out, not to upscale.
+    """
+    width, height = MediaInfo(path).get_size()
+    sizes = []
+    for r in renditions:
+        w, h = utils.rescale(width, height, r.get("width"), r.get("height"))
+        if w <= width and h <= height:
+            sizes.append((r, w, h))
+    if not sizes:
+        msg = "source {}x{} is smaller than all renditions"
+        raise ValueError(msg.format(width, height))
+
+    px = pathlib.Path(path)
+    graph = FilterGraph()
+    v = graph.input(0, "v")
+    branches = graph.split(v, len(sizes)) if len(sizes) > 1 else [v]
+    for (r, w, h), branch in zip(sizes, branches):
+        scaled = graph.apply(branch, Filter("scale", w, h))
+        options = dict(r)
+        for key in ("name", "width", "height"):
+            options.pop(key, None)
+        outpath = str(px.with_suffix(".{}{}".format(r["name"], outext)))
+        audio = graph.input(0, "a", optional=True)
+        graph.output([scaled, audio], outpath, **options)
+    return graph.mkcod([path])
+
+
+def run(prog=None, args=None):
+    desc = "encode renditions at several sizes from a single decode"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    utils.add_dry_option(parser)
+    utils.add_probe_options(parser)
+    utils.add_batch_options(parser)
+
+    parser.add_argument(
+        "-l",
+        "--ladder",
+        default="web",
+        metavar="PRESET|PATH",
+        help="a preset, {}, or a JSON file of renditions "
+        "(default: %(default)s)".format(", ".join(ladder_presets)),
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        dest="fmt",
+        default="mp4",
+        help="out video format, e.g. mp4, webm, ...",
+    )
+    add_input_options(parser, help="video files")
+
+    ns = parser.parse_args(args)
+    try:
+        renditions = load_ladder(ns.ladder)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    paths = get_input_paths(parser, ns, get_extensions(MEDIATYPE_VIDEO))
+    outext = ("." + ns.fmt).replace("..", ".")
+
+    def _iter_cods():
+        for path in paths:
+            try:
+                yield mkcod_ladder(path, renditions, outext)
+            except Exception as e:
+                printerr("path:", path)
+                printerr(e)
+
+    return utils.run_commands(_iter_cods(), ns)
+
+
+if __name__ == "__main__":
+    run()
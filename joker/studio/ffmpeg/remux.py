@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Stream-copy what the target container accepts, transcoding only the
+other streams, e.g. H.264/AAC in MKV or TS to MP4 in seconds of I/O
+instead of minutes of encoding.
+"""
+
+from __future__ import annotations
+
+import os
+
+from joker.studio.aux import utils
+
+# format names of mediainfo to codec names of ffmpeg (and ffprobe)
+_mediainfo_codec_names = {
+    "avc": "h264",
+    "hevc": "hevc",
+    "av1": "av1",
+    "vp8": "vp8",
+    "vp9": "vp9",
+    "mpeg-4 visual": "mpeg4",
+    "mpeg video": "mpeg2video",
+    "aac": "aac",
+    "ac-3": "ac3",
+    "e-ac-3": "eac3",
+    "dts": "dts",
+    "opus": "opus",
+    "vorbis": "vorbis",
+    "flac": "flac",
+    "alac": "alac",
+    "wma": "wmav2",
+    "utf-8": "subrip",
+    "ass": "ass",
+    "ssa": "ssa",
+    "timed text": "mov_text",
+    "webvtt": "webvtt",
+    "pgs": "hdmv_pgs_subtitle",
+    "vobsub": "dvd_subtitle",
+}
+
+_pcm_codecs = {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}
+
+
+def get_codec_name(track) -> str | None:
+    """Codec name of a track as ffmpeg calls it, from either probe engine"""
+    if track.codec_name:
+        return track.codec_name
+    fmt = (track.format or "").lower()
+    if fmt == "mpeg audio":
+        layer = (track.format_profile or "").lower()
+        return "mp2" if "layer 2" in layer else "mp3"
+    if fmt == "mpeg video" and "1" in str(track.format_version or ""):
+        return "mpeg1video"
+    if fmt == "pcm":
+        return "pcm_s16le"
+    return _mediainfo_codec_names.get(fmt)
+
+
+class Container(object):
+    """
+    Codecs accepted by an output format, per kind of stream, and
+    encoders for the others; None accepts any codec of the kind,
+    and a kind without encoder is left out of the output.
+    """
+
+    def __init__(self, video=(), audio=(), subtitle=(), encoders=None):
+        self.accepted = {
+            "video": None if video is None else set(video),
+            "audio": None if audio is None else set(audio),
+            "subtitle": None if subtitle is None else set(subtitle),
+        }
+        self.encoders = encoders or {}
+
+    def accepts(self, kind: str, codec: str | None) -> bool:
+        accepted = self.accepted[kind]
+        if accepted is None:
+            return codec is not None
+        return codec in accepted
+
+    def has_kind(self, kind: str) -> bool:
+        return self.accepted[kind] != set() or kind in self.encoders
+
+
+_mp4 = Container(
+    video={"h264", "hevc", "mpeg4", "av1", "vp9"},
+    audio={"aac", "mp3", "ac3", "eac3", "alac"},
+    subtitle={"mov_text"},
+    encoders={"video": "libx264", "audio": "aac", "subtitle": "mov_text"},
+)
+
+containers = {
+    ".mp4": _mp4,
+    ".mov": _mp4,
+    ".mkv": Container(
+        video=None,
+        audio=None,
+        subtitle={"subrip", "ass", "ssa", "webvtt", "hdmv_pgs_subtitle"},
+        encoders={"video": "libx264", "audio": "aac", "subtitle": "ass"},
+    ),
+    ".webm": Container(
+        video={"vp8", "vp9", "av1"},
+        audio={"opus", "vorbis"},
+        subtitle={"webvtt"},
+        encoders={"video": "libvpx-vp9", "audio": "libopus", "subtitle": "webvtt"},
+    ),
+    ".ts": Container(
+        video={"h264", "hevc", "mpeg2video"},
+        audio={"aac", "mp3", "mp2", "ac3", "eac3"},
+        encoders={"video": "libx264", "audio": "aac"},
+    ),
+    ".flv": Container(
+        video={"h264"},
+        audio={"aac", "mp3"},
+        encoders={"video": "libx264", "audio": "aac"},
+    ),
+    ".mp3": Container(audio={"mp3"}, encoders={"audio": "libmp3lame"}),
+    ".aac": Container(audio={"aac"}, encoders={"audio": "aac"}),
+    ".ogg": Container(
+        audio={"vorbis", "opus", "flac"}, encoders={"audio": "libvorbis"}
+    ),
+    ".flac": Container(audio={"flac"}, encoders={"audio": "flac"}),
+    ".wav": Container(audio=_pcm_codecs, encoders={"audio": "pcm_s16le"}),
+}
+
+# text subtitles, which can be converted to one another
+_text_subtitles = {"subrip", "ass", "ssa", "mov_text", "webvtt", "text"}
+
+# ADTS audio, as in MPEG-TS, is to be converted for these formats
+_asc_formats = {".mp4", ".mov", ".mkv", ".flv"}
+_adts_sources = {"mpegts", "aac", "mpeg-ts", "adts"}
+
+# stream specifiers of -map, V for video but cover art
+_specifiers = {"video": "V", "audio": "a", "subtitle": "s"}
+_track_kinds = {"video": "video", "audio": "audio", "text": "subtitle"}
+
+
+def _is_adts_source(path: str, tracks) -> bool:
+    if os.path.splitext(path)[1].lower() in {".ts", ".m2ts", ".aac"}:
+        return True
+    for tr in tracks:
+        if tr.track_type.lower() == "general":
+            name = tr.format_name or tr.format or ""
+            return name.lower() in _adts_sources
+    return False
+
+
+def plan_streams(tracks, container: Container) -> list[tuple]:
+    """
+    Streams to put in the output, as (kind, index in kind, codec, action)
+    where action is "copy" or an encoder.
+    """
+    plan = []
+    counts = {}
+    for tr in tracks:
+        kind = _track_kinds.get(tr.track_type.lower())
+        if kind is None:
+            continue
+        index = counts.get(kind, 0)
+        counts[kind] = index + 1
+        if not container.has_kind(kind):
+            continue
+        codec = get_codec_name(tr)
+        if container.accepts(kind, codec):
+            plan.append((kind, index, codec, "copy"))
+        elif kind == "subtitle" and codec not in _text_subtitles:
+            # bitmap subtitles cannot be converted to text
+            continue
+        elif kind in container.encoders:
+            plan.append((kind, index, codec, container.encoders[kind]))
+    return plan
+
+
+def mkcod_remux(path, outpath, tracks):
+    """
+    Map each stream of the input with -c copy where the output format
+    accepts its codec; None if the output format is unknown or no
+    stream would be copied, to be left to a plain conversion.
+    """
+    container = containers.get(os.path.splitext(str(outpath))[1].lower())
+    if container is None:
+        return None
+    plan = plan_streams(tracks, container)
+    if not any(action == "copy" for _, _, _, action in plan):
+        return None
+    cod = utils.CommandOptionDict([("i", path)])
+    maps = []
+    out_counts = {}
+    for kind, index, codec, action in plan:
+        spec = _specifiers[kind]
+        maps.extend(["-map", "0:{}:{}".format(spec, index)])
+        n = out_counts.get(kind, 0)
+        out_counts[kind] = n + 1
+        cod["c:{}:{}".format(spec.lower(), n)] = action
+        if action == "copy" and codec == "aac" and _is_adts_source(path, tracks):
+            if os.path.splitext(str(outpath))[1].lower() in _asc_formats:
+                cod["bsf:a:{}".format(n)] = "aac_adtstoasc"
+    return cod("ffmpeg", *maps, outpath)
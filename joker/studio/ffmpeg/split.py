@@ -79,6 +79,8 @@ def run(prog=None, args=None):
     desc = "Split a video uniformly or at specified positions"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     utils.add_dry_option(parser)
+    utils.add_probe_options(parser)
+    utils.add_batch_options(parser)
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -112,8 +114,7 @@ def run(prog=None, args=None):
     else:
         step = mspl.duration / ns.num if ns.num else ns.step
         cods = mspl.uniform_split(step)
-    for cod in cods:
-        cod.run(ns.dry)
+    return utils.run_commands(cods, ns)
 
 
 if __name__ == "__main__":
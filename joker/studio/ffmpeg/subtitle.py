@@ -16,6 +16,7 @@ def mkcod_subtitle(path, subpath, styles, outpath):
             ("vf", vf_subtitle(subpath, styles)),
         ]
     )
+    cod.inputs.append(subpath)
     return cod("ffmpeg", outpath)
 
 
@@ -58,6 +59,7 @@ def run(prog=None, args=None):
     desc = "Burn subtitle into a video"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     utils.add_dry_option(parser)
+    utils.add_batch_options(parser)
     parser.add_argument("-s", "--sub", metavar="PATH", help="an SRT file")
     parser.add_argument("path", metavar="PATH", help="a video file")
     ns = parser.parse_args(args)
@@ -65,7 +67,7 @@ def run(prog=None, args=None):
     subpath = ns.sub or px.with_suffix(".srt")
     outpath = px.with_suffix(".wSub" + px.suffix)
     cod = mkcod_subtitle(ns.path, subpath, _styles, outpath)
-    cod.run(ns.dry)
+    return utils.run_commands([cod], ns)
 
 
 if __name__ == "__main__":
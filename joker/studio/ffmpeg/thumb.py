@@ -8,6 +8,8 @@ import pathlib
 from joker.cast.syntax import printerr
 
 from joker.studio.aux import utils
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.ffmpeg.conv import MEDIATYPE_VIDEO, get_extensions
 
 
 def mkcod_video_poster(path, outpath, pos):
@@ -56,19 +58,34 @@ def mkcod_video_thumbnail(path, outpath, tspan, count=None, size=None):
     return cod("ffmpeg", outpath)
 
 
-def make_poster(path, ns):
+def mkcod_make_poster(path, ns):
     bx = os.path.splitext(path)
-    outpath = bx[0] + "." + ns.format
-    cod = mkcod_video_poster(path, outpath, 1)
-    cod.run(ns.dry)
+    outpath = bx[0] + "." + ns.fmt
+    return mkcod_video_poster(path, outpath, 1)
 
 
-def make_thumbnails(path, ns):
+def make_poster(path, ns):
+    mkcod_make_poster(path, ns).run(ns.dry)
+
+
+def mkcod_make_thumbnails(path, ns):
     ext = ("." + ns.format).replace("..", ".")
     px = pathlib.Path(path)
     outpath = px.with_suffix(ext)
-    cod = mkcod_video_thumbnail(path, outpath, ns.tspan)
-    cod.run(ns.dry)
+    return mkcod_video_thumbnail(path, outpath, ns.tspan)
+
+
+def make_thumbnails(path, ns):
+    mkcod_make_thumbnails(path, ns).run(ns.dry)
+
+
+def _iter_cods(mkcod, paths, ns):
+    for p in paths:
+        try:
+            yield mkcod(p, ns)
+        except Exception as e:
+            printerr("path:", p)
+            printerr(e)
 
 
 def poster(prog=None, args=None):
@@ -83,18 +100,13 @@ def poster(prog=None, args=None):
         help="out image format",
     )
 
-    parser.add_argument(
-        "--dry", action="store_true", help="print ffmpeg command but do not execute it"
-    )
+    utils.add_dry_option(parser)
+    utils.add_batch_options(parser)
 
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="an audio/video file")
+    add_input_options(parser, help="video files")
     ns = parser.parse_args(args)
-    for p in ns.paths:
-        try:
-            make_poster(p, ns)
-        except Exception as e:
-            printerr("path:", p)
-            printerr(e)
+    paths = get_input_paths(parser, ns, get_extensions(MEDIATYPE_VIDEO))
+    return utils.run_commands(_iter_cods(mkcod_make_poster, paths, ns), ns)
 
 
 def thumb(prog=None, args=None):
@@ -102,6 +114,7 @@ def thumb(prog=None, args=None):
     parser = argparse.ArgumentParser(prog=prog, description=desc)
     # TODO: ExtendedArgumentParser?
     utils.add_dry_option(parser)
+    utils.add_batch_options(parser)
 
     parser.add_argument(
         "-t",
@@ -115,8 +128,8 @@ def thumb(prog=None, args=None):
 
     parser.add_argument("-l", "--label", help="output file label")
 
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="an video file")
+    add_input_options(parser, help="video files")
 
     ns = parser.parse_args(args)
-    for p in ns.paths:
-        make_thumbnails(p, ns)
+    paths = get_input_paths(parser, ns, get_extensions(MEDIATYPE_VIDEO))
+    return utils.run_commands(_iter_cods(mkcod_make_thumbnails, paths, ns), ns)
@@ -4,7 +4,6 @@
 import pathlib
 import sys
 
-from PIL import Image
 from joker.cast.iterative import chunkwize_split
 
 
@@ -15,6 +14,9 @@ class AvatarMaker(object):
         self.ext = ext
 
     def convert_image(self, path):
+        # PIL is slow to import
+        from PIL import Image
+
         im = Image.open(path).convert("RGB")
         if not self.stretch:
             w, h = im.size
@@ -26,7 +28,7 @@ class AvatarMaker(object):
                 int((h + el) / 2.0),
             ]
             im = im.crop(box)
-        im = im.resize((self.size, self.size), Image.ANTIALIAS)
+        im = im.resize((self.size, self.size), Image.LANCZOS)
 
         px = pathlib.Path(path)
         prefix = "avatar-{0}x{0}.".format(self.size)
@@ -42,6 +44,8 @@ class AvatarMaker(object):
 
 def run(prog=None, args=None):
     import argparse
+    from joker.studio.aux.paths import add_input_options, get_input_paths
+    from joker.studio.ffmpeg.conv import MEDIATYPE_IMAGE, get_extensions
 
     desc = "make avatar"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
@@ -61,15 +65,17 @@ def run(prog=None, args=None):
         action="store_true",
         help="stretch image to a square (no crop)",
     )
-    parser.add_argument(
-        "filenames", metavar="FILENAME", nargs="+", help="path to an image file"
-    )
+    add_input_options(parser, dest="filenames", help="image files")
     ns = parser.parse_args(args)
     ext = "." + ns.format
-    AvatarMaker(ns.size, ext, ns.stretch).batch_convert(ns.filenames)
+    extensions = get_extensions(MEDIATYPE_IMAGE)
+    paths = get_input_paths(parser, ns, extensions, dest="filenames")
+    AvatarMaker(ns.size, ext, ns.stretch).batch_convert(paths)
 
 
 def convert_to_ico(path):
+    from PIL import Image
+
     px = pathlib.Path(path).with_suffix(".ico")
     img = Image.open(path)
     img.save(str(px))
@@ -170,21 +176,42 @@ def _average(nums):
     return sum(nums) / len(nums)
 
 
-def report_wh_ratios(_, args: list):
+def report_wh_ratios(prog=None, args=None):
+    import argparse
+    from joker.cast.syntax import printerr
+    from joker.studio.aux import utils
     from joker.studio.aux.info import MediaInfo
+    from joker.studio.aux.paths import add_input_options, get_input_paths
+    from joker.studio.ffmpeg.conv import MEDIATYPE_IMAGE, get_extensions
+
+    desc = "report width/height ratios of images"
+    parser = argparse.ArgumentParser(prog=prog, description=desc)
+    utils.add_probe_options(parser)
+    utils.add_jobs_option(parser, 4)
+    add_input_options(parser, dest="filenames", help="image files")
+    ns = parser.parse_args(args)
+    extensions = get_extensions(MEDIATYPE_IMAGE)
+    paths = get_input_paths(parser, ns, extensions, dest="filenames")
 
     ratios = []
     widths = []
     heights = []
-    for path in args:
-        xinfo = MediaInfo(path)
-        w = xinfo.image.width
-        h = xinfo.image.height
+    results = MediaInfo.probe_many(paths, ns.jobs, ordered=True)
+    for path, summary, error in results:
+        if error is None and summary.width is None:
+            error = ValueError("no image track found")
+        if error is not None:
+            printerr("path:", path)
+            printerr(error)
+            continue
+        w, h = summary.get_size()
         r = w / h
         print("{:.03f}".format(r), w, h, path)
         ratios.append(r)
         widths.append(w)
         heights.append(h)
+    if not ratios:
+        return
     avg_r = _average(ratios)
     avg_w = int(_average(widths))
     avg_h = int(_average(heights))
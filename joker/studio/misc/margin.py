@@ -3,10 +3,11 @@
 import argparse
 import pathlib
 
-import numpy
-from PIL import Image
 from joker.cast.syntax import printerr
 
+from joker.studio.aux.paths import add_input_options, iter_input_paths
+from joker.studio.ffmpeg.conv import MEDIATYPE_IMAGE, get_extensions
+
 STDMAX = 3
 
 
@@ -17,6 +18,9 @@ def get_corner_size(arr):
 
 class MarginDetection(object):
     def __init__(self, img, stdmax=STDMAX):
+        # numpy and PIL are slow to import, 100ms together
+        import numpy
+
         self.img = img.convert("RGB")
         self.arr = numpy.asarray(self.img).astype("uint32")
         self.maxstd = stdmax
@@ -49,6 +53,8 @@ class MarginDetection(object):
 
     @classmethod
     def from_file(cls, path, stdmax=STDMAX):
+        from PIL import Image
+
         return cls(Image.open(path), stdmax)
 
     def crop(self):
@@ -68,6 +74,8 @@ class MarginDetection(object):
         :param corner_pixels: ? x 3
         :return:
         """
+        import numpy
+
         for i in range(arr.shape[0]):
             line = arr[i, :, :]
             line.shape = -1, 3
@@ -101,11 +109,12 @@ def run(prog=None, args=None):
     pr.add_argument(
         "-B", "--no-backup", action="store_true", help="do NOT backup original file"
     )
-    pr.add_argument(
-        "files", nargs="*", metavar="PATH", help="paths to files to be cropped"
-    )
+    add_input_options(pr, dest="files", help="paths to files to be cropped")
     ns = pr.parse_args(args)
-    for path in ns.files:
+    image_extensions = get_extensions(MEDIATYPE_IMAGE)
+    for path in iter_input_paths(
+        ns.files, ns.recursive, ns.from_file, image_extensions
+    ):
         try:
             margin_crop(path, ns.stdmax, not ns.no_backup)
         except Exception as e:
@@ -14,19 +14,38 @@ from subprocess import PIPE
 from joker.filesys.utils import checksum
 
 from joker.studio.aux import utils
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.aux.profiling import span
 from joker.studio.aux.utils import format_help_section
 from joker.studio.ffmpeg.thumb import mkcod_video_thumbnail
 
+# summaries probed in advance by prefetch_xinfos()
+_prefetched_xinfos = {}
 
-@lru_cache(maxsize=64)
+
+@lru_cache(maxsize=4096)
 def get_xinfo(path):
     from joker.studio.aux.info import MediaInfo
 
-    return MediaInfo(path)
+    xinfo = _prefetched_xinfos.pop(str(path), None)
+    if xinfo is None:
+        xinfo = MediaInfo(path).summarize()
+    return xinfo
+
+
+def prefetch_xinfos(paths, jobs=4):
+    from joker.studio.aux.info import MediaInfo
+
+    paths = [os.path.abspath(p) for p in paths]
+    for path, xinfo, error in MediaInfo.probe_many(paths, jobs):
+        # on error, get_xinfo() will probe again and raise there
+        if error is None:
+            _prefetched_xinfos[path] = xinfo
 
 
 def compute_hash(px, algo="md5"):
-    return checksum(px, algo=algo).hexdigest()
+    with span("checksum", path=px):
+        return checksum(px, algo=algo).hexdigest()
 
 
 def compute_image_hash(px):
@@ -35,29 +54,32 @@ def compute_image_hash(px):
     from PIL import Image
 
     try:
-        ih = imagehash.average_hash(Image.open(str(px)))
+        with span("imagehash", path=px):
+            ih = imagehash.average_hash(Image.open(str(px)))
     except OSError:
         return "NotImage"
     return str(ih).upper()
 
 
-def compute_video_hash(px, hash_size=4, img_count=4):
+def compute_video_hash(px, hash_size=4, img_count=4, duration=None):
     # imagehash is slow to import, 250ms
     import imagehash
 
     path = str(px)
-    xinfo = get_xinfo(path)
-    duration = xinfo.get_video_duration()
+    if duration is None:
+        duration = get_xinfo(path).get_video_duration()
     params = {
         "tspan": 1.0 * duration / (img_count + 1),
         "count": img_count,
         "size": (160, 90),
     }
     cod = mkcod_video_thumbnail(path, "-", **params)
-    with open(os.devnull, "w") as devnull:
+    with span("decode.thumbnail", path=path), open(os.devnull, "w") as devnull:
         cp = cod.run(quiet=True, stdout=PIPE, stderr=devnull)
-    images = utils.split_stream_png(cp.stdout)
-    ihs = [imagehash.average_hash(img, hash_size) for img in images]
+    with span("split_stream_png"):
+        images = utils.split_stream_png(cp.stdout)
+    with span("imagehash"):
+        ihs = [imagehash.average_hash(img, hash_size) for img in images]
     return "".join([str(ih) for ih in ihs]).upper()
 
 
@@ -114,7 +136,7 @@ _known_fields = {
     "SHA256": partial(compute_hash, algo="sha256"),
     "SHA512": partial(compute_hash, algo="sha512"),
     "WxH": lambda px: "{}x{}".format(*get_xinfo(px).get_size()),
-    "DURATION": lambda px: get_duration,
+    "DURATION": get_duration,
     "EXT": lambda px: px.suffix[1:],
     "EXTL3": lambda px: lower3_extension(px.suffix)[1:],
     "STEM": lambda px: px.stem,
@@ -123,6 +145,9 @@ _known_fields = {
     "SANNAME": sanitize,
 }
 
+# fields computed with get_xinfo()
+_xinfo_fields = {"VH", "WxH", "DURATION"}
+
 _variables = {
     "IH": "imagehash.average_hash()",
     "VH": "video hash based on imagehash.average_hash()",
@@ -209,6 +234,16 @@ class FormulaRenamer(object):
         os.rename(old, interm)
         os.rename(interm, new)
 
+    def needs_xinfo(self):
+        return any(k in self._fields for k in _xinfo_fields)
+
+    def batch_rename(self, paths, jobs=4):
+        if jobs > 1 and self.needs_xinfo():
+            paths = list(paths)
+            prefetch_xinfos(paths, jobs)
+        for path in paths:
+            self.rename(path)
+
     def rename(self, path):
         path = os.path.abspath(path)
         px = pathlib.Path(path)
@@ -264,9 +299,10 @@ def run(prog=None, args=None):
         help="start number of the SERIAL variable",
     )
 
-    pr.add_argument("files", metavar="PATH", nargs="+")
+    utils.add_probe_options(pr)
+    utils.add_jobs_option(pr, 4)
+    add_input_options(pr, dest="files", help="files to rename")
 
     ns = pr.parse_args(args)
     fren = FormulaRenamer(ns.formula, ns.clear, ns.start)
-    for path in ns.files:
-        fren.rename(path)
+    fren.batch_rename(get_input_paths(pr, ns, dest="files"), ns.jobs)
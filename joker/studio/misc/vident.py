@@ -11,8 +11,10 @@ from joker.cast.syntax import printerr
 from joker.cast.timedate import sexagesimal_format, sexagesimal_parse
 from joker.textmanip.path import proper_filename
 
-from joker.studio.aux.info import MediaInfo
-from joker.studio.misc.rename import compute_video_hash
+from joker.studio.aux import utils
+from joker.studio.aux.info import MediaInfo, probe_file
+from joker.studio.aux.paths import add_input_options, get_input_paths
+from joker.studio.aux.utils import iter_concurrently
 
 
 class VideoIdentifier(object):
@@ -49,44 +51,51 @@ class VideoIdentifier(object):
         return cls(sexagesimal_parse(ds), fc, w, h)
 
     @classmethod
-    def from_name(cls, path):
-        xinfo = MediaInfo(path)
+    def from_name(cls, path, xinfo=None):
+        from joker.studio.misc.rename import compute_video_hash
+
+        if xinfo is None:
+            xinfo = MediaInfo(path).summarize()
         duration = xinfo.get_video_duration()
-        vh = compute_video_hash(path)
-        v = xinfo.video
-        return cls(duration, vh, v.width, v.height)
+        vh = compute_video_hash(path, duration=duration)
+        return cls(duration, vh, *xinfo.get_size())
 
     @classmethod
-    def make_name(cls, path):
+    def make_name(cls, path, xinfo=None):
         dir_, name = os.path.split(path)
         if name.startswith(cls.version):
             vident = cls.parse(name.split(".")[0])
             return vident, path
 
-        vident = cls.from_name(path)
+        vident = cls.from_name(path, xinfo)
         new_name = "{}.{}".format(vident, proper_filename(name))
         new_path = os.path.join(dir_, new_name)
         return vident, new_path
 
     @classmethod
-    def rename(cls, path):
-        vident, new_path = cls.make_name(path)
+    def rename(cls, path, xinfo=None):
+        vident, new_path = cls.make_name(path, xinfo)
         if new_path != path:
             print("new_path:", new_path, file=sys.stderr)
             os.rename(path, new_path)
         return vident, new_path
 
 
+video_extensions = {".mp4", ".ts", ".mkv"}
+
+
 def p_filter_by_extension(paths):
-    extensions = {".mp4", ".ts", ".mkv"}
+    # lazily, for paths streamed by aux.paths
     _splitext = os.path.splitext
-    return [p for p in paths if _splitext(p)[1] in extensions]
+    return (p for p in paths if _splitext(p)[1] in video_extensions)
+
+
+def is_prefixed(path):
+    return os.path.basename(path).startswith(VideoIdentifier.version)
 
 
 def p_filter_by_prefix(paths):
-    vp = VideoIdentifier.version
-    _split = os.path.split
-    return [p for p in paths if _split(p)[1].startswith(vp)]
+    return [p for p in paths if is_prefixed(p)]
 
 
 def keyfunc(pair):
@@ -94,10 +103,12 @@ def keyfunc(pair):
     return vi.w, path.endswith(".mp4")
 
 
-def show(paths):
-    for path in paths:
+def show(paths, jobs=4):
+    for path, xinfo, error in MediaInfo.probe_many(paths, jobs, ordered=True):
         try:
-            vi = VideoIdentifier.from_name(path)
+            if error is not None:
+                raise error
+            vi = VideoIdentifier.from_name(path, xinfo)
             print(vi, path, sep="\t")
         except Exception as e:
             # printerr(e)
@@ -105,16 +116,51 @@ def show(paths):
             printerr("bad file:", path)
 
 
-def add_vident_prefix(paths):
+def _probe_unless_prefixed(path):
+    if is_prefixed(path):
+        return None
+    return probe_file(path)
+
+
+def _probe_unprefixed(paths, jobs):
+    return iter_concurrently(_probe_unless_prefixed, paths, jobs)
+
+
+def _journal_key(path):
+    return "vid-a:" + os.path.abspath(path)
+
+
+def _resumed_path(journal, path):
+    # renamed in an interrupted run
+    entry = journal.entries.get(_journal_key(path))
+    if entry and entry["status"] == "done" and os.path.exists(entry["new_path"]):
+        return entry["new_path"]
+    return path
+
+
+def add_vident_prefix(paths, jobs=4, journal=None, resume=False):
     groups = defaultdict(list)
-    for path in p_filter_by_extension(paths):
+    paths = p_filter_by_extension(paths)
+    if resume:
+        paths = (_resumed_path(journal, p) for p in paths)
+    for path, xinfo, error in _probe_unprefixed(paths, jobs):
+        if error is not None:
+            printerr(error)
+            printerr("bad file:", path)
+            if journal is not None:
+                journal.record(_journal_key(path), "failed")
+            continue
         try:
-            vi, path = VideoIdentifier.rename(path)
+            vi, new_path = VideoIdentifier.rename(path, xinfo)
         except ValueError:
             traceback.print_exc()
             printerr("bad file:", path)
+            if journal is not None:
+                journal.record(_journal_key(path), "failed")
             continue
-        groups[vi.unikey].append((vi, path))
+        if journal is not None and new_path != path:
+            journal.record(_journal_key(path), "done", new_path=new_path)
+        groups[vi.unikey].append((vi, new_path))
 
     for pairs in groups.values():
         if len(pairs) < 2:
@@ -145,6 +191,9 @@ def remove_vident_prefix(paths):
 def run(prog=None, args=None):
     desc = "rename video files by adding or removing video identifier"
     parser = argparse.ArgumentParser(prog=prog, description=desc)
+    utils.add_probe_options(parser)
+    utils.add_jobs_option(parser, 4)
+    utils.add_journal_options(parser)
 
     # mutually exclusive
     group = parser.add_mutually_exclusive_group()
@@ -160,14 +209,16 @@ def run(prog=None, args=None):
         action="store_true",
         help="rename with vident prefix removed",
     )
-    parser.add_argument("paths", metavar="PATH", nargs="+", help="files")
+    add_input_options(parser, help="video files")
     ns = parser.parse_args(args)
+    paths = get_input_paths(parser, ns, video_extensions)
     if ns.add_prefix:
-        add_vident_prefix(ns.paths)
+        journal = utils.get_journal(ns)
+        add_vident_prefix(paths, ns.jobs, journal, ns.resume)
     elif ns.remove_prefix:
-        remove_vident_prefix(ns.paths)
+        remove_vident_prefix(paths)
     else:
-        show(ns.paths)
+        show(paths, ns.jobs)
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import os
 import re
+from pathlib import Path
 
 Pathlike = str | os.PathLike[str]
 
@@ -27,3 +28,30 @@ def sanitize_key(s: str):
     if s and s[0].isdigit():
         s = "_" + s
     return s
+
+
+def get_cache_dir() -> Path:
+    """Per-user cache dir, $JOKER_STUDIO_CACHE_DIR or ~/.cache/joker-studio"""
+    path = os.environ.get("JOKER_STUDIO_CACHE_DIR")
+    if path:
+        return Path(path)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / "joker-studio"
+
+
+def env_flag(name: str, default: bool = True) -> bool:
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value not in ("0", "no", "off", "false")
+
+
+_size_units = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+
+
+def parse_size(text: str) -> int:
+    """Number of bytes in e.g. "1024", "512M" or "20G" """
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", str(text).lower())
+    if not m:
+        raise ValueError("invalid size: {!r}".format(text))
+    return int(float(m.group(1)) * _size_units[m.group(2)])
@@ -53,8 +53,8 @@ config = {
     "install_requires": read("requirements.txt"),
     "entry_points": {
         "console_scripts": [
-            "dio = joker.studio.__main__:registry",
-            "joker-studio = joker.studio.__main__:registry",
+            "dio = joker.studio.__main__:main",
+            "joker-studio = joker.studio.__main__:main",
         ],
     },
     "classifiers": [
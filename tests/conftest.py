@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+import pytest
+
+from joker.studio.aux.utils import CommandOptionDict
+
+# like ffmpeg run without a terminal: an existing output is not
+# overwritten unless -y; `convert` rejects -y, as ImageMagick does.
+# FAKE_FAILS=N fails the first N runs, FAKE_SLEEP=SEC sleeps first.
+_fake_script = """\
+import json, os, sys, time
+
+name = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+if args == ["-version"]:
+    print(name, "version fake")
+    sys.exit(0)
+with open(os.environ["FAKE_LOG"], "a") as fout:
+    fout.write(json.dumps([name] + args) + "\\n")
+with open(os.environ["FAKE_LOG"] + ".pids", "a") as fout:
+    fout.write("{}\\n".format(os.getpid()))
+if name == "convert" and "-y" in args:
+    sys.exit("convert: unrecognized option `-y'")
+# a byte appended per run, safe for concurrent runs
+counter = os.environ["FAKE_LOG"] + ".runs"
+with open(counter, "a") as fout:
+    fout.write(".")
+with open(counter) as fin:
+    runs = len(fin.read()) - 1
+time.sleep(float(os.environ.get("FAKE_SLEEP", 0)))
+output = args[-1]
+sys.stderr.write("{} writing {}\\n".format(name, output))
+if name == "ffmpeg" and os.path.exists(output) and "-y" not in args:
+    sys.exit("File '{}' already exists. Exiting.".format(output))
+if runs < int(os.environ.get("FAKE_FAILS", 0)):
+    with open(output, "w") as fout:
+        fout.write("partial")
+    sys.exit("failed")
+with open(output, "w") as fout:
+    fout.write(" ".join(args[:-1]))
+"""
+
+
+class FakeBin(object):
+    def __init__(self, path):
+        self.path = path
+        self.log = os.path.join(path, "log.jsonl")
+
+    @property
+    def calls(self) -> list[list[str]]:
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as fin:
+            return [json.loads(line) for line in fin]
+
+    @property
+    def pids(self) -> list[int]:
+        if not os.path.exists(self.log + ".pids"):
+            return []
+        with open(self.log + ".pids") as fin:
+            return [int(line) for line in fin]
+
+
+@pytest.fixture
+def fake_bin(tmp_path, monkeypatch):
+    """Fake ffmpeg and convert on PATH, writing their args to the output"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    for name in ["ffmpeg", "convert"]:
+        path = bindir / name
+        path.write_text("#!{}\n{}".format(sys.executable, _fake_script))
+        path.chmod(0o755)
+    monkeypatch.setenv("PATH", "{}{}{}".format(bindir, os.pathsep, os.environ["PATH"]))
+    fake = FakeBin(str(bindir))
+    monkeypatch.setenv("FAKE_LOG", fake.log)
+    return fake
+
+
+@pytest.fixture
+def fake_media_info(monkeypatch):
+    """
+    Replace MediaInfo in a module with a stub of the given duration,
+    size and tracks, for building commands without probing files:
+
+        fake_media_info(edit, duration=60.0, size=(1920, 1080))
+    """
+
+    def _patch(module, duration=60.0, size=(1920, 1080), tracks=()):
+        class _FakeMediaInfo(object):
+            def __init__(self, path, *args, **kwargs):
+                self.path = path
+                self.tracks = list(tracks)
+
+            @staticmethod
+            def get_duration():
+                return duration
+
+            @staticmethod
+            def get_size():
+                return size
+
+        monkeypatch.setattr(module, "MediaInfo", _FakeMediaInfo)
+
+    return _patch
+
+
+def _mkcod(path, outpath, *options, executable="ffmpeg", **kwargs):
+    if executable == "ffmpeg":
+        cod = CommandOptionDict([("i", path)] + list(kwargs.items()))
+        return cod(executable, *options, outpath)
+    return CommandOptionDict(kwargs)(executable, path, *options, outpath)
+
+
+@pytest.fixture
+def mkcod():
+    """
+    Make a command of path to outpath, with ffmpeg options as keywords
+    and extra arguments before outpath; other executables take path
+    as an argument, like ImageMagick convert:
+
+        mkcod("a.mp4", "a.mkv", vf="scale=-2:720")
+        mkcod("a.png", "a.jpg", "-quality", "90", executable="convert")
+    """
+    return _mkcod
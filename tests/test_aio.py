@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from joker.studio.aux import aio, probe
+from joker.studio.aux.utils import CommandOptionDict
+
+
+def _python(code):
+    return CommandOptionDict()(sys.executable, "-c", code)
+
+
+async def _collect(cod):
+    return [item async for item in aio.astream(cod)]
+
+
+def test_arun():
+    code = "import sys; print('out'); sys.stderr.write('err'); sys.exit(3)"
+    cp = asyncio.run(aio.arun(_python(code), quiet=True, capture_output=True))
+    assert cp.returncode == 3
+    assert cp.stdout.strip() == b"out" and cp.stderr == b"err"
+    chunks = []
+    cp = asyncio.run(
+        aio.arun(_python("print('x')"), quiet=True, on_stdout=chunks.append)
+    )
+    assert b"".join(chunks).strip() == b"x" and cp.stdout is None
+    assert asyncio.run(aio.arun(_python(""), dry=True, quiet=True)) is None
+
+
+def test_astream_lines():
+    code = (
+        "import sys\n"
+        "sys.stderr.write('frame=1\\rframe=2\\rframe=3\\n')\n"
+        "sys.stderr.flush()\n"
+        "sys.stdout.write('a\\nb')\n"
+    )
+    items = asyncio.run(_collect(_python(code)))
+    stderr = [line for name, line in items if name == "stderr"]
+    stdout = [line for name, line in items if name == "stdout"]
+    # split at CR as at LF, the rest without a line end comes last
+    assert stderr == [b"frame=1", b"frame=2", b"frame=3"]
+    assert stdout == [b"a", b"b"]
+
+
+def test_astream_failed():
+    code = "import sys; print('started'); sys.exit(2)"
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        asyncio.run(_collect(_python(code)))
+    assert exc_info.value.returncode == 2
+
+
+def test_arun_many():
+    cods = [_python("import sys; sys.exit({})".format(i)) for i in range(3)]
+    cods.append(CommandOptionDict()("/nonexistent/ffmpeg"))
+    results = asyncio.run(aio.arun_many(cods, limit=2, quiet=True))
+    assert [r.returncode for r in results[:3]] == [0, 1, 2]
+    assert isinstance(results[3], FileNotFoundError)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_cancel_terminates_child():
+    code = "import os, time; print(os.getpid(), flush=True); time.sleep(60)"
+    pids = []
+
+    async def _main():
+        started = asyncio.Event()
+
+        def _on_stdout(chunk):
+            pids.append(int(chunk))
+            started.set()
+
+        task = asyncio.ensure_future(
+            aio.arun(_python(code), quiet=True, on_stdout=_on_stdout)
+        )
+        await asyncio.wait_for(started.wait(), 30)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_main())
+    assert not _is_alive(pids[0])
+
+
+def test_aprobe(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOKER_STUDIO_PROBE_CACHE", "0")
+    output = {
+        "format": {"format_name": "wav", "duration": "2.5"},
+        "streams": [{"index": 0, "codec_type": "audio", "codec_name": "pcm_s16le"}],
+    }
+    code = "import sys; print(sys.argv[1])"
+
+    def _ffprobe_args(path):
+        return [sys.executable, "-c", code, json.dumps(output)]
+
+    monkeypatch.setattr(probe, "ffprobe_args", _ffprobe_args)
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"")
+    summary = asyncio.run(aio.aprobe(path, engine="ffprobe"))
+    assert summary.duration == 2.5 and summary.has_track("audio")
+
+    def _ffprobe_args(path):
+        return [sys.executable, "-c", "import sys; sys.exit('bad file')"]
+
+    monkeypatch.setattr(probe, "ffprobe_args", _ffprobe_args)
+    with pytest.raises(ValueError, match="bad file"):
+        asyncio.run(aio.aprobe(path, engine="ffprobe"))
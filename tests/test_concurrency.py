@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import sys
+import time
+import types
+import wave
+
+import pytest
+
+from joker.studio.aux.info import MediaInfo
+from joker.studio.aux.utils import iter_concurrently
+
+
+def _sleep_then_invert(x):
+    # the first items take the longest
+    time.sleep(0.05 * (5 - x))
+    if x == 3:
+        raise ValueError(x)
+    return -x
+
+
+def _consumed(items, log):
+    for item in items:
+        log.append(item)
+        yield item
+
+
+def test_iter_concurrently():
+    results = list(iter_concurrently(_sleep_then_invert, range(5), workers=5))
+    assert [item for item, _, _ in results] == [4, 3, 2, 1, 0]
+    # an error is yielded, not raised
+    item, result, error = results[1]
+    assert result is None and isinstance(error, ValueError)
+    for workers in [1, 5]:
+        results = iter_concurrently(_sleep_then_invert, range(5), workers, ordered=True)
+        assert [r for _, r, _ in results] == [0, -1, -2, None, -4]
+
+
+def test_iter_concurrently_bounded():
+    log = []
+    items = _consumed(range(100), log)
+    results = iter_concurrently(_sleep_then_invert, items, workers=2, ordered=True)
+    assert next(results) == (0, 0, None)
+    # submitted at most twice as many as workers
+    assert len(log) <= 5
+    results.close()
+    assert len(log) <= 5
+
+
+def test_iter_concurrently_processes():
+    results = iter_concurrently(
+        _sleep_then_invert, [4, 1], workers=2, processes=True, ordered=True
+    )
+    assert [r for _, r, _ in results] == [-4, -1]
+
+
+def _write_wav(path, seconds):
+    with wave.open(str(path), "wb") as fout:
+        fout.setnchannels(1)
+        fout.setsampwidth(2)
+        fout.setframerate(8000)
+        fout.writeframes(b"\0\0" * 8000 * seconds)
+
+
+def test_probe_many(tmp_path, monkeypatch):
+    # durations read from wav headers, without ffprobe
+    monkeypatch.setenv("JOKER_STUDIO_PROBE_CACHE", "0")
+    paths = []
+    for seconds in [3, 1, 2]:
+        path = tmp_path / "{}.wav".format(seconds)
+        _write_wav(path, seconds)
+        paths.append(str(path))
+    paths.insert(1, str(tmp_path / "missing.wav"))
+    results = list(MediaInfo.probe_many(paths, workers=4, ordered=True))
+    assert [r.path for r in results] == paths
+    assert [r.info and r.info.duration for r in results] == [3.0, None, 1.0, 2.0]
+    assert isinstance(results[1].error, FileNotFoundError)
+    assert results[0].info.has_track("audio") and results[0].error is None
+
+
+def test_minfo_deprecated(monkeypatch):
+    parsed = []
+
+    def _parse(path):
+        parsed.append(path)
+        return types.SimpleNamespace(tracks=[])
+
+    fake = types.SimpleNamespace(MediaInfo=types.SimpleNamespace(parse=_parse))
+    monkeypatch.setitem(sys.modules, "pymediainfo", fake)
+    xinfo = MediaInfo("a.mp4", cache=False)
+    with pytest.deprecated_call():
+        assert xinfo.minfo.tracks == []
+    with pytest.deprecated_call():
+        xinfo.minfo
+    # parsed once, on first access
+    assert parsed == ["a.mp4"]
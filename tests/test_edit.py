@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+from joker.studio.ffmpeg import edit
+
+
+def test_mkcod_edit(fake_media_info):
+    fake_media_info(edit, duration=60.0, size=(1920, 1080))
+    cod = edit.mkcod_edit(
+        "in.mp4",
+        "out.mp4",
+        head=10,
+        tail=5,
+        margins=[0.1, 0],
+        vfade=(1, 2),
+        afade=(0, 3),
+        subpath="in.srt",
+    )
+    args = cod.as_args()
+    # trimmed by seeking the input
+    assert args[:7] == ["ffmpeg", "-ss", "10", "-t", "45.0", "-i", "in.mp4"]
+    assert cod["vf"] == (
+        "crop=1920:864:0:108,"
+        "setpts=PTS+10/TB,subtitles=filename=in.srt,setpts=PTS-10/TB,"
+        "fade=t=in:st=0:d=1:c=black,fade=t=out:st=43.0:d=2:c=black"
+    )
+    # no fade-in of length 0, which means the default length to ffmpeg
+    assert cod["af"] == "afade=t=out:st=42.0:d=3"
+    assert cod.inputs == ["in.srt"]
+
+
+def test_mkcod_edit_copy(fake_media_info):
+    fake_media_info(edit)
+    cod = edit.mkcod_edit("in.mp4", "out.mp4")
+    assert cod.as_args() == [
+        "ffmpeg", "-i", "in.mp4", "-c:v", "copy", "-c:a", "copy", "out.mp4",
+    ]  # fmt: skip
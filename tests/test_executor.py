@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from joker.studio.aux.utils import BatchSummary, CommandExecutor
+from joker.studio.ffmpeg import crop, fade
+
+
+def test_concurrent_stderr(fake_bin, mkcod, tmp_path, capfd):
+    # refused by ffmpeg without -y
+    (tmp_path / "b.mp4").write_text("b")
+    cods = [mkcod("{}.mkv".format(c), str(tmp_path / (c + ".mp4"))) for c in "abc"]
+    executor = CommandExecutor(jobs=3, quiet=True)
+    results = {r.cod.pargs[-1][-5:]: r for r in executor.iter_results(cods)}
+    # kept per job, not written to the terminal
+    assert capfd.readouterr().err == ""
+    assert results["a.mp4"].stderr.startswith("ffmpeg writing")
+    assert results["b.mp4"].returncode == 1
+    assert "b.mp4' already exists" in results["b.mp4"].stderr
+    assert results["c.mp4"].ok
+
+    summary = BatchSummary(results.values())
+    assert summary.executed == 3 and summary.exit_code == 1
+    (failed,) = summary.failures
+    assert failed is results["b.mp4"] and failed.reason == "exit code 1"
+    # stderr only of the failed one
+    file = io.StringIO()
+    assert summary.report(file) == 1
+    err = file.getvalue()
+    assert "2 succeeded, 0 skipped, 1 failed" in err
+    assert "b.mp4' already exists" in err
+    assert "a.mp4" not in err and "c.mp4" not in err
+
+
+def test_all_succeeded(fake_bin, mkcod, tmp_path):
+    cods = [mkcod("a.mkv", str(tmp_path / "{}.mp4".format(i))) for i in range(4)]
+    summary = CommandExecutor(jobs=2, quiet=True).run(cods)
+    assert summary.executed == 4 and summary.exit_code == 0
+    assert len(fake_bin.calls) == 4
+
+
+@pytest.mark.parametrize("module", [crop, fade])
+def test_unprobed_file_skipped(module, monkeypatch, capfd):
+    class _MediaInfo(object):
+        def __init__(self, path):
+            self.path = path
+
+        def _duration(self):
+            if self.path.startswith("bad"):
+                raise ValueError("no video track found")
+            return 60.0
+
+        get_video_duration = get_audio_duration = _duration
+
+        @staticmethod
+        def get_size():
+            return 1920, 1080
+
+    monkeypatch.setattr(module, "MediaInfo", _MediaInfo)
+    args = ["--dry", "-t", "1", "2", "bad.mp4", "good.mp4"]
+    if module is fade:
+        args = ["--dry", "-a", "1", "2", "bad.mp4", "good.mp4"]
+    assert module.run(args=args) == 0
+    err = capfd.readouterr().err
+    assert "path: bad.mp4" in err and "no video track found" in err
+    assert "-i good.mp4" in err
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import pathlib
+
+import pytest
+
+from joker.studio.aux.incremental import get_output, get_outputs
+from joker.studio.aux.outputcache import is_cacheable
+from joker.studio.aux.schedule import get_primary_input
+from joker.studio.ffmpeg.filtergraph import (
+    Filter,
+    FilterGraph,
+    FilterGraphError,
+    RawFilter,
+    escape_value,
+)
+from joker.studio.ffmpeg.filters import vf_subtitle
+
+
+def test_escaping():
+    assert escape_value("C:\\a'b") == "C\\:\\\\a\\'b"
+    f = Filter("subtitles", filename="a:b/c,d [1].srt")
+    assert str(f) == "subtitles=filename=a\\\\:b/c\\,d \\[1\\].srt"
+    assert str(Filter("scale", -2, 720)) == "scale=-2:720"
+    assert str(Filter("null")) == "null"
+    assert str(Filter("fade", t="in", st=0, d=None)) == "fade=t=in:st=0"
+
+
+def test_vf_subtitle():
+    # a Path without styles
+    assert vf_subtitle(pathlib.Path("a.srt"), None) == "subtitles=filename=a.srt"
+    styles = [("Fontname", "Khmer MN"), ("Fontsize", 46)]
+    assert vf_subtitle("a.srt", styles) == (
+        "subtitles=filename=a.srt:force_style=Fontname=Khmer MN\\,Fontsize=46"
+    )
+
+
+def test_split_outputs():
+    graph = FilterGraph()
+    v = graph.apply(graph.input(0, "v"), Filter("crop", 640, 360, 0, 0))
+    hi, lo = graph.split(v)
+    graph.output(
+        [graph.apply(hi, Filter("scale", -2, 720)), graph.input(0, "a")], "hi.mp4"
+    )
+    graph.output(graph.apply(lo, Filter("scale", -2, 360)), "lo.mp4", an=[])
+    cod = graph.mkcod([("in.mp4", {"ss": 10})])
+    assert cod.as_args() == [
+        "ffmpeg", "-ss", "10", "-i", "in.mp4",
+        "-filter_complex",
+        "[0:v]crop=640:360:0:0[v1];[v1]split=2[v2][v3];"
+        "[v2]scale=-2:720[v4];[v3]scale=-2:360[v5]",
+        "-map", "[v4]", "-map", "0:a", "hi.mp4",
+        "-map", "[v5]", "-an", "lo.mp4",
+    ]  # fmt: skip
+    assert get_output(cod) == "lo.mp4"
+    assert get_outputs(cod) == ["hi.mp4", "lo.mp4"]
+    assert not is_cacheable(cod)
+
+
+def test_concat_inputs():
+    graph = FilterGraph()
+    segments = []
+    for i in range(2):
+        v = graph.apply(graph.input(i, "v"), RawFilter("scale=640:360,setsar=1"))
+        segments.append([v, graph.input(i, "a")])
+    v, a = graph.concat(segments, v=1, a=1)
+    graph.output([v, a], "out.mp4")
+    cod = graph.mkcod(["a.mp4", ("b.mp4", {"ss": 5})])
+    args = cod.as_args()
+    assert args[:3] == ["ffmpeg", "-i", "a.mp4"]
+    assert args[3:5] == ["-filter_complex", cod["filter_complex"]]
+    assert cod["filter_complex"] == (
+        "[0:v]scale=640:360,setsar=1[v1];[1:v]scale=640:360,setsar=1[v2];"
+        "[v1][0:a][v2][1:a]concat=n=2:v=1:a=1[v3][a4]"
+    )
+    assert args[5:9] == ["-ss", "5", "-i", "b.mp4"]
+    assert get_outputs(cod) == ["out.mp4"]
+    assert cod["i"] == "a.mp4" and cod.inputs == ["a.mp4", "b.mp4"]
+    assert get_primary_input(cod) == "a.mp4"
+
+
+def test_unconnected_pads():
+    graph = FilterGraph()
+    v = graph.apply(graph.input(0, "v"), Filter("hflip"))
+    graph.output(graph.apply(v, Filter("vflip")), "a.mp4")
+    graph.output(v, "b.mp4")
+    with pytest.raises(FilterGraphError):
+        graph.compile()
+    graph = FilterGraph()
+    graph.split(graph.input(0, "v"))
+    with pytest.raises(FilterGraphError):
+        graph.compile()
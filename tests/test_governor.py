@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import pytest
+
+from joker.studio.aux import governor
+from joker.studio.aux.utils import CommandExecutor
+from joker.studio.ffmpeg.filtergraph import Filter, FilterGraph
+
+
+@pytest.fixture(autouse=True)
+def _machine(monkeypatch):
+    monkeypatch.setattr(governor, "get_cpu_count", lambda: 8)
+    monkeypatch.setattr(governor, "get_load_average", lambda: None)
+    monkeypatch.setattr(governor, "get_available_memory", lambda: None)
+
+
+def test_threads_by_cores_left(mkcod):
+    gov = governor.Governor()
+    assert gov.max_jobs == 8
+    # alone, e.g. at the end of a batch
+    with gov.slot(mkcod("in.mp4", "a.mp4")):
+        assert gov.threads_in_use == 8
+    assert gov.threads_in_use == 0
+    # another job waiting
+    gov.waiting = 1
+    cod = mkcod("in.mp4", "a.mp4")
+    with gov.slot(cod):
+        assert cod["threads"] == 4
+        # the one which was waiting
+        gov.waiting = 0
+        with gov.slot(mkcod("in.mp4", "b.mp4")):
+            assert gov.threads_in_use == 8
+    assert gov.running == 0 and gov.threads_in_use == 0
+
+
+def test_threads_before_each_file(mkcod):
+    graph = FilterGraph()
+    hi, lo = graph.split(graph.input(0, "v"))
+    graph.output(graph.apply(hi, Filter("scale", -2, 720)), "hi.mp4")
+    graph.output(graph.apply(lo, Filter("scale", -2, 360)), "lo.mp4")
+    cod = graph.mkcod(["in.mp4"])
+    for threads in [2, 3]:
+        # again, e.g. for a retry
+        assert governor.assign_threads(cod, threads)
+    args = cod.as_args()
+    assert args[:5] == ["ffmpeg", "-threads", "3", "-i", "in.mp4"]
+    assert args.count("-threads") == 3
+    assert args[args.index("hi.mp4") - 2 :][:2] == ["-threads", "3"]
+    assert args[-3:] == ["-threads", "3", "lo.mp4"]
+    # of its own
+    cod = mkcod("in.mp4", "a.mp4")
+    cod["threads"] = 1
+    assert not governor.assign_threads(cod, 4)
+    assert cod.as_args() == ["ffmpeg", "-i", "in.mp4", "-threads", "1", "a.mp4"]
+
+
+def test_governed_executor(fake_bin, mkcod, tmp_path):
+    out = str(tmp_path / "a.mp4")
+    summary = CommandExecutor(jobs=0, quiet=True).run([mkcod("in.mp4", out)])
+    assert not summary.failures
+    assert fake_bin.calls[0][:4] == ["ffmpeg", "-threads", "8", "-i"]
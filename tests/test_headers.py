@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import struct
+import wave
+
+from joker.studio.aux.headers import read_header_tracks
+
+
+def _box(typ: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), typ) + payload
+
+
+def _mp4_trak(handler: bytes, timescale, duration, width=0, height=0):
+    tkhd = bytes(76) + struct.pack(">II", width << 16, height << 16)
+    mdhd = bytes(12) + struct.pack(">II", timescale, duration) + bytes(4)
+    hdlr = bytes(8) + handler + bytes(12)
+    entry = bytes(24) + bytes(8) + bytes(8) + struct.pack(">HH", width, height)
+    stsd = bytes(4) + struct.pack(">I", 1) + entry
+    stbl = _box(b"stsd", stsd) + _box(b"stsz", bytes(4096))
+    minf = _box(b"stbl", stbl)
+    mdia = _box(b"mdhd", mdhd) + _box(b"hdlr", hdlr) + _box(b"minf", minf)
+    return _box(b"trak", _box(b"tkhd", tkhd) + _box(b"mdia", mdia))
+
+
+def test_mp4(tmp_path):
+    mvhd = bytes(12) + struct.pack(">II", 1000, 12500) + bytes(80)
+    moov = _box(b"mvhd", mvhd)
+    moov += _mp4_trak(b"vide", 90000, 90000 * 12, 1280, 720)
+    moov += _mp4_trak(b"soun", 48000, 48000 * 12 + 24000)
+    # moov after mdat, as written without faststart
+    data = _box(b"ftyp", b"isom") + _box(b"mdat", bytes(10000)) + _box(b"moov", moov)
+    path = tmp_path / "a.mp4"
+    path.write_bytes(data)
+    tracks = read_header_tracks(path)
+    assert tracks[0] == {"track_type": "General", "duration": 12500.0}
+    assert tracks[1] == {
+        "track_type": "Video",
+        "duration": 12000.0,
+        "width": 1280,
+        "height": 720,
+    }
+    assert tracks[2] == {"track_type": "Audio", "duration": 12500.0}
+
+
+def _ebml(eid: int, payload: bytes) -> bytes:
+    eid_bytes = eid.to_bytes((eid.bit_length() + 7) // 8, "big")
+    size = (1 << 56) | len(payload)
+    return eid_bytes + size.to_bytes(8, "big") + payload
+
+
+def test_mkv(tmp_path):
+    header = _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+    info = _ebml(0x2AD7B1, (10**6).to_bytes(3, "big"))
+    info += _ebml(0x4489, struct.pack(">d", 3000.0))
+    video = _ebml(0xB0, (640).to_bytes(2, "big"))
+    video += _ebml(0xBA, (360).to_bytes(2, "big"))
+    vtrack = _ebml(0x83, b"\x01") + _ebml(0xE0, video)
+    atrack = _ebml(0x83, b"\x02")
+    tracks = _ebml(0xAE, vtrack) + _ebml(0xAE, atrack)
+    cluster = _ebml(0x1F43B675, bytes(1000))
+    segment = _ebml(0x1549A966, info) + _ebml(0x1654AE6B, tracks) + cluster
+    path = tmp_path / "a.webm"
+    path.write_bytes(header + _ebml(0x18538067, segment))
+    tracks = read_header_tracks(path)
+    assert tracks == [
+        {"track_type": "General", "duration": 3000.0},
+        {"track_type": "Video", "duration": 3000.0, "width": 640, "height": 360},
+        {"track_type": "Audio", "duration": 3000.0},
+    ]
+
+
+def test_wav(tmp_path):
+    path = tmp_path / "a.wav"
+    with wave.open(str(path), "wb") as fout:
+        fout.setnchannels(2)
+        fout.setsampwidth(2)
+        fout.setframerate(8000)
+        fout.writeframes(bytes(2 * 2 * 8000 * 3))
+    tracks = read_header_tracks(path)
+    assert tracks[1] == {"track_type": "Audio", "duration": 3000.0}
+
+
+def test_unparsable(tmp_path):
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"not really an mp4 file")
+    assert read_header_tracks(path) is None
+    assert read_header_tracks(tmp_path / "a.ts") is None
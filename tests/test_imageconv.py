@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import argparse
+
+from PIL import Image
+
+from joker.studio.aux.utils import CommandExecutor, InProcessCommand
+from joker.studio.ffmpeg.conv import (
+    can_convert_with_pillow,
+    convert_image,
+    mkcod_convert_a_file,
+)
+
+
+def test_can_convert_with_pillow():
+    assert can_convert_with_pillow(".png", ".jpg")
+    assert can_convert_with_pillow(".GIF", ".bmp")
+    assert not can_convert_with_pillow(".png", ".xyz")
+
+
+def test_convert_in_process(tmp_path):
+    paths = []
+    for i, color in enumerate(["red", "green", "blue"]):
+        path = tmp_path / "{}.png".format(i)
+        Image.new("RGBA", (8, 6), color).save(path)
+        paths.append(str(path))
+    paths.append(str(tmp_path / "bad.png"))
+    (tmp_path / "bad.png").write_bytes(b"not a png")
+    ns = argparse.Namespace(fmt="jpg")
+    cods = [mkcod_convert_a_file(p, ns) for p in paths]
+    assert all(isinstance(cod, InProcessCommand) for cod in cods)
+    assert str(cods[0]).startswith("pillow ")
+    # in a pool of worker processes
+    summary = CommandExecutor(jobs=2, quiet=True).run(cods)
+    assert len(summary.failures) == 1
+    with Image.open(tmp_path / "2.jpg") as im:
+        assert im.format == "JPEG" and im.size == (8, 6)
+        assert im.getpixel((0, 0))[2] > 200
+
+
+def test_convert_keeps_exif_and_quality(tmp_path):
+    path = tmp_path / "a.jpg"
+    exif = Image.Exif()
+    # rotated 90 degrees clockwise on display
+    exif[274] = 6
+    Image.new("RGB", (64, 48), "orange").save(path, quality=40, exif=exif)
+    outpath = tmp_path / "b.jpeg"
+    convert_image(str(path), str(outpath))
+    with Image.open(path) as im, Image.open(outpath) as out:
+        assert out.getexif()[274] == 6
+        assert out.quantization == im.quantization
+    # not the default quality of Pillow, 75
+    Image.new("RGB", (64, 48), "orange").save(tmp_path / "c.png")
+    convert_image(str(tmp_path / "c.png"), str(outpath))
+    with Image.open(outpath) as out:
+        assert out.quantization[0][0] < 8
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import joker.studio
+from joker.studio.__main__ import registry
+
+_root = os.path.dirname(os.path.dirname(os.path.dirname(joker.studio.__file__)))
+
+# to be imported only on code paths which need them
+heavy_modules = {"numpy", "scipy", "PIL", "imagehash", "pymediainfo", "bs4"}
+
+# total import time of `dio <cmd> --help`, excluding site, checked only
+# if set, e.g. to 250, as wall time is unsteady on a loaded machine
+budget_ms = os.environ.get("JOKER_STUDIO_IMPORT_BUDGET_MS")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Module names, indented by depth, to cumulative import times in us"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            cumulative = int(cumulative)
+        except ValueError:
+            # the header line
+            continue
+        # one space after the separator
+        times[name[1:].rstrip()] = cumulative
+    return times
+
+
+def measure_imports(cmd: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=_root, JOKER_STUDIO_DAEMON="0")
+    argv = [sys.executable, "-X", "importtime", "-m", "joker.studio", cmd, "--help"]
+    cp = subprocess.run(argv, env=env, capture_output=True, text=True)
+    assert cp.returncode == 0, cp.stderr
+    return parse_importtime(cp.stderr)
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   json.decoder\n"
+        "import time:       200 |        300 | json\n"
+    )
+    assert parse_importtime(stderr) == {"  json.decoder": 100, "json": 300}
+
+
+def test_subcommand_imports():
+    exceeded = []
+    for cmd in sorted(registry.commands):
+        times = measure_imports(cmd)
+        names = {name.strip().split(".")[0] for name in times}
+        loaded = sorted(heavy_modules & names)
+        assert not loaded, "{} --help imports {}".format(cmd, loaded)
+        total = sum(v for k, v in times.items() if k == k.lstrip() and k != "site")
+        print("{:8} {:6.1f}ms".format(cmd, total / 1000))
+        if budget_ms and total / 1000 > float(budget_ms):
+            exceeded.append((cmd, total / 1000))
+    assert not exceeded, "import time budget {}ms exceeded: {}".format(
+        budget_ms, exceeded
+    )
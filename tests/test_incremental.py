@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+
+from joker.studio.aux.utils import CommandExecutor
+
+
+def test_incremental(fake_bin, mkcod, tmp_path):
+    src = tmp_path / "a.png"
+    src.write_text("png")
+    out = str(tmp_path / "a.jpg")
+    executor = CommandExecutor(incremental=True, quiet=True)
+    for executable in ["convert", "ffmpeg"]:
+        summary = executor.run([mkcod(str(src), out, executable=executable)])
+        assert summary.executed == 1 and not summary.failures
+        summary = executor.run([mkcod(str(src), out, executable=executable)])
+        assert summary.skipped == 1
+        # stale, rebuilt without -y, which convert rejects
+        summary = executor.run([mkcod(str(src), out, "-q", "2", executable=executable)])
+        assert summary.executed == 1 and not summary.failures
+        assert "-y" not in fake_bin.calls[-1]
+        with open(out) as fin:
+            assert fin.read().endswith("-q 2")
+        os.remove(out)
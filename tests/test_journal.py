@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+
+from joker.studio.aux.journal import Journal, get_job_key
+from joker.studio.aux.utils import CommandExecutor
+
+
+def test_journal_and_resume(fake_bin, mkcod, tmp_path, monkeypatch):
+    def _job(name):
+        path = tmp_path / (name + ".wav")
+        return mkcod(str(path), str(path.with_suffix(".mp3")))
+
+    path = str(tmp_path / "journal.jsonl")
+    executor = CommandExecutor(journal=Journal(path), quiet=True)
+    summary = executor.run([_job("a")])
+    assert not summary.failures
+    # written under a partial name, renamed into place when done
+    assert fake_bin.calls[-1][-1] == str(tmp_path / ".a.dio-part.mp3")
+    assert (tmp_path / "a.mp3").is_file()
+    assert not (tmp_path / ".a.dio-part.mp3").exists()
+
+    monkeypatch.setenv("FAKE_FAILS", "2")
+    summary = executor.run([_job("b")])
+    assert len(summary.failures) == 1
+    # the partial output of the failed run is removed
+    assert not (tmp_path / ".b.dio-part.mp3").exists()
+    assert not (tmp_path / "b.mp3").exists()
+
+    # as after an interruption, read back from the file
+    journal = Journal(path)
+    assert journal.is_done(get_job_key(_job("a")))
+    assert journal.get_status(get_job_key(_job("b"))) == "failed"
+    monkeypatch.setenv("FAKE_FAILS", "0")
+    executor = CommandExecutor(journal=journal, resume=True, quiet=True)
+    summary = executor.run([_job("a"), _job("b")])
+    assert summary.skipped == 1 and summary.executed == 1
+    assert fake_bin.calls[-1][-1] == str(tmp_path / ".b.dio-part.mp3")
+    # done, but its output is gone
+    os.remove(tmp_path / "a.mp3")
+    summary = executor.run([_job("a")])
+    assert summary.executed == 1 and (tmp_path / "a.mp3").is_file()
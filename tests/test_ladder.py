@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from joker.studio.aux.incremental import get_outputs
+from joker.studio.ffmpeg import ladder
+
+
+def test_mkcod_ladder(fake_media_info):
+    fake_media_info(ladder, size=(1280, 720))
+    renditions = ladder.load_ladder("web")
+    cod = ladder.mkcod_ladder("in.mp4", renditions)
+    # 1080p is left out, not to upscale
+    assert cod.as_args() == [
+        "ffmpeg", "-i", "in.mp4",
+        "-filter_complex",
+        "[0:v]split=2[v1][v2];[v1]scale=1280:720[v3];[v2]scale=852:480[v4]",
+        "-map", "[v3]", "-map", "0:a?", "-b:v", "2800k", "-b:a", "128k",
+        "in.720p.mp4",
+        "-map", "[v4]", "-map", "0:a?", "-b:v", "1400k", "-b:a", "96k",
+        "in.480p.mp4",
+    ]  # fmt: skip
+    assert get_outputs(cod) == ["in.720p.mp4", "in.480p.mp4"]
+
+
+def test_load_ladder(tmp_path, fake_media_info):
+    fake_media_info(ladder, size=(1280, 720))
+    path = tmp_path / "ladder.json"
+    path.write_text(json.dumps({"renditions": [{"name": "sd", "width": 640}]}))
+    cod = ladder.mkcod_ladder("in.mkv", ladder.load_ladder(str(path)), ".webm")
+    # a single rendition needs no split
+    assert cod["filter_complex"] == "[0:v]scale=640:360[v1]"
+    assert cod.pargs[-1] == "in.sd.webm"
+    path.write_text(json.dumps([{"name": "sd"}]))
+    with pytest.raises(ValueError):
+        ladder.load_ladder(str(path))
+    with pytest.raises(ValueError):
+        ladder.mkcod_ladder("in.mp4", [{"name": "4k", "height": 2160}])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+
+from joker.studio.aux.outputcache import OutputCache, clone_file
+from joker.studio.aux.utils import CommandExecutor
+
+
+def test_restore_then_rebuild(fake_bin, mkcod, tmp_path):
+    src = str(tmp_path / "a.mp4")
+    with open(src, "w") as fout:
+        fout.write("mp4")
+    out = str(tmp_path / "a.mkv")
+    executor = CommandExecutor(incremental=True, quiet=True)
+    executor.output_cache = OutputCache(tmp_path / "cache")
+
+    executor.run([mkcod(src, out, vf="A")])
+    os.remove(out)
+    summary = executor.run([mkcod(src, out, vf="A")])
+    assert summary.skipped == 1 and len(fake_bin.calls) == 1
+    # a copy, not a hard link to the read-only object
+    st = os.stat(out)
+    assert st.st_nlink == 1 and os.access(out, os.W_OK)
+
+    # a stale output rebuilt in place leaves the cached one untouched
+    summary = executor.run([mkcod(src, out, vf="B")])
+    assert summary.executed == 1 and not summary.failures
+    os.remove(out)
+    executor.run([mkcod(src, out, vf="A")])
+    assert len(fake_bin.calls) == 2
+    with open(out) as fin:
+        assert fin.read() == "-i {} -vf A".format(src)
+    assert executor.output_cache.counters["hits"] == 2
+
+
+def test_clone_file(tmp_path):
+    src = tmp_path / "a.mp4"
+    src.write_bytes(b"mp4")
+    dst = tmp_path / "b.mp4"
+    assert clone_file(src, dst) in ("reflink", "copy")
+    assert dst.read_bytes() == b"mp4" and os.stat(dst).st_nlink == 1
+
+
+def test_digests_evicted(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_digests=2)
+    paths = []
+    for name in "abc":
+        path = tmp_path / (name + ".mp4")
+        path.write_text(name)
+        paths.append(str(path))
+        cache.get_digest(path)
+    assert cache.stats()["digests"] == 3
+    out = tmp_path / "out.mp4"
+    out.write_text("out")
+    cache.store("0" * 40, str(out))
+    # the earliest computed ones first
+    assert cache.stats()["digests"] == 2
+    rows = cache._conn.execute("SELECT ino FROM digests").fetchall()
+    assert sorted(r[0] for r in rows) == sorted(os.stat(p).st_ino for p in paths[1:])
+    cache.clear()
+    assert cache.stats()["digests"] == 0
+    cache.close()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import io
+import os
+
+from joker.studio.aux.paths import iter_input_paths, read_nul_separated, walk_files
+
+
+def test_walk_files(tmp_path):
+    for name in ["b.mp4", "a/x.mkv", "a/y.txt", "a/.z.dio-part.mp4", ".h/c.mp4"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    found = [os.path.relpath(p, tmp_path) for p in walk_files(tmp_path)]
+    assert found == ["b.mp4", "a/x.mkv", "a/y.txt"]
+    found = walk_files(tmp_path, {".mp4", ".mkv"})
+    assert [os.path.relpath(p, tmp_path) for p in found] == ["b.mp4", "a/x.mkv"]
+    paths = iter_input_paths([str(tmp_path / "a"), "c.mp4"], recursive=True)
+    assert list(paths) == [
+        str(tmp_path / "a/x.mkv"),
+        str(tmp_path / "a/y.txt"),
+        "c.mp4",
+    ]
+
+
+def test_read_nul_separated():
+    data = b"a.mp4\0dir/b c.mp4\0\0new\nline.mp4\0last.mp4"
+    # boundaries of chunks within paths
+    paths = list(read_nul_separated(io.BytesIO(data), bufsize=4))
+    assert paths == ["a.mp4", "dir/b c.mp4", "new\nline.mp4", "last.mp4"]
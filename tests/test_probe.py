@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from joker.studio.aux.probe import parse_ffprobe_output
+
+_output = {
+    "format": {
+        "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+        "duration": "12.500000",
+        "size": "1048576",
+        "bit_rate": "671088",
+    },
+    "streams": [
+        {
+            "index": 0,
+            "codec_type": "video",
+            "codec_name": "h264",
+            "width": 1280,
+            "height": 720,
+            "pix_fmt": "yuv420p",
+            "avg_frame_rate": "30000/1001",
+            "duration": "12.000000",
+            "bit_rate": "600000",
+        },
+        {
+            "index": 1,
+            "codec_type": "audio",
+            "codec_name": "aac",
+            "channels": 2,
+            "sample_rate": "48000",
+        },
+        {
+            "index": 2,
+            "codec_type": "video",
+            "codec_name": "mjpeg",
+            "disposition": {"attached_pic": 1},
+        },
+        {"index": 3, "codec_type": "data"},
+    ],
+}
+
+
+def test_parse_ffprobe_output():
+    tracks = parse_ffprobe_output("a.mp4", 0, json.dumps(_output).encode(), b"")
+    general, video, audio, data = tracks
+    assert general == {
+        "track_type": "General",
+        "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+        "duration": 12500.0,
+        "file_size": "1048576",
+        "overall_bit_rate": "671088",
+    }
+    assert video["track_type"] == "Video"
+    assert video["duration"] == 12000.0
+    assert (video["width"], video["height"]) == (1280, 720)
+    assert video["frame_rate"] == pytest.approx(29.97, abs=0.01)
+    assert video["bit_rate"] == 600000
+    # no duration of its own, that of the container
+    assert audio["track_type"] == "Audio"
+    assert audio["duration"] == 12500.0
+    assert audio["channel_s"] == 2 and "bit_rate" not in audio
+    # cover art is left out
+    assert data["track_type"] == "Other" and data["stream_identifier"] == 3
+
+
+def test_parse_ffprobe_output_missing_fields():
+    output = {
+        "format": {"format_name": "png_pipe"},
+        "streams": [{"codec_type": "video", "avg_frame_rate": "0/0"}],
+    }
+    general, image = parse_ffprobe_output("a.png", 0, json.dumps(output).encode(), b"")
+    assert general["duration"] is None and general["file_size"] is None
+    assert image["track_type"] == "Image"
+    assert image["duration"] is None and image["frame_rate"] is None
+    assert image["width"] is None
+    assert parse_ffprobe_output("a", 0, b"{}", b"") == [
+        {
+            "track_type": "General",
+            "format_name": None,
+            "duration": None,
+            "file_size": None,
+            "overall_bit_rate": None,
+        }
+    ]
+    with pytest.raises(ValueError, match="Invalid data"):
+        parse_ffprobe_output("a", 1, b"", b"a: Invalid data found\n")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+
+from joker.studio.aux.probecache import ProbeCache, stat_key
+
+
+def test_get_and_put(tmp_path):
+    cache = ProbeCache(tmp_path / "probes.sqlite3")
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"mp4")
+    key = stat_key(path)
+    assert cache.get(key, "ffprobe") is None
+    cache.put(key, "ffprobe", [{"track_type": "General"}])
+    assert cache.get(key, "ffprobe") == [{"track_type": "General"}]
+    # of another engine
+    assert cache.get(key, "mediainfo") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # the same file changed, in size or in mtime
+    path.write_bytes(b"mp4 changed")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    newkey = stat_key(path)
+    assert newkey[:2] == key[:2] and newkey != key
+    assert cache.get(newkey, "ffprobe") is None
+    cache.put(newkey, "ffprobe", [{"track_type": "Video"}])
+    # the entry of the older version is replaced
+    assert cache.get(key, "ffprobe") is None
+    assert cache.stats()["entries"] == 1
+
+    # counted across flushes
+    cache.close()
+    cache = ProbeCache(tmp_path / "probes.sqlite3")
+    assert cache.get(newkey, "ffprobe") == [{"track_type": "Video"}]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+    cache.close()
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = ProbeCache(tmp_path / "probes.sqlite3", max_entries=2)
+    cache.evict_interval = 4
+    keys = [(0, ino, 1, 1) for ino in range(4)]
+    for key in keys[:3]:
+        cache.put(key, "ffprobe", [])
+    # refreshed, so no longer the least recently used
+    cache.touch_interval = -1
+    assert cache.get(keys[0], "ffprobe") == []
+    assert cache.stats()["entries"] == 3
+    # evicted on every 4th put
+    cache.put(keys[3], "ffprobe", [])
+    assert cache.stats()["entries"] == 2
+    assert cache.get(keys[0], "ffprobe") == []
+    assert cache.get(keys[1], "ffprobe") is None
+    assert cache.get(keys[2], "ffprobe") is None
+    # keys[0] was just hit again
+    assert cache.evict(1) == 1
+    assert cache.get(keys[0], "ffprobe") == []
+    assert cache.get(keys[3], "ffprobe") is None
+    cache.close()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import time
+
+from joker.studio.aux.profiling import Profiler, split_profile_options
+
+
+def test_split_profile_options():
+    argv = ["dio", "--profile", "--profile-trace", "t.json", "vid", "--profile"]
+    options, rest = split_profile_options(argv)
+    assert options == {"trace": "t.json"}
+    assert rest == ["dio", "vid", "--profile"]
+    options, rest = split_profile_options(["dio", "--profile-cprofile=c.prof", "ren"])
+    assert options == {"cprofile": "c.prof"}
+    assert rest == ["dio", "ren"]
+    assert split_profile_options(["dio", "ren"]) == (None, ["dio", "ren"])
+
+
+def test_nested_spans():
+    profiler = Profiler()
+    with profiler.span("off"):
+        pass
+    assert profiler.events == []
+    profiler.start()
+    with profiler.span("outer"):
+        for _ in range(2):
+            with profiler.span("inner", i=1):
+                time.sleep(0.01)
+    profiler.stop()
+    stats = {st["name"]: st for st in profiler.summarize()}
+    assert stats["inner"]["calls"] == 2
+    assert stats["outer"]["total"] >= stats["inner"]["total"] >= 0.02
+    assert stats["outer"]["self"] < stats["inner"]["total"]
+    trace = profiler.to_trace()["traceEvents"]
+    assert [e["name"] for e in trace] == ["outer", "inner", "inner"]
+    assert trace[1]["args"] == {"i": "1"}
+    assert "(wall)" in profiler.format_table()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import sys
+
+from joker.studio.aux.progress import ProgressParser, ProgressRun
+from joker.studio.aux.utils import CommandOptionDict
+
+
+def _feed(parser, text):
+    snapshots = [parser.feed(line) for line in text.splitlines()]
+    return [s for s in snapshots if s is not None]
+
+
+def test_parser():
+    parser = ProgressParser()
+    text = (
+        "frame=250\n"
+        "fps=49.80\n"
+        "out_time_us=10000000\n"
+        "out_time_ms=10000000\n"
+        "total_size=1048624\n"
+        "speed=1.99x\n"
+        "progress=continue\n"
+    )
+    assert parser.feed("frame=250") is None
+    (snapshot,) = _feed(ProgressParser(), text)
+    assert snapshot == {
+        "frame": 250,
+        "fps": 49.8,
+        "out_time": 10.0,
+        "total_size": 1048624,
+        "speed": 1.99,
+        "progress": "continue",
+    }
+    # out_time_ms of older ffmpeg, in microseconds too
+    text = "out_time_ms=2500000\nspeed= 0.5x\nprogress=end\n"
+    (snapshot,) = _feed(ProgressParser(), text)
+    assert snapshot["out_time"] == 2.5 and snapshot["speed"] == 0.5
+    assert snapshot["frame"] is None and snapshot["progress"] == "end"
+
+
+def test_parser_not_available():
+    text = (
+        "frame=0\n"
+        "fps=N/A\n"
+        "out_time_us=N/A\n"
+        "total_size=N/A\n"
+        "speed=N/A\n"
+        "progress=continue\n"
+        "bogus line\n"
+        "frame=1\n"
+        "progress=end\n"
+    )
+    first, second = _feed(ProgressParser(), text)
+    assert first == {
+        "frame": 0,
+        "fps": None,
+        "out_time": None,
+        "total_size": None,
+        "speed": None,
+        "progress": "continue",
+    }
+    # blocks do not carry over
+    assert second["frame"] == 1 and second["fps"] is None
+
+
+def test_summary(tmp_path):
+    output = tmp_path / "a.mp4"
+    output.write_bytes(bytes(100))
+    cod = CommandOptionDict([("i", "a.mkv")])("ffmpeg", str(output))
+    run = ProgressRun(cod)
+    run.started, run.finished = 1000.0, 1004.0
+    run.returncode = 0
+    run.last = {"out_time": 10.0, "total_size": None, "fps": 60.0, "speed": 2.5}
+    summary = run.summary()
+    assert summary == {
+        "command": str(cod),
+        "output": str(output),
+        "returncode": 0,
+        "killed": None,
+        "started": 1000.0,
+        "wall_time": 4.0,
+        "out_time": 10.0,
+        "realtime_factor": 2.5,
+        # the size of the file, as ffmpeg reported none
+        "bytes_written": 100,
+        "fps": 60.0,
+        "speed": 2.5,
+    }
+    run.last = {"out_time": None, "total_size": 42}
+    summary = run.summary()
+    assert summary["realtime_factor"] is None and summary["bytes_written"] == 42
+
+
+_fake_ffmpeg = """\
+import os, sys
+
+fd = int(sys.argv[sys.argv.index("-progress") + 1].split(":")[1])
+with os.fdopen(fd, "w") as fout:
+    for i, progress in enumerate(["continue", "end"]):
+        fout.write("frame={}\\nout_time_us={}\\n".format(i, i * 500000))
+        fout.write("speed=1.5x\\nprogress={}\\n".format(progress))
+"""
+
+
+def test_run(tmp_path):
+    exe = tmp_path / "ffmpeg"
+    exe.write_text("#!{}\n{}".format(sys.executable, _fake_ffmpeg))
+    exe.chmod(0o755)
+    cod = CommandOptionDict([("i", "a.mkv")])(str(exe), str(tmp_path / "a.mp4"))
+    run = ProgressRun(cod, capture_stderr=True)
+    snapshots = list(run)
+    assert [s["out_time"] for s in snapshots] == [0.0, 0.5]
+    summary = run.summary()
+    assert summary["returncode"] == 0 and summary["out_time"] == 0.5
+    assert summary["speed"] == 1.5 and summary["bytes_written"] is None
+    assert run.stderr == ""
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import argparse
+
+from joker.studio.aux.info import Track
+from joker.studio.ffmpeg import conv
+from joker.studio.ffmpeg.remux import get_codec_name, mkcod_remux
+
+
+def _tracks(*items):
+    return [Track(dict(track_type=tt, **kw)) for tt, kw in items]
+
+
+def test_get_codec_name():
+    # of ffprobe
+    assert get_codec_name(Track({"codec_name": "hevc"})) == "hevc"
+    # of mediainfo
+    assert get_codec_name(Track({"format": "AVC"})) == "h264"
+    track = Track({"format": "MPEG Audio", "format_profile": "Layer 3"})
+    assert get_codec_name(track) == "mp3"
+    assert get_codec_name(Track({"format": "UTF-8"})) == "subrip"
+    assert get_codec_name(Track({"format": "Unknown"})) is None
+
+
+def test_remux_ts_to_mp4():
+    tracks = _tracks(
+        ("General", {"format_name": "mpegts"}),
+        ("Video", {"codec_name": "h264"}),
+        ("Audio", {"codec_name": "aac"}),
+        ("Audio", {"codec_name": "mp2"}),
+    )
+    cod = mkcod_remux("in.ts", "in.mp4", tracks)
+    assert cod.as_args() == [
+        "ffmpeg", "-i", "in.ts",
+        "-c:v:0", "copy", "-c:a:0", "copy", "-bsf:a:0", "aac_adtstoasc",
+        "-c:a:1", "aac",
+        "-map", "0:V:0", "-map", "0:a:0", "-map", "0:a:1", "in.mp4",
+    ]  # fmt: skip
+
+
+def test_remux_subtitles():
+    tracks = _tracks(
+        ("General", {"format": "Matroska"}),
+        ("Video", {"format": "HEVC"}),
+        ("Audio", {"format": "Opus"}),
+        ("Text", {"format": "UTF-8"}),
+        ("Text", {"format": "PGS"}),
+    )
+    args = mkcod_remux("in.mkv", "in.mp4", tracks).as_args()
+    assert args[args.index("-c:a:0") + 1] == "aac"
+    assert args[args.index("-c:s:0") + 1] == "mov_text"
+    # bitmap subtitles are left out
+    assert "0:s:1" not in args and "-bsf:a:0" not in args
+    # nothing to copy, left to a plain conversion
+    assert mkcod_remux("in.mkv", "in.webm", tracks[:2]) is None
+    assert mkcod_remux("in.mkv", "in.rmvb", tracks) is None
+
+
+def test_convert_a_file(fake_media_info):
+    fake_media_info(conv, tracks=_tracks(("Audio", {"codec_name": "mp3"})))
+    ns = argparse.Namespace(fmt="mp3")
+    cod = conv.mkcod_convert_a_file("in.mkv", ns)
+    assert cod["c:a:0"] == "copy"
+    ns.reencode = True
+    cod = conv.mkcod_convert_a_file("in.mkv", ns)
+    assert cod["c:a"] == "libmp3lame"
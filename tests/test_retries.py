@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import time
+
+from joker.studio.aux.utils import CommandExecutor, InProcessCommand
+
+
+def test_retry_after_partial_output(fake_bin, mkcod, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FAILS", "1")
+    executor = CommandExecutor(retries=1, retry_on="failure", quiet=True)
+    for executable in ["ffmpeg", "convert"]:
+        out = tmp_path / "{}.jpg".format(executable)
+        # FAKE_FAILS counts runs of both
+        (tmp_path / "bin" / "log.jsonl.runs").unlink(missing_ok=True)
+        summary = executor.run([mkcod("a.png", str(out), executable=executable)])
+        assert not summary.failures
+        assert out.read_text() != "partial"
+    assert len(fake_bin.calls) == 4
+    assert not any("-y" in args for args in fake_bin.calls)
+
+
+def test_timeout(fake_bin, mkcod, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLEEP", "10")
+    executor = CommandExecutor(timeout=0.5, retries=1, quiet=True)
+    summary = executor.run([mkcod("a.mp4", str(tmp_path / "b.mp4"))])
+    (result,) = summary.failures
+    assert result.killed == "timeout" and result.attempts == 2
+    assert len(fake_bin.calls) == 2
+    # not retried unless hung
+    monkeypatch.setenv("FAKE_SLEEP", "0")
+    monkeypatch.setenv("FAKE_FAILS", "100")
+    summary = executor.run([mkcod("a.mp4", str(tmp_path / "c.mp4"))])
+    assert summary.failures[0].attempts == 1
+
+
+def test_timeout_in_process(tmp_path):
+    executor = CommandExecutor(timeout=0.5, retries=1, quiet=True)
+    cods = [InProcessCommand(time.sleep)("sleep", s) for s in [10, 0.1]]
+    t0 = time.monotonic()
+    results = list(executor.iter_results(cods))
+    # the stuck worker is terminated, not waited for
+    assert time.monotonic() - t0 < 5
+    assert results[0].killed == "timeout" and results[0].attempts == 2
+    assert results[0].reason == "timed out after 0.5s"
+    assert results[1].ok
+
+
+def test_timeout_in_process_concurrent(tmp_path):
+    executor = CommandExecutor(jobs=2, timeout=1.5, quiet=True)
+    cods = [InProcessCommand(time.sleep)("sleep", s) for s in [10, 1, 0.9]]
+    results = {r.cod.pargs[0]: r for r in executor.iter_results(cods)}
+    assert results[10].killed == "timeout"
+    # in the pool recycled while running, so run again
+    assert results[1].ok and results[0.9].ok
+    assert results[0.9].elapsed > 1
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import wave
+
+from joker.studio.aux.schedule import order_jobs
+from joker.studio.aux.utils import CommandExecutor
+
+
+def _write_wav(path, seconds):
+    with wave.open(str(path), "wb") as fout:
+        fout.setnchannels(1)
+        fout.setsampwidth(2)
+        fout.setframerate(8000)
+        fout.writeframes(b"\0\0" * 8000 * seconds)
+
+
+def _mkcods(mkcod, tmp_path, monkeypatch):
+    # durations read from wav headers, without ffprobe
+    monkeypatch.setenv("JOKER_STUDIO_PROBE_CACHE", "0")
+    cods = []
+    for name, seconds in [("s", 1), ("l", 3), ("m", 2), ("x", None)]:
+        path = tmp_path / (name + ".wav")
+        if seconds is not None:
+            _write_wav(path, seconds)
+        cods.append(mkcod(str(path), str(tmp_path / (name + ".mp3"))))
+    return cods
+
+
+def test_order_jobs(mkcod, tmp_path, monkeypatch):
+    cods = _mkcods(mkcod, tmp_path, monkeypatch)
+    pairs = order_jobs(cods, "longest", "duration")
+    # unknown cost first, not to be left for the end
+    assert [cost for _, cost in pairs] == [None, 3.0, 2.0, 1.0]
+    pairs = order_jobs(cods, "shortest", "duration")
+    assert [cost for _, cost in pairs] == [1.0, 2.0, 3.0, None]
+    pairs = order_jobs(cods, "given")
+    assert [cod for cod, _ in pairs] == cods
+
+
+def test_executor_order(fake_bin, mkcod, tmp_path, monkeypatch):
+    cods = _mkcods(mkcod, tmp_path, monkeypatch)[:3]
+    executor = CommandExecutor(order="longest", cost_model="duration", quiet=True)
+    results = list(executor.iter_results(cods))
+    assert [r.estimated_cost for r in results] == [3.0, 2.0, 1.0]
+    assert [args[-1][-5:] for args in fake_bin.calls] == ["l.mp3", "m.mp3", "s.mp3"]
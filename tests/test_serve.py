@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import joker.studio
+from joker.studio.aux.info import MediaInfo
+from joker.studio.aux import serve
+from joker.studio.aux.serve import _is_listening, forward
+
+_root = os.path.dirname(os.path.dirname(os.path.dirname(joker.studio.__file__)))
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = str(tmp_path / "dio.sock")
+    env = dict(os.environ, PYTHONPATH=_root, JOKER_STUDIO_CACHE_DIR=str(tmp_path))
+    argv = [sys.executable, "-m", "joker.studio", "serve", "-q", "-s", path]
+    proc = subprocess.Popen(argv, env=env)
+    deadline = time.monotonic() + 60
+    while not _is_listening(path):
+        assert proc.poll() is None and time.monotonic() < deadline
+        time.sleep(0.1)
+    yield path
+    proc.terminate()
+    proc.wait(10)
+    assert not os.path.exists(path)
+
+
+def test_forward(daemon, tmp_path, monkeypatch, capfd):
+    monkeypatch.setenv("JOKER_STUDIO_DAEMON", "1")
+    monkeypatch.chdir(tmp_path)
+    code = forward(["dio", "conv", "--dry", "-f", "mp3", "a.mp4"], daemon)
+    assert code == 0
+    assert "ffmpeg -i a.mp4" in capfd.readouterr().err
+    assert forward(["dio", "conv", "--no-such-option"], daemon) == 2
+    # the environment of the client, not of the daemon
+    (tmp_path / "a.mkv").write_bytes(b"")
+    monkeypatch.setenv("JOKER_STUDIO_PROBE_ENGINE", "bogus")
+    assert forward(["dio", "iwh", "a.mkv"], daemon) == 0
+    assert "unknown probe engine: bogus" in capfd.readouterr().err
+
+
+def test_version_mismatch(daemon, tmp_path, monkeypatch, capfd):
+    monkeypatch.setenv("JOKER_STUDIO_DAEMON", "1")
+    monkeypatch.chdir(tmp_path)
+    # as a client upgraded while the daemon was serving
+    monkeypatch.setattr(serve, "__version__", "99.0.0")
+    assert forward(["dio", "conv", "--dry", "-f", "mp3", "a.mp4"], daemon) is None
+    err = capfd.readouterr().err
+    assert "not 99.0.0, running locally" in err
+    assert "ffmpeg -i a.mp4" not in err
+
+
+def test_header_fast_path(monkeypatch):
+    # read per call, not at import, for requests of `dio serve`
+    monkeypatch.setenv("JOKER_STUDIO_HEADER_PROBE", "0")
+    assert not MediaInfo("a.mp4").header_fast_path
+    monkeypatch.delenv("JOKER_STUDIO_HEADER_PROBE")
+    assert MediaInfo("a.mp4").header_fast_path
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import pickle
+
+from joker.studio.aux.info import Track
+from joker.studio.aux.summary import MediaSummary, MediaSummaryTable
+
+_summaries = [
+    MediaSummary("a.mp4", 1920, 1080, 60.0, 60.0, 59.5, 3),
+    MediaSummary("b.mp3", None, None, 180.0, None, 180.0, 2),
+    MediaSummary("c.png", 640, 480, None, None, None, 4),
+    MediaSummary("d.mp4", 1280, 720, 5.0, 5.0, None, 1),
+]
+
+
+def _paths(table):
+    return [s.path for s in table]
+
+
+def test_from_tracks():
+    tracks = [
+        Track({"track_type": "General", "duration": 61000}),
+        Track(
+            {"track_type": "Video", "width": 1920, "height": 1080, "duration": 60000}
+        ),
+        Track({"track_type": "Audio", "duration": 59500}),
+    ]
+    summary = MediaSummary.from_tracks("a.mp4", tracks)
+    assert summary == _summaries[0]
+    assert summary.has_track("video") and not summary.has_track("image")
+    assert pickle.loads(pickle.dumps(summary)) == summary
+
+
+def test_table():
+    table = MediaSummaryTable.from_summaries(_summaries)
+    assert len(table) == 4
+    # missing values round-trip as None
+    assert list(table) == _summaries
+    assert _paths(table.take([3, 0])) == ["d.mp4", "a.mp4"]
+
+
+def test_filter():
+    table = MediaSummaryTable.from_summaries(_summaries)
+    # unknown durations drop out
+    assert _paths(table.filter(min_duration=10)) == ["a.mp4", "b.mp3"]
+    assert _paths(table.filter(max_duration=100)) == ["a.mp4", "d.mp4"]
+    # and so do unknown sizes
+    assert _paths(table.filter(max_width=1280)) == ["c.png", "d.mp4"]
+    assert _paths(table.filter(min_height=720)) == ["a.mp4", "d.mp4"]
+    assert _paths(table.filter(max_height=1000)) == ["c.png", "d.mp4"]
+    assert _paths(table.filter(track_type="Audio")) == ["a.mp4", "b.mp3"]
+    assert _paths(table.filter(track_type="video", min_width=1281)) == ["a.mp4"]
+    assert len(table.filter(min_width=4000)) == 0
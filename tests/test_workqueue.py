@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import joker.studio
+from joker.studio.aux.workqueue import WorkQueue
+
+_root = os.path.dirname(os.path.dirname(os.path.dirname(joker.studio.__file__)))
+
+
+def _start_worker(qdir, jobs=2):
+    env = dict(os.environ, PYTHONPATH=_root)
+    args = ["queue", "-q", str(qdir), "work", "-j", str(jobs)]
+    argv = [sys.executable, "-m", "joker.studio"] + args
+    return subprocess.Popen(argv, env=env, stderr=subprocess.PIPE)
+
+
+def test_workers_drain_queue(tmp_path):
+    qdir = tmp_path / "queue"
+    queue = WorkQueue(qdir)
+    for i in range(12):
+        # --dry, to run without ffmpeg
+        queue.add("conv", ["--dry", "-f", "mp3"], "/media/{}.mp4".format(i))
+    workers = [_start_worker(qdir) for _ in range(3)]
+    outputs = [w.communicate(timeout=120)[1].decode() for w in workers]
+    assert [w.returncode for w in workers] == [0, 0, 0]
+    assert queue.counts() == {"pending": 0, "running": 0, "done": 12, "failed": 0}
+    # each item is run exactly once
+    claims = [line for out in outputs for line in out.splitlines() if ".json: " in line]
+    assert len(claims) == 12
+    for name in queue.list("done"):
+        item = queue.read("done", name)
+        assert item["attempts"] == 1
+        assert item["history"][0]["returncode"] == 0
+
+
+def test_failed_items(tmp_path):
+    queue = WorkQueue(tmp_path)
+    queue.add("conv", ["--no-such-option"], "/media/a.mp4")
+    worker = _start_worker(tmp_path, jobs=1)
+    worker.communicate(timeout=120)
+    assert worker.returncode == 1
+    assert queue.counts()["failed"] == 1
+    name = queue.list("failed")[0]
+    item = queue.read("failed", name)
+    assert item["attempts"] == 2
+    assert [h["returncode"] for h in item["history"]] == [2, 2]
+    assert "unrecognized arguments" in open(queue.log_path(name)).read()
+
+
+def test_requeue_expired(tmp_path):
+    queue = WorkQueue(tmp_path, lease=10)
+    name = queue.add("conv", [], "/media/a.mp4")
+    assert queue.claim()[0] == name
+    assert queue.claim() is None
+    assert queue.requeue_expired() == []
+    past = time.time() - 60
+    os.utime(os.path.join(tmp_path, "running", name), (past, past))
+    assert queue.requeue_expired() == [name]
+    old_item = queue.read("pending", name)
+    name, item = queue.claim()
+    assert item["attempts"] == 2
+    assert queue.heartbeat(name, item)
+    # the lease of the first claim was lost
+    assert not queue.heartbeat(name, old_item)
+    assert queue.finish(name, old_item, 1, 1.0) is None
+    assert queue.read("running", name)["token"] == item["token"]
+    assert queue.finish(name, item, 0, 1.0) == "done"
+    assert not queue.heartbeat(name)
+
+
+def test_expired_too_often(tmp_path):
+    queue = WorkQueue(tmp_path, lease=10, max_attempts=2)
+    name = queue.add("conv", [], "/media/a.mp4")
+    past = time.time() - 60
+    for attempts in [1, 2]:
+        assert queue.claim()[1]["attempts"] == attempts
+        # e.g. killing its worker each time
+        os.utime(os.path.join(tmp_path, "running", name), (past, past))
+        requeued = queue.requeue_expired()
+        assert requeued == ([name] if attempts < 2 else [])
+    assert queue.counts()["failed"] == 1
+    item = queue.read("failed", name)
+    assert item["history"][-1]["expired"]
+
+
+def test_retry_failed(tmp_path):
+    queue = WorkQueue(tmp_path)
+    name = queue.add("conv", [], "/media/a.mp4")
+    os.rename(
+        os.path.join(tmp_path, "pending", name), os.path.join(tmp_path, "failed", name)
+    )
+    # e.g. cut short by a full disk
+    with open(os.path.join(tmp_path, "failed", "0-bad.json"), "w") as fout:
+        fout.write("{")
+    assert queue.retry_failed() == 1
+    assert queue.list("pending") == [name]
+    assert queue.list("failed") == ["0-bad.json"]
+
+
+def _is_running(pid):
+    try:
+        with open("/proc/{}/stat".format(pid)) as fin:
+            # a zombie is not
+            return fin.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_interrupted_worker(fake_bin, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_SLEEP", "60")
+    qdir = tmp_path / "queue"
+    queue = WorkQueue(qdir)
+    for name in ["a", "b"]:
+        path = tmp_path / (name + ".mp4")
+        path.write_bytes(b"")
+        queue.add("conv", ["--reencode", "-f", "mp3"], str(path))
+    worker = _start_worker(qdir, jobs=2)
+    deadline = time.monotonic() + 60
+    while len(fake_bin.pids) < 2:
+        assert worker.poll() is None and time.monotonic() < deadline
+        time.sleep(0.1)
+    worker.send_signal(signal.SIGINT)
+    _, err = worker.communicate(timeout=60)
+    assert worker.returncode == 130, err.decode()
+    # put back, as never claimed, for others to run
+    assert queue.counts() == {"pending": 2, "running": 0, "done": 0, "failed": 0}
+    for name in queue.list("pending"):
+        assert queue.read("pending", name)["attempts"] == 0
+    assert not any(_is_running(pid) for pid in fake_bin.pids)